@@ -4,7 +4,9 @@ from tkinter import ttk, messagebox
 from tkcalendar import Calendar
 from datetime import datetime
 from PIL import Image, ImageTk
-import sqlite3
+
+from repository import get_repository
+from perf import span
 
 
 class AddScrapFrame(tk.Frame):
@@ -13,7 +15,6 @@ class AddScrapFrame(tk.Frame):
         self.controller = controller
         self.BASE_DIR = os.path.dirname(__file__)
         self.IMAGE_DIR = os.path.join(self.BASE_DIR, "images")
-        self.DB_PATH = os.path.join(self.BASE_DIR, "sample_data.db")
 
         self.scale_x = max(self.winfo_screenwidth() / 1920, 0.8)
         self.scale_y = max(self.winfo_screenheight() / 1080, 0.8)
@@ -122,15 +123,12 @@ class AddScrapFrame(tk.Frame):
             # Validate date
             datetime.strptime(date, "%m/%d/%Y")
 
-            conn = sqlite3.connect(self.DB_PATH)
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO scrap_logs
-                (machine_operator, machine_name, date, quantity, unit, total_produced, shift, reason, comments)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (operator, machine, date, quantity, unit, total, shift, reason, comments))
-            conn.commit()
-            conn.close()
+            with span("add_scrap.db"):
+                get_repository().insert_batch([{
+                    "machine_operator": operator, "machine_name": machine, "date": date,
+                    "quantity": quantity, "unit": unit, "total_produced": total,
+                    "shift": shift, "reason": reason, "comments": comments,
+                }])
 
             messagebox.showinfo("Success", "Scrap entry added successfully!")
             self._clear_form()
@@ -0,0 +1,211 @@
+# artifact_store.py — managed working directories and shared chart assets
+#
+# Every preview/export renders into a work directory from this store instead
+# of a bare tempfile.mkdtemp(). Chart images are content-addressed blobs
+# (chart_renderer keys them by a hash of the chart spec) that work
+# directories hard-link rather than copy, so the filesystem link count is the
+# reference count: a blob with st_nlink == 1 is used by no report. Files
+# placed outside the store are plain copies and hold no reference. sweep()
+# removes work directories past MAX_AGE, then the oldest ones while the
+# store is over MAX_BYTES, then unreferenced blobs, oldest first. Sizes count
+# each inode once, however many directories link it.
+#
+# A work directory is in use from workdir() until release() or done(): a
+# "<name>.busy" marker beside it tells every process sharing the store not to
+# evict it for size, so a render in another process (a batch worker, a
+# second export) never loses its directory midway. Markers older than
+# BUSY_STALE are ignored, so a crashed process does not pin its directory.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# -----------------
+# SETTINGS
+# -----------------
+ROOT = Path(os.getenv("SCRAPSENSE_ARTIFACTS") or Path(tempfile.gettempdir()) / "scrapsense_artifacts")
+MAX_BYTES = int(os.getenv("SCRAPSENSE_ARTIFACTS_MB") or 1024) * 2**20
+MAX_AGE = float(os.getenv("SCRAPSENSE_ARTIFACTS_MAX_AGE_H") or 24) * 3600
+SWEEP_INTERVAL = 60.0      # seconds between automatic sweeps
+BLOB_GRACE = 300.0         # unreferenced blobs younger than this are kept for reuse
+BUSY_STALE = 3600.0        # seconds after which a work directory's in-use marker is ignored
+BUSY_SUFFIX = ".busy"
+
+
+def link_or_copy(src, dest):
+    """Hard-link src to dest (shares the bytes, counts as a reference); copy if linking fails."""
+    dest = Path(dest)
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+    return dest
+
+
+def _files(path: Path) -> list:
+    """[(inode key, size, link count)] for the files under path."""
+    out = []
+    for p in path.rglob("*"):
+        try:
+            st = p.lstat()
+        except OSError:
+            continue
+        if not p.is_symlink() and p.is_file():
+            out.append(((st.st_dev, st.st_ino), st.st_size, st.st_nlink))
+    return out
+
+
+def _mtime(path: Path, default: float) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return default
+
+
+class ArtifactStore:
+    def __init__(self, root=ROOT, max_bytes: int = MAX_BYTES, max_age: float = MAX_AGE):
+        self.root = Path(root)
+        self.work_root = self.root / "work"
+        self.blob_root = self.root / "blobs"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    # ----- work directories -----
+    def workdir(self, prefix: str = "report") -> Path:
+        """A fresh work directory owned by the store."""
+        self.work_root.mkdir(parents=True, exist_ok=True)
+        path = self.work_root / f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self._busy(path).write_text(str(os.getpid()), encoding="utf-8")
+        path.mkdir()
+        self.maybe_sweep()
+        return path
+
+    def done(self, workdir):
+        """Keep a work directory's files but let sweep() evict it (e.g. a report open in the browser)."""
+        self._busy(Path(workdir)).unlink(missing_ok=True)
+
+    def release(self, workdir):
+        """Delete a work directory once its outputs have been copied elsewhere."""
+        workdir = Path(workdir)
+        if workdir.parent == self.work_root:
+            shutil.rmtree(workdir, ignore_errors=True)
+            self.done(workdir)
+
+    def _busy(self, workdir: Path) -> Path:
+        return workdir.with_name(workdir.name + BUSY_SUFFIX)
+
+    def in_use(self, workdir, now: float | None = None) -> bool:
+        try:
+            mtime = self._busy(Path(workdir)).stat().st_mtime
+        except OSError:
+            return False
+        return (now or time.time()) - mtime < BUSY_STALE
+
+    # ----- blobs -----
+    def blob_path(self, key: str, ext: str) -> Path:
+        self.blob_root.mkdir(parents=True, exist_ok=True)
+        return self.blob_root / f"{key}{ext}"
+
+    def place(self, blob, dest) -> Path:
+        """Put a blob at dest: a hard link (one reference) inside the store, a plain copy elsewhere."""
+        dest = Path(dest)
+        if self.root.resolve() in dest.resolve().parents:
+            return link_or_copy(blob, dest)
+        shutil.copyfile(blob, dest)
+        return dest
+
+    def refcount(self, blob) -> int:
+        """Work directories (or other links) currently using a blob."""
+        try:
+            return os.stat(blob).st_nlink - 1
+        except OSError:
+            return 0
+
+    # ----- eviction -----
+    def maybe_sweep(self):
+        if time.monotonic() - self._last_sweep >= SWEEP_INTERVAL:
+            self.sweep()
+
+    def sweep(self) -> dict:
+        """Apply age and size limits; returns what was removed."""
+        with self._lock:
+            self._last_sweep = time.monotonic()
+            now = time.time()
+            removed = {"workdirs": 0, "blobs": 0}
+
+            dirs, markers = [], []
+            if self.work_root.exists():
+                for d in self.work_root.iterdir():
+                    if d.name.endswith(BUSY_SUFFIX):
+                        markers.append(d)
+                        continue
+                    try:
+                        mtime = d.stat().st_mtime
+                    except OSError:
+                        continue
+                    if now - mtime > self.max_age and not self.in_use(d, now):
+                        self.release(d)
+                        removed["workdirs"] += 1
+                    else:
+                        dirs.append((mtime, d))
+            for m in markers:
+                # a marker whose directory is gone (crashed before mkdir, or removed elsewhere)
+                if not m.with_name(m.name[:-len(BUSY_SUFFIX)]).exists() and now - _mtime(m, now) > BUSY_STALE:
+                    m.unlink(missing_ok=True)
+
+            # every inode once: links[key] = links still present, sizes[key] = bytes
+            links, sizes = {}, {}
+            dir_files = {}
+            for _, d in dirs:
+                dir_files[d] = _files(d)
+                for key, size, nlink in dir_files[d]:
+                    links[key], sizes[key] = nlink, size
+            blobs = []
+            if self.blob_root.exists():
+                for b in self.blob_root.iterdir():
+                    try:
+                        st = b.stat()
+                    except OSError:
+                        continue
+                    key = (st.st_dev, st.st_ino)
+                    links[key], sizes[key] = st.st_nlink, st.st_size
+                    # linking/unlinking updates ctime, so it is the blob's last use
+                    blobs.append((st.st_ctime, key, b))
+            total = sum(sizes.values())
+
+            def unlinked(key):
+                nonlocal total
+                links[key] -= 1
+                if links[key] == 0:
+                    total -= sizes[key]
+
+            for _, d in sorted(dirs):
+                if total <= self.max_bytes:
+                    break
+                if self.in_use(d, now):
+                    continue
+                self.release(d)
+                removed["workdirs"] += 1
+                for key, _, _ in dir_files[d]:
+                    unlinked(key)
+
+            for used, key, b in sorted(blobs):
+                idle = now - used
+                if self.refcount(b) > 0 or idle < BLOB_GRACE:
+                    continue
+                if total > self.max_bytes or idle > self.max_age:
+                    b.unlink(missing_ok=True)
+                    removed["blobs"] += 1
+                    unlinked(key)
+            return removed
+
+
+# Shared store used by generate_report and chart_renderer
+STORE = ArtifactStore()
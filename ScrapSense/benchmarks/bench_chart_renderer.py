@@ -0,0 +1,74 @@
+# bench_chart_renderer.py — report chart rendering: serial vs pooled vs cached
+#
+# Renders the four report charts for a synthetic period:
+#   serial   — one write_image after another in this process (the old path)
+#   cold     — chart_renderer with an empty cache (parallel workers)
+#   warm     — chart_renderer again with the same data (cache hits only)
+#   agg cold — the matplotlib fallback with an empty cache
+# Each mode uses its own temporary cache directory.
+#
+#   python benchmarks/bench_chart_renderer.py [--rounds 3] [--days 90]
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+import chart_renderer
+
+
+def make_specs(rng, days: int):
+    dates = pd.date_range("2025-01-01", periods=days, freq="D")
+    reasons = [f"Reason {i}" for i in range(12)]
+    machines = [f"M{i}" for i in range(12)]
+    return [
+        {"name": "line", "kind": "line", "x_label": "date", "y_label": "quantity",
+         "x": [str(d.date()) for d in dates], "y": rng.random(days).round(2).tolist()},
+        {"name": "shift", "kind": "barh", "x_label": "percent", "y_label": "shift",
+         "x": rng.random(3).round(2).tolist(), "y": ["Day", "Night", "Swing"]},
+        {"name": "reason", "kind": "bar", "x_label": "reason", "y_label": "quantity",
+         "x": reasons, "y": rng.random(12).round(2).tolist()},
+        {"name": "machine", "kind": "bar", "x_label": "machine_name", "y_label": "quantity",
+         "x": machines, "y": rng.random(12).round(2).tolist()},
+    ]
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--days", type=int, default=90)
+    args = ap.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    out = Path(tempfile.mkdtemp())
+    results = {"serial": [], "cold": [], "warm": [], "agg cold": []}
+    for _ in range(args.rounds):
+        specs = make_specs(rng, args.days)
+        results["serial"].append(timed(lambda: [chart_renderer._render_plotly(s, str(out / f"s_{s['name']}.png"), "png")
+                                               for s in specs]))
+        chart_renderer.CACHE_DIR = Path(tempfile.mkdtemp())
+        results["cold"].append(timed(lambda: chart_renderer.render_charts(specs, out, backend="plotly")))
+        results["warm"].append(timed(lambda: chart_renderer.render_charts(specs, out, backend="plotly")))
+        chart_renderer.CACHE_DIR = Path(tempfile.mkdtemp())
+        results["agg cold"].append(timed(lambda: chart_renderer.render_charts(specs, out, backend="agg")))
+    chart_renderer.shutdown()
+
+    print(f"{'mode':>9} {'first s':>9} {'median s':>9}")
+    for mode, times in results.items():
+        print(f"{mode:>9} {times[0]:>9.3f} {np.median(times):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
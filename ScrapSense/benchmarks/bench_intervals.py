@@ -0,0 +1,56 @@
+# bench_intervals.py — speed/memory of the confidence-band modes in fit_predict_with_ci
+#
+# For each history length, fits many synthetic daily series with every
+# interval mode and reports wall time, peak traced memory and the largest
+# band difference from a reference run of the legacy bootstrap. The
+# "bootstrap" row is a second legacy run, i.e. its own run-to-run noise.
+#
+#   python benchmarks/bench_intervals.py [--series 50] [--lengths 365 1095 3650]
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from forecast import fit_predict_with_ci, INTERVAL_MODES
+
+
+def run(mode: str, series, sims: int):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = [fit_predict_with_ci(y, 7, interval=mode, sims=sims) for y in series]
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, elapsed, peak
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--series", type=int, default=50)
+    ap.add_argument("--lengths", type=int, nargs="+", default=[365, 1095, 3650])
+    ap.add_argument("--sims", type=int, default=800)
+    args = ap.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    print(f"{'n':>6} {'mode':>10} {'time ms':>10} {'peak MiB':>10} {'max |Δband|':>12}")
+    for n in args.lengths:
+        t = np.arange(n)
+        series = [100 + 0.05 * t + 25 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 10, n)
+                  for _ in range(args.series)]
+        baseline, _, _ = run("bootstrap", series, args.sims)
+        for mode in INTERVAL_MODES:
+            out, elapsed, peak = run(mode, series, args.sims)
+            diff = max(float(np.max(np.abs(np.r_[a["future_lower"] - b["future_lower"],
+                                                  a["future_upper"] - b["future_upper"]])))
+                       for a, b in zip(out, baseline))
+            print(f"{n:>6} {mode:>10} {elapsed * 1000:>10.1f} {peak / 2**20:>10.2f} {diff:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
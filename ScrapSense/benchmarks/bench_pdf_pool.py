@@ -0,0 +1,53 @@
+# bench_pdf_pool.py — PDF conversion throughput, serial vs PdfConverter pool
+#
+# Converts the same HTML report many times, first one document at a time
+# (as the old pdfkit path did) and then through PdfConverter with several
+# workers, and prints pages per second for both. Needs wkhtmltopdf on PATH
+# or in WKHTMLTOPDF_PATH.
+#
+#   python benchmarks/bench_pdf_pool.py report.html [--docs 20] [--workers 4]
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pdf_pool import PdfConverter, PdfConversionError
+
+
+def run(html: Path, docs: int, workers: int) -> dict:
+    out = Path(tempfile.mkdtemp())
+    converter = PdfConverter(workers=workers)
+    try:
+        results = converter.convert_many([(html, out / f"r{i}.pdf") for i in range(docs)])
+        stats = converter.stats()
+    finally:
+        converter.close()
+    stats["errors"] = sum("error" in r for r in results)
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("html", type=Path, help="a rendered report.html (charts beside it)")
+    ap.add_argument("--docs", type=int, default=20)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args(argv)
+
+    try:
+        rows = {"serial": run(args.html, args.docs, 1),
+                f"pool x{args.workers}": run(args.html, args.docs, args.workers)}
+    except PdfConversionError as e:
+        print(e)
+        return 1
+    print(f"{'mode':>10} {'docs':>5} {'pages':>6} {'wall s':>8} {'pages/s':>8} {'errors':>6}")
+    for mode, st in rows.items():
+        print(f"{mode:>10} {st['documents']:>5} {st['pages']:>6} {st['wall_seconds']:>8.2f} "
+              f"{st['pages_per_second']:>8.1f} {st['errors']:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+# bench_pg_pool.py — per-report cost with and without the connection pool
+#
+# Runs the report's database work (schema lookup, period aggregates, detail
+# rows, and the preview load) repeatedly, once opening a fresh connection per
+# load as before and once through PgPool with the cached schema catalog.
+# Uses the PG* environment variables; point PGHOST at a TCP host to include
+# the handshake cost a remote server would add.
+#
+#   python benchmarks/bench_pg_pool.py [--reports 50] [--start 2025-01-01] [--end 2025-03-31]
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import psycopg2
+
+from pg_pool import PgPool, connect_params
+from schema_catalog import SchemaCatalog
+from report_queries import load_report_aggregates, load_report_detail
+from generate_report import _period_delta
+
+
+def one_report(conn_for, catalog, key, start, end):
+    """The connections a report + preview used to open, each doing its own work."""
+    prev_start, _ = _period_delta(start, end)
+    for with_detail in (True, False):          # export, then a preview
+        with conn_for() as conn:
+            cols = catalog(conn, key)
+            load_report_aggregates(conn, start, end, prev_start, cols)
+            if with_detail:
+                load_report_detail(conn, start, end)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--reports", type=int, default=50)
+    ap.add_argument("--start", type=date.fromisoformat, default=date(2025, 1, 1))
+    ap.add_argument("--end", type=date.fromisoformat, default=date(2025, 3, 31))
+    args = ap.parse_args(argv)
+
+    class Fresh:
+        def __enter__(self):
+            self.conn = psycopg2.connect(**connect_params())
+            return self.conn
+
+        def __exit__(self, *exc):
+            self.conn.close()
+
+    def uncached(conn, key):
+        return SchemaCatalog(ttl=0).columns(conn, "scrap_logs", key=key)
+
+    pool = PgPool()
+    catalog = SchemaCatalog()
+
+    def cached(conn, key):
+        return catalog.columns(conn, "scrap_logs", key=key)
+
+    runs = {
+        "fresh connection": (Fresh, uncached, None),
+        "pooled + catalog": (pool.connection, cached, pool.key),
+    }
+    print(f"{'path':>18} {'p50 ms':>9} {'p95 ms':>9} {'total s':>9}")
+    for name, (conn_for, cat, key) in runs.items():
+        one_report(conn_for, cat, key, args.start, args.end)   # warm-up
+        times = []
+        for _ in range(args.reports):
+            t0 = time.perf_counter()
+            one_report(conn_for, cat, key, args.start, args.end)
+            times.append(time.perf_counter() - t0)
+        print(f"{name:>18} {np.percentile(times, 50) * 1000:>9.1f} "
+              f"{np.percentile(times, 95) * 1000:>9.1f} {sum(times):>9.2f}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
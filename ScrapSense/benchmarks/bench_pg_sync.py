@@ -0,0 +1,98 @@
+# bench_pg_sync.py — SQLite -> Postgres sync throughput across many stations
+#
+# Creates N station SQLite files with M rows each, runs one pg_sync pass into
+# the Postgres from the PG* environment, deletes a slice of rows locally and
+# syncs again, then removes everything it wrote. Prints rows per second for
+# the initial load, an incremental pass and the delete pass.
+#
+#   python benchmarks/bench_pg_sync.py [--stations 20] [--rows 50000] [--workers 8]
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pg_pool import PgPool
+from pg_sync import Station, ensure_pg_schema, sync_all
+
+PREFIX = "bench-sync-"
+
+
+def make_station(path: Path, rows: int, seed: int):
+    rng = np.random.default_rng(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE IF NOT EXISTS scrap_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, machine_operator TEXT, machine_name TEXT, date TEXT,
+        quantity REAL, unit TEXT, total_produced REAL, shift TEXT, reason TEXT, comments TEXT)""")
+    days = np.datetime64("2025-01-01") + rng.integers(0, 365, rows)
+    data = zip([f"Op{i}" for i in rng.integers(0, 12, rows)], [f"M{i}" for i in rng.integers(0, 6, rows)],
+               [f"{d[5:7]}/{d[8:10]}/{d[:4]}" for d in np.datetime_as_string(days)],   # as the entry form stores them
+               rng.gamma(2.0, 3.0, rows).round(2).tolist(), ["lbs"] * rows,
+               rng.integers(100, 1000, rows).astype(float).tolist(), rng.choice(list("ABC"), rows).tolist(),
+               rng.choice(["Jam", "Misfeed", "Setup", "Material"], rows).tolist(), [""] * rows)
+    with conn:
+        conn.executemany("""INSERT INTO scrap_logs (machine_operator, machine_name, date, quantity, unit,
+                            total_produced, shift, reason, comments) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", data)
+    conn.close()
+
+
+def timed_pass(label, stations, pool, workers, key):
+    t0 = time.perf_counter()
+    results = sync_all(stations, pool, workers)
+    wall = time.perf_counter() - t0
+    errors = [r for r in results if "error" in r]
+    n = sum(r.get(key, 0) for r in results)
+    print(f"{label:>12} {n:>10,} rows {wall:>8.2f}s {n / wall if wall else 0:>12,.0f} rows/s"
+          f"{f'  {len(errors)} errors: {errors[0]}' if errors else ''}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--stations", type=int, default=20)
+    ap.add_argument("--rows", type=int, default=50000, help="rows per station")
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args(argv)
+
+    tmp = Path(tempfile.mkdtemp())
+    paths = [tmp / f"{PREFIX}{i:03d}.db" for i in range(args.stations)]
+    t0 = time.perf_counter()
+    for i, p in enumerate(paths):
+        make_station(p, args.rows, seed=i)
+    print(f"{args.stations} stations x {args.rows:,} rows generated in {time.perf_counter() - t0:.1f}s")
+
+    pool = PgPool(minconn=1, maxconn=args.workers)
+    ensure_pg_schema(pool)
+    stations = [Station(p) for p in paths]
+    try:
+        timed_pass("initial", stations, pool, args.workers, "inserted")
+
+        for i, p in enumerate(paths):                        # a shift's worth of new rows
+            make_station(p, max(1, args.rows // 100), seed=10_000 + i)
+        timed_pass("incremental", stations, pool, args.workers, "inserted")
+
+        for st in stations:                                  # drop every 10th row
+            with st.conn:
+                st.conn.execute("DELETE FROM scrap_logs WHERE id % 10 = 0")
+        timed_pass("deletes", stations, pool, args.workers, "deleted")
+
+        timed_pass("idle", stations, pool, args.workers, "copied")
+    finally:
+        for st in stations:
+            st.close()
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM public.scrap_logs WHERE source_station LIKE %s", (PREFIX + "%",))
+                cur.execute("DELETE FROM public.scrap_sync_state WHERE station LIKE %s", (PREFIX + "%",))
+            conn.commit()
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# soak_prediction_charts.py — memory soak for the persistent prediction charts
+#
+# Drives LineChart/PieChart through many consecutive refreshes on headless
+# Agg canvases and checks that resident memory and the number of live Python
+# objects stay flat. --tracemalloc additionally tracks the Python heap (slow).
+#
+#   python benchmarks/soak_prediction_charts.py [--refreshes 1000] [--max-growth-kb 4096]
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import matplotlib
+matplotlib.use("Agg")
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from forecast import fit_predict_with_ci, MODELS
+from prediction_charts import LineChart, PieChart
+
+
+def rss_kb() -> int:
+    """Resident set size in KiB (Linux), falling back to peak RSS elsewhere."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--refreshes", type=int, default=1000)
+    ap.add_argument("--max-growth-kb", type=int, default=4096,
+                    help="allowed RSS growth between the first and last 10%% of refreshes")
+    ap.add_argument("--max-object-growth", type=int, default=2000,
+                    help="allowed growth in live Python objects over the same window")
+    ap.add_argument("--tracemalloc", action="store_true", help="also trace the Python heap")
+    args = ap.parse_args(argv)
+
+    rng = np.random.default_rng(0)
+    line = LineChart(FigureCanvasAgg(Figure(figsize=(6, 3), dpi=100)).figure)
+    pie = PieChart(FigureCanvasAgg(Figure(figsize=(5, 3), dpi=100)).figure)
+    models = list(MODELS)
+    reasons = np.array(["Misalignment", "Overheat", "Operator error", "Material defect", "Jammed sensor", "Other"])
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    samples, times = [], []
+    base_n = 90
+    for i in range(args.refreshes):
+        # Mostly same-window refreshes, with a filter change every 25th refresh
+        n = base_n if i % 25 else int(rng.integers(10, 120))
+        dates = pd.date_range("2025-01-01", periods=n, freq="D")
+        y = 100 + 20 * np.sin(np.arange(n) * 2 * np.pi / 7) + rng.normal(0, 8, n)
+        name = models[(i // 25) % len(models)]
+        model = fit_predict_with_ci(y, 7, model=name)
+        fut = pd.date_range(dates[-1] + pd.Timedelta(days=1), periods=7, freq="D")
+        k = int(rng.integers(0, len(reasons) + 1))
+
+        t0 = time.perf_counter()
+        line.update(dates, y, model, fut, unit="lbs", model_label=name)
+        pie.update(reasons[:k], rng.random(k) * 100)
+        times.append(time.perf_counter() - t0)
+
+        if i % 10 == 0:
+            gc.collect()
+            traced = tracemalloc.get_traced_memory()[0] // 1024 if args.tracemalloc else 0
+            samples.append((rss_kb(), len(gc.get_objects()), traced))
+
+    if args.tracemalloc:
+        tracemalloc.stop()
+    window = max(1, len(samples) // 10)
+    head = np.mean(samples[:window], axis=0)
+    tail = np.mean(samples[-window:], axis=0)
+    growth = tail - head
+
+    print(f"refreshes:          {args.refreshes}")
+    print(f"refresh time p50:   {np.percentile(times, 50) * 1000:.1f} ms")
+    print(f"refresh time p95:   {np.percentile(times, 95) * 1000:.1f} ms")
+    print(f"rss:                {head[0]:.0f} -> {tail[0]:.0f} KiB  ({growth[0]:+.0f} KiB)")
+    print(f"live objects:       {head[1]:.0f} -> {tail[1]:.0f}  ({growth[1]:+.0f})")
+    if args.tracemalloc:
+        print(f"traced heap:        {head[2]:.0f} -> {tail[2]:.0f} KiB  ({growth[2]:+.0f} KiB)")
+    if growth[0] > args.max_growth_kb or growth[1] > args.max_object_growth:
+        print("FAIL: memory grew across refreshes")
+        return 1
+    print("OK: memory steady")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+# suite.py — headless benchmarks for ScrapSense's data and analytics hot paths
+#
+# Generates scrap_logs datasets with datagen (cached between runs) at each
+# size, times every case a few times, writes the results as JSON and compares
+# them with a saved baseline. A case regresses when its best time is more
+# than --threshold slower than the baseline's; the run then exits with 1.
+#
+#   python benchmarks/suite.py --sizes 10k 1M 10M --out bench.json
+#   python benchmarks/suite.py --sizes 10k 1M --save-baseline benchmarks/baseline.json
+#   python benchmarks/suite.py --sizes 10k 1M --baseline benchmarks/baseline.json --threshold 0.2
+#
+# The Postgres case (load_scrap_data) runs against a separate database
+# (SCRAPSENSE_BENCH_PGDATABASE, default scrapsense_bench) on the server from
+# the PG* environment; it is created when missing. Pass --no-postgres to skip
+# it; the report cases then take the same rows from the SQLite dataset.
+# Baselines are only comparable on the same machine.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+os.environ.setdefault("SCRAPSENSE_CHART_BACKEND", "agg")    # same renderer on every machine
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+
+# -----------------
+# SETTINGS
+# -----------------
+DATA_DIR = Path(os.getenv("SCRAPSENSE_BENCH_DATA") or Path(tempfile.gettempdir()) / "scrapsense_bench")
+PG_DATABASE = os.getenv("SCRAPSENSE_BENCH_PGDATABASE") or "scrapsense_bench"
+DEFAULT_SIZES = ("10k", "1M", "10M")
+REPEAT = 3
+THRESHOLD = 0.25           # allowed slowdown vs the baseline (0.25 = 25%)
+NOISE_FLOOR = 0.002        # seconds; smaller absolute differences never count as regressions
+DATA_START, DATA_DAYS = date(2024, 1, 1), 365
+REPORT_INLINE_ROWS = 2000
+
+PG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS public.scrap_logs (
+    id serial PRIMARY KEY, machine_operator text, machine_name text, date date,
+    quantity numeric, unit text, total_produced numeric, shift text, reason text, comments text
+)
+"""
+
+
+def parse_size(text: str) -> int:
+    mult = {"k": 1_000, "m": 1_000_000}.get(text[-1].lower(), 1)
+    return int(float(text[:-1] if mult > 1 else text) * mult)
+
+
+# -----------------
+# DATASETS
+# -----------------
+def sqlite_dataset(rows: int) -> Path:
+    """SQLite file with exactly `rows` generated rows (reused when present)."""
+    import sqlite3
+    from datagen import ScrapGenerator, write_sqlite
+
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    path = DATA_DIR / f"scrap_{rows}.db"
+    if path.exists():
+        with sqlite3.connect(path) as conn:
+            if conn.execute("SELECT COUNT(*) FROM scrap_logs").fetchone()[0] == rows:
+                return path
+    write_sqlite(str(path), ScrapGenerator(start=DATA_START, days=DATA_DAYS).chunks(rows), replace=True)
+    return path
+
+
+def postgres_dataset(rows: int):
+    """Point the PG* environment at the benchmark database and load `rows` rows into it."""
+    import psycopg2
+    from psycopg2 import sql
+    from datagen import ScrapGenerator, write_postgres
+    from pg_pool import connect_params
+
+    admin = psycopg2.connect(**connect_params())
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (PG_DATABASE,))
+        if cur.fetchone() is None:
+            cur.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(PG_DATABASE)))
+    admin.close()
+
+    os.environ["PGDATABASE"] = PG_DATABASE
+    conn = psycopg2.connect(**connect_params())
+    with conn, conn.cursor() as cur:
+        cur.execute(PG_SCHEMA)
+        cur.execute("SELECT count(*) FROM public.scrap_logs")
+        current = cur.fetchone()[0]
+    conn.close()
+    if current != rows:
+        write_postgres(ScrapGenerator(start=DATA_START, days=DATA_DAYS, date_format="%Y-%m-%d").chunks(rows),
+                       replace=True)
+        conn = psycopg2.connect(**connect_params())
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE public.scrap_logs")
+        conn.close()
+
+
+# -----------------
+# CASES
+# -----------------
+# Each case: (name, needs_postgres, setup(ctx) -> callable). setup work is not timed.
+def _logs(ctx) -> pd.DataFrame:
+    """Normalized predictions-view frame for the dataset (loaded once per size)."""
+    if "logs" not in ctx:
+        import repository
+        import view_predictions
+        repository._shared = repository.SqliteRepository(str(ctx["sqlite"]))
+        ctx["logs"] = view_predictions.fetch_logs(use_snapshot=False)
+    return ctx["logs"]
+
+
+def _report_df(ctx) -> pd.DataFrame:
+    """The report's detail frame: from Postgres when loaded, else the same rows and dtypes from SQLite."""
+    if "report_df" not in ctx:
+        if ctx.get("postgres"):
+            from generate_report import load_scrap_data
+            ctx["report_df"] = load_scrap_data(DATA_START, date(2024, 12, 31))
+        else:
+            ctx["report_df"] = _report_df_sqlite(ctx)
+    return ctx["report_df"]
+
+
+def _report_df_sqlite(ctx) -> pd.DataFrame:
+    from generate_report import scrap_percent
+    from repository import SqliteRepository
+    cols = ["id", "machine_operator", "machine_name", "date", "quantity", "unit", "shift", "reason",
+            "comments", "total_produced"]
+    repo = SqliteRepository(str(ctx["sqlite"]))
+    df = repo.fetch_all({"start": DATA_START, "end": date(2024, 12, 31)}, columns=cols)
+    repo.close()
+    df["date"] = pd.to_datetime(df["date"], format="mixed").dt.date
+    df = df.sort_values(["date", "id"], ignore_index=True)
+    df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce").fillna(0)
+    df["total_produced"] = pd.to_numeric(df["total_produced"], errors="coerce")
+    df["scrap_percent"] = scrap_percent(df["quantity"], df["total_produced"])
+    df["comments"] = df["comments"].mask(df["comments"] == "")     # COPY loads empty comments as NULL
+    return df
+
+
+def _case_fetch_page(ctx):
+    from repository import SqliteRepository
+    repo = SqliteRepository(str(ctx["sqlite"]))
+    flt = {"shift": "A", "operator": "Operator 0", "start": "03/01/2024", "end": "09/30/2024"}
+    return lambda: repo.fetch_page(flt, page=3)
+
+
+def _case_fetch_logs(ctx):
+    from view_predictions import fetch_logs
+    _logs(ctx)
+    return lambda: fetch_logs(use_snapshot=False)
+
+
+def _case_snapshot_load(ctx):
+    from repository import get_repository
+    from snapshot import ColumnarSnapshot
+    from view_predictions import normalize_logs
+    _logs(ctx)                     # points the shared repository at the dataset
+    snap = ColumnarSnapshot(get_repository(), normalize_logs, root=DATA_DIR / "snapshots")
+    snap.refresh()                 # built once; the case times a no-change refresh plus the mapped load
+
+    def run():
+        snap.refresh()
+        return snap.load()
+    return run
+
+
+def _case_apply_date_preset(ctx):
+    from view_predictions import apply_date_preset
+    df = _logs(ctx).copy()
+    # move the data so it ends today and the preset keeps a realistic slice
+    df["date"] = df["date"] + (pd.Timestamp.today().normalize() - df["date"].max())
+    return lambda: apply_date_preset(df, "Last 30 Days")
+
+
+def _case_fit_predict(ctx):
+    from forecast import fit_predict_with_ci
+    from view_predictions import daily_series
+    y = daily_series(_logs(ctx))["quantity"].to_numpy()
+    return lambda: fit_predict_with_ci(y, periods_ahead=7)
+
+
+def _case_build_risk_rows(ctx):
+    from prediction_jobs import build_risk_rows, make_payload
+    p = make_payload(_logs(ctx))
+    return lambda: build_risk_rows(p["day"], p["quantity"], p["key_codes"], p["key_machines"],
+                                   p["key_shifts"], None, 50.0, 150.0)
+
+
+def _case_load_scrap_data(ctx):
+    from generate_report import load_scrap_data
+    _report_df(ctx)
+    return lambda: load_scrap_data(DATA_START, date(2024, 12, 31))
+
+
+def _case_compute_kpis(ctx):
+    from generate_report import compute_kpis
+    df = _report_df(ctx)
+    return lambda: compute_kpis(df)
+
+
+def _case_render_html(ctx):
+    from generate_report import render_report_files
+    from report_kpis import Aggregator, empty_aggregates
+    df = _report_df(ctx)
+    agg = Aggregator(df).aggregate()
+    out = Path(tempfile.mkdtemp(prefix="bench-render-"))
+    return lambda: render_report_files(df, agg, empty_aggregates(), DATA_START, date(2024, 12, 31),
+                                       out, REPORT_INLINE_ROWS, parallel_charts=False)
+
+
+CASES = [
+    ("view_log.fetch_page", False, _case_fetch_page),
+    ("view_predictions.fetch_logs", False, _case_fetch_logs),
+    ("snapshot.refresh_load", False, _case_snapshot_load),
+    ("view_predictions.apply_date_preset", False, _case_apply_date_preset),
+    ("forecast.fit_predict_with_ci", False, _case_fit_predict),
+    ("prediction_jobs.build_risk_rows", False, _case_build_risk_rows),
+    ("generate_report.load_scrap_data", True, _case_load_scrap_data),
+    ("generate_report.compute_kpis", False, _case_compute_kpis),
+    ("generate_report.render_html", False, _case_render_html),
+]
+
+
+def time_case(fn, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def run_suite(sizes, repeat: int = REPEAT, postgres: bool = True, only=None) -> dict:
+    results = {}
+    for label in sizes:
+        rows = parse_size(label)
+        t0 = time.perf_counter()
+        ctx = {"sqlite": sqlite_dataset(rows)}
+        pg_error = None
+        if postgres:
+            try:
+                postgres_dataset(rows)
+            except Exception as e:
+                pg_error = repr(e)
+        ctx["postgres"] = postgres and not pg_error
+        print(f"-- {label} ({rows:,} rows), data ready in {time.perf_counter() - t0:.1f}s")
+        for name, needs_pg, setup in CASES:
+            if only and not any(o in name for o in only):
+                continue
+            key = f"{name}@{label}"
+            if needs_pg and (not postgres or pg_error):
+                results[key] = {"skipped": pg_error or "--no-postgres"}
+                continue
+            try:
+                results[key] = dict(time_case(setup(ctx), repeat), rows=rows)
+                print(f"{key:<48} {results[key]['min'] * 1000:>10.1f} ms")
+            except Exception as e:
+                results[key] = {"error": repr(e)}
+                print(f"{key:<48} ERROR {e!r}", file=sys.stderr)
+    return results
+
+
+# -----------------
+# BASELINE
+# -----------------
+def _meta() -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                             text=True).stdout.strip() or None
+    except OSError:
+        rev = None
+    return {"created": datetime.now().isoformat(timespec="seconds"), "git": rev,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), "numpy": np.__version__, "pandas": pd.__version__}
+
+
+def compare(current: dict, baseline: dict, threshold: float = THRESHOLD) -> list:
+    """One row per case timed in both runs: (key, base_s, now_s, ratio, regressed)."""
+    rows = []
+    for key, now in current.items():
+        base = baseline.get(key)
+        if not base or "min" not in base or "min" not in now:
+            continue
+        ratio = now["min"] / base["min"] if base["min"] > 0 else float("inf")
+        regressed = ratio > 1 + threshold and now["min"] - base["min"] > NOISE_FLOOR
+        rows.append((key, base["min"], now["min"], ratio, regressed))
+    return rows
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="suite", description="ScrapSense benchmark suite.")
+    ap.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="row counts, e.g. 10k 1M 10M")
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--only", nargs="*", help="run cases whose name contains any of these")
+    ap.add_argument("--no-postgres", dest="postgres", action="store_false")
+    ap.add_argument("--out", type=Path, help="write results JSON here")
+    ap.add_argument("--baseline", type=Path, help="compare with this results JSON")
+    ap.add_argument("--save-baseline", type=Path, help="also write the results as a new baseline")
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    doc = {"meta": _meta(), "results": run_suite(args.sizes, args.repeat, args.postgres, args.only)}
+    for path in filter(None, (args.out, args.save_baseline)):
+        path.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+        print(f"results -> {path}")
+
+    status = 1 if any("error" in r for r in doc["results"].values()) else 0
+    if args.baseline:
+        if not args.baseline.exists():
+            print(f"no baseline at {args.baseline}; run with --save-baseline first", file=sys.stderr)
+            return 1
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        rows = compare(doc["results"], baseline["results"], args.threshold)
+        print(f"\n{'case':<48} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+        for key, base, now, ratio, regressed in rows:
+            print(f"{key:<48} {base * 1000:>10.1f} {now * 1000:>10.1f} {ratio:>7.2f}{'  REGRESSED' if regressed else ''}")
+        failed = [r for r in rows if r[4]]
+        if failed:
+            print(f"{len(failed)} case(s) slower than baseline by more than {args.threshold:.0%}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
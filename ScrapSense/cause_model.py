@@ -0,0 +1,167 @@
+# cause_model.py — next-period scrap cause distribution per (machine, shift)
+
+import numpy as np
+import pandas as pd
+
+
+class CauseModel:
+    """
+    Exponentially decayed scrap quantity per (machine, shift, reason).
+
+    Each log contributes `quantity * 0.5 ** (age_days / half_life_days)` to its
+    cell, with age measured from the newest date seen so far. Normalizing a
+    (machine, shift) row gives the expected cause mix for the next period.
+    New rows are folded in with `update()`: the existing matrix is decayed to
+    the new reference date and the new rows are added in one bincount.
+    """
+
+    def __init__(self, half_life_days: float = 14.0):
+        self.half_life_days = float(half_life_days)
+        self.reset()
+
+    def reset(self):
+        self.key_index = {}        # (machine_key, shift) -> row
+        self.reason_index = {}     # reason -> column
+        self.key_machine = np.array([], dtype=object)
+        self.key_shift = np.array([], dtype=object)
+        self.reasons = np.array([], dtype=object)
+        self.weights = np.zeros((0, 0))
+        self.ref_date = None
+        self.last_id = None
+        self.rows_seen = 0
+        self.id_sum = 0            # sum of the ids folded in, to spot rows deleted below last_id
+
+    # ----- Building -----
+    def fit(self, df: pd.DataFrame) -> "CauseModel":
+        self.reset()
+        return self.update(df)
+
+    def sync(self, df: pd.DataFrame) -> "CauseModel":
+        """
+        Bring the model in line with a freshly loaded `df`: only rows with an id
+        above the last one seen are added. Falls back to a full refit when the
+        rows at or below that id are no longer exactly the ones folded in
+        (count or id sum differ, i.e. rows were deleted or replaced) or the
+        table has no id column.
+        """
+        if "id" not in df.columns or self.last_id is None:
+            return self.fit(df)
+        ids = pd.to_numeric(df["id"], errors="coerce")
+        old = (ids <= self.last_id).to_numpy()
+        if int(old.sum()) != self.rows_seen or ids[old].sum() != self.id_sum:
+            return self.fit(df)
+        return self.update(df[~old & ids.notna().to_numpy()])
+
+    def update(self, df: pd.DataFrame) -> "CauseModel":
+        if df is None or df.empty:
+            return self
+        self.rows_seen += len(df)
+        if "id" in df.columns:
+            ids = pd.to_numeric(df["id"], errors="coerce")
+            self.id_sum += ids.sum()
+            max_id = ids.max()
+            if pd.notna(max_id):
+                self.last_id = max_id if self.last_id is None else max(self.last_id, max_id)
+
+        reason = df["reason"] if "reason" in df.columns else pd.Series("", index=df.index)
+        reason = reason.fillna("").astype(str).str.strip()
+        keep = (reason != "").to_numpy() & df["date"].notna().to_numpy()
+        if not keep.any():
+            return self
+        df = df[keep]
+        reason = reason[keep]
+
+        # Decay what we already have to the newest date
+        new_ref = df["date"].max()
+        if self.ref_date is None:
+            self.ref_date = new_ref
+        elif new_ref > self.ref_date:
+            self.weights *= self._decay((new_ref - self.ref_date).days)
+            self.ref_date = new_ref
+
+        # Categorical codes for keys and reasons, mapped onto the global index
+        key_codes, key_uniques = pd.factorize(
+            pd.MultiIndex.from_arrays([df["machine_key"].astype(str), df["shift"].astype(str)]))
+        reason_codes, reason_uniques = pd.factorize(reason)
+        key_map = self._extend(self.key_index, list(key_uniques))
+        reason_map = self._extend(self.reason_index, list(reason_uniques))
+        self._grow()
+
+        k = key_map[key_codes]
+        r = reason_map[reason_codes]
+        age = (self.ref_date - df["date"]).dt.days.to_numpy(dtype=float)
+        w = df["quantity"].to_numpy(dtype=float) * self._decay(age)
+
+        n_keys, n_reasons = self.weights.shape
+        self.weights += np.bincount(k * n_reasons + r, weights=w,
+                                    minlength=n_keys * n_reasons).reshape(n_keys, n_reasons)
+        return self
+
+    def _decay(self, days):
+        return 0.5 ** (np.asarray(days, dtype=float) / self.half_life_days)
+
+    @staticmethod
+    def _extend(index: dict, values: list) -> np.ndarray:
+        for v in values:
+            if v not in index:
+                index[v] = len(index)
+        return np.array([index[v] for v in values], dtype=np.int64)
+
+    def _grow(self):
+        n_keys, n_reasons = len(self.key_index), len(self.reason_index)
+        if self.weights.shape == (n_keys, n_reasons):
+            return
+        grown = np.zeros((n_keys, n_reasons))
+        grown[:self.weights.shape[0], :self.weights.shape[1]] = self.weights
+        self.weights = grown
+        keys = list(self.key_index)
+        self.key_machine = np.array([m for m, _ in keys], dtype=object)
+        self.key_shift = np.array([s for _, s in keys], dtype=object)
+        self.reasons = np.array(list(self.reason_index), dtype=object)
+
+    # ----- Queries -----
+    def distribution(self, machine_key: str, shift: str) -> pd.Series:
+        """Cause probabilities for one (machine, shift), most likely first."""
+        row = self.key_index.get((str(machine_key), str(shift)))
+        if row is None:
+            return pd.Series(dtype=float)
+        w = self.weights[row]
+        total = w.sum()
+        if total <= 0:
+            return pd.Series(dtype=float)
+        return pd.Series(w / total, index=self.reasons).sort_values(ascending=False)
+
+    def top_cause(self, machine_key: str, shift: str, default: str = "—") -> str:
+        row = self.key_index.get((str(machine_key), str(shift)))
+        if row is None or self.weights[row].sum() <= 0:
+            return default
+        return str(self.reasons[int(np.argmax(self.weights[row]))])
+
+    def top_causes(self, machine_keys, shifts, default: str = "—") -> list:
+        """Vectorized `top_cause` over parallel machine/shift sequences."""
+        rows = np.array([self.key_index.get((str(m), str(s)), -1) for m, s in zip(machine_keys, shifts)],
+                        dtype=np.int64)
+        out = np.full(len(rows), default, dtype=object)
+        known = rows >= 0
+        if known.any() and self.weights.size:
+            w = self.weights[rows[known]]
+            best = self.reasons[np.argmax(w, axis=1)]
+            out[known] = np.where(w.sum(axis=1) > 0, best, default)
+        return out.tolist()
+
+    def breakdown(self, machine_key: str | None = None, shift: str | None = None) -> pd.DataFrame:
+        """
+        Expected next-period cause mix over every (machine, shift) matching the
+        filters (None/"All" = any), as `reason` / `quantity` columns.
+        """
+        if not self.weights.size:
+            return pd.DataFrame()
+        mask = np.ones(len(self.key_machine), dtype=bool)
+        if machine_key and machine_key != "All":
+            mask &= self.key_machine == str(machine_key)
+        if shift and shift != "All":
+            mask &= self.key_shift == str(shift)
+        totals = self.weights[mask].sum(axis=0)
+        out = pd.DataFrame({"reason": self.reasons, "quantity": totals})
+        out = out[out["quantity"] > 0]
+        return out.sort_values("quantity", ascending=False).reset_index(drop=True)
@@ -0,0 +1,204 @@
+# chart_renderer.py — parallel, content-cached chart images for reports
+#
+# A chart is described by a small spec dict (kind, data, labels, size), not a
+# figure object. The spec is hashed; if an image for that hash is already in
+# the cache directory it is reused, otherwise the missing charts are rendered
+# concurrently in a long-lived process pool (so Kaleido's browser process
+# stays warm between reports). Without Kaleido, charts are drawn with
+# matplotlib's Agg backend instead.
+#
+# Spec keys:
+#   name    — output file stem ("line" -> line.png)
+#   kind    — "line" | "bar" | "barh"
+#   x, y    — JSON-serialisable lists (dates as ISO strings)
+#   x_label, y_label, width, height, scale — optional
+
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from artifact_store import STORE
+
+# -----------------
+# SETTINGS
+# -----------------
+# cached images are the artifact store's content-addressed blobs unless overridden
+CACHE_DIR = Path(os.getenv("SCRAPSENSE_CHART_CACHE") or STORE.blob_root)
+MAX_WORKERS = 4
+DEFAULT_SIZE = (680, 260)
+DEFAULT_SCALE = 2
+LINE_COLOR = "#636EFA"     # plotly's first trace colour, so both backends look alike
+RENDER_VERSION = 1         # bump when drawing code changes to invalidate cached images
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def available_backend() -> str:
+    """"plotly" when Kaleido can export static images, else "agg"."""
+    forced = os.getenv("SCRAPSENSE_CHART_BACKEND")
+    if forced in ("plotly", "agg"):
+        return forced
+    try:
+        import kaleido  # noqa: F401
+        return "plotly"
+    except Exception:
+        return "agg"
+
+
+def spec_key(spec: dict, fmt: str, backend: str) -> str:
+    payload = json.dumps([RENDER_VERSION, backend, fmt, spec], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -----------------
+# BACKENDS
+# -----------------
+def _render_plotly(spec: dict, path: str, fmt: str):
+    import pandas as pd
+    import plotly.express as px
+
+    x_label, y_label = spec.get("x_label", "x"), spec.get("y_label", "y")
+    frame = pd.DataFrame({x_label: spec["x"], y_label: spec["y"]})
+    if spec["kind"] == "line":
+        fig = px.line(frame, x=x_label, y=y_label)
+    elif spec["kind"] == "barh":
+        fig = px.bar(frame, x=x_label, y=y_label, orientation="h")
+    else:
+        fig = px.bar(frame, x=x_label, y=y_label)
+    w, h = spec.get("width", DEFAULT_SIZE[0]), spec.get("height", DEFAULT_SIZE[1])
+    fig.update_layout(margin=dict(l=10, r=10, t=10, b=10))
+    fig.write_image(path, format=fmt, width=w, height=h, scale=spec.get("scale", DEFAULT_SCALE))
+
+
+def _render_agg(spec: dict, path: str, fmt: str):
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    w, h = spec.get("width", DEFAULT_SIZE[0]), spec.get("height", DEFAULT_SIZE[1])
+    dpi = 100 * spec.get("scale", DEFAULT_SCALE)
+    fig = Figure(figsize=(w / 100, h / 100), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    x, y = spec["x"], spec["y"]
+    if spec["kind"] == "line":
+        import pandas as pd
+        ax.plot(pd.to_datetime(x) if x else [], y, color=LINE_COLOR, linewidth=1.5)
+        fig.autofmt_xdate()
+    elif spec["kind"] == "barh":
+        ax.barh([str(v) for v in y], x, color=LINE_COLOR)
+    else:
+        ax.bar([str(v) for v in x], y, color=LINE_COLOR)
+        ax.tick_params(axis="x", labelrotation=30)
+    ax.set_xlabel(spec.get("x_label", ""))
+    ax.set_ylabel(spec.get("y_label", ""))
+    ax.grid(alpha=0.3)
+    fig.tight_layout()
+    fig.savefig(path, format=fmt, dpi=dpi)
+
+
+def _cache_path(cache_dir, spec: dict, fmt: str, backend: str) -> str:
+    return os.path.join(cache_dir, f"{spec_key(spec, fmt, backend)}.{fmt}")
+
+
+def _render_one(spec: dict, cache_dir: str, fmt: str, backend: str) -> str:
+    """
+    Worker entry point; returns the cached image path. A failed plotly render
+    falls back to Agg and is stored under the Agg key, so it is not served as
+    the plotly chart once Kaleido works again.
+    """
+    if backend == "plotly":
+        path = _cache_path(cache_dir, spec, fmt, "plotly")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            _render_plotly(spec, tmp, fmt)
+            os.replace(tmp, path)     # atomic: concurrent readers never see a partial file
+            return path
+        except Exception:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+    path = _cache_path(cache_dir, spec, fmt, "agg")
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        _render_agg(spec, tmp, fmt)
+        os.replace(tmp, path)
+    return path
+
+
+# -----------------
+# PUBLIC API
+# -----------------
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            try:
+                # spawn, not fork: the caller may be the Tk app with live threads and DB connections
+                _executor = ProcessPoolExecutor(max_workers=min(MAX_WORKERS, os.cpu_count() or 1),
+                                                mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError):
+                _executor = False  # no multiprocessing here: render inline
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def render_charts(specs, out_dir, fmt: str = "png", backend: str | None = None,
+                  parallel: bool = True) -> dict:
+    """
+    Render `specs` into out_dir/<name>.<fmt>, reusing cached images for
+    unchanged specs. Returns {name: Path}. parallel=False renders in this
+    process (e.g. when already inside a worker).
+    """
+    backend = backend or available_backend()
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    cached = {spec["name"]: Path(_cache_path(CACHE_DIR, spec, fmt, backend)) for spec in specs}
+    missing = [spec for spec in specs if not cached[spec["name"]].exists()]
+
+    pool = _pool() if parallel and len(missing) > 1 else None
+    rendered = {}
+    if pool:
+        try:
+            futures = {spec["name"]: pool.submit(_render_one, spec, str(CACHE_DIR), fmt, backend) for spec in missing}
+            for name, f in futures.items():
+                rendered[name] = Path(f.result())
+        except BrokenProcessPool:
+            shutdown()        # a worker died; finish inline and start a fresh pool next time
+    for spec in missing:
+        if spec["name"] not in rendered:
+            rendered[spec["name"]] = Path(_render_one(spec, str(CACHE_DIR), fmt, backend))
+    cached.update(rendered)
+
+    out = {}
+    for spec in specs:
+        dest = out_dir / f"{spec['name']}.{fmt}"
+        try:
+            STORE.place(cached[spec["name"]], dest)    # hard link (a reference) inside the store
+        except FileNotFoundError:
+            # an artifact_store sweep evicted the blob after the exists() check: render it again
+            STORE.place(_render_one(spec, str(CACHE_DIR), fmt, backend), dest)
+        out[spec["name"]] = dest
+    return out
+
+
+def clear_cache():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
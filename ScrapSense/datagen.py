@@ -0,0 +1,234 @@
+# datagen.py — synthetic scrap_logs at realistic volume
+#
+# Generates N rows in chunks with NumPy only (no per-row Python logic) and
+# bulk-inserts them into SQLite and/or Postgres:
+#
+#   python datagen.py --rows 5000000 --sqlite big.db
+#   python datagen.py --rows 1000000 --postgres --machines 40 --days 730 --shifts 2
+#
+# The shape follows a real floor: fewer entries on weekends, a few machines
+# and a few causes account for most scrap (Zipf-like weights, and each
+# machine has its own cause ranking), operators belong to a shift, later
+# shifts are thinner (and the last one produces less), and scrap quantity is
+# lognormal with per-machine and per-cause scale.
+
+import argparse
+import io
+import sqlite3
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+# -----------------
+# SETTINGS
+# -----------------
+CHUNK_ROWS = 200_000
+SHIFTS = 3                 # default number of shifts, named A, B, C, ...
+SHIFT_DECAY = 0.75         # each shift logs this share of the previous one's entries
+LAST_SHIFT_OUTPUT = 0.8    # total_produced factor for the last shift (when there are several)
+REASONS = ("Misalignment", "Overheat", "Material defect", "Operator error", "Jammed sensor",
+           "Tool wear", "Setup scrap", "Contamination", "Power dip", "Mislabel",
+           "Dimension out of spec", "Surface scratch")
+# Monday .. Sunday
+WEEKDAY_WEIGHTS = (1.0, 1.05, 1.05, 1.0, 0.9, 0.35, 0.15)
+ZIPF_S = 1.1               # skew of machine and cause frequencies
+COMMENTS = ("", "", "", "", "", "", "recheck next shift", "supplier lot flagged", "resolved", "see maintenance log")
+COLUMNS = ("machine_operator", "machine_name", "date", "quantity", "unit",
+           "total_produced", "shift", "reason", "comments")
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrap_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    machine_operator TEXT,
+    machine_name TEXT,
+    date TEXT,
+    quantity REAL,
+    unit TEXT,
+    total_produced REAL,
+    shift TEXT,
+    reason TEXT,
+    comments TEXT
+)
+"""
+
+
+def _zipf_weights(n: int, s: float = ZIPF_S) -> np.ndarray:
+    w = 1.0 / np.arange(1, n + 1) ** s
+    return w / w.sum()
+
+
+def shift_names(n: int) -> list:
+    return [chr(ord("A") + i) if n <= 26 else f"S{i + 1}" for i in range(n)]
+
+
+def shift_weights(n: int, decay: float = SHIFT_DECAY) -> np.ndarray:
+    """Share of entries per shift: 0.43 / 0.32 / 0.24 for three shifts."""
+    w = decay ** np.arange(n)
+    return w / w.sum()
+
+
+class ScrapGenerator:
+    """Deterministic (per seed) source of scrap_logs rows, produced in column chunks."""
+
+    def __init__(self, machines: int = 12, operators: int = 30, reasons: int = len(REASONS),
+                 start: date = date(2024, 1, 1), days: int = 365, seed: int = 0,
+                 date_format: str = "%m/%d/%Y", shifts: int = SHIFTS):
+        if shifts < 1:
+            raise ValueError("shifts must be at least 1")
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+        self.machine_names = np.array([f"M{i + 1:02d}" for i in range(machines)], dtype=object)
+        self.operator_names = np.array([f"Operator {i + 1:03d}" for i in range(operators)], dtype=object)
+        self.reason_names = np.array([REASONS[i] if i < len(REASONS) else f"Cause {i + 1}"
+                                      for i in range(reasons)], dtype=object)
+        self.shift_names = np.array(shift_names(shifts), dtype=object)
+        self.shift_p = shift_weights(shifts)
+
+        # calendar: weekday seasonality plus a slow yearly swing
+        day_dates = [start + timedelta(days=i) for i in range(days)]
+        self.day_labels = np.array([d.strftime(date_format) for d in day_dates], dtype=object)
+        weekday = np.array([d.weekday() for d in day_dates])
+        w = np.asarray(WEEKDAY_WEIGHTS)[weekday] * (1 + 0.15 * np.sin(np.arange(days) * 2 * np.pi / 365))
+        self.day_p = w / w.sum()
+
+        self.machine_p = rng.permutation(_zipf_weights(machines))
+        self.machine_scale = rng.gamma(4.0, 0.25, machines)            # mean 1.0
+        # each machine ranks causes differently; rank r has Zipf weight
+        self.reason_rank_p = _zipf_weights(reasons)
+        self.reason_perm = np.argsort(rng.random((machines, reasons)), axis=1)
+        self.reason_log_mu = rng.normal(1.2, 0.5, reasons)              # cause severity
+        # operators are split across shifts
+        self.shift_operators = np.array_split(rng.permutation(operators), shifts)
+        self.comments = np.array(COMMENTS, dtype=object)
+
+    def chunk(self, n: int) -> dict:
+        """n rows as {column: ndarray}."""
+        rng = self.rng
+        day = rng.choice(len(self.day_p), n, p=self.day_p)
+        machine = rng.choice(len(self.machine_p), n, p=self.machine_p)
+        shifts = len(self.shift_p)
+        shift = rng.choice(shifts, n, p=self.shift_p)
+        rank = rng.choice(len(self.reason_rank_p), n, p=self.reason_rank_p)
+        reason = self.reason_perm[machine, rank]
+
+        operator = np.empty(n, dtype=np.int64)
+        for s, pool in enumerate(self.shift_operators):
+            m = shift == s
+            operator[m] = pool[rng.integers(0, len(pool), int(m.sum()))] if len(pool) else 0
+
+        quantity = rng.lognormal(self.reason_log_mu[reason], 0.6) * self.machine_scale[machine]
+        last = shift == shifts - 1 if shifts > 1 else np.zeros(n, dtype=bool)
+        produced = rng.integers(200, 1500, n) * np.where(last, LAST_SHIFT_OUTPUT, 1.0)
+        return {
+            "machine_operator": self.operator_names[operator],
+            "machine_name": self.machine_names[machine],
+            "date": self.day_labels[day],
+            "quantity": quantity.round(2),
+            "unit": np.full(n, "lbs", dtype=object),
+            "total_produced": produced.round(0),
+            "shift": self.shift_names[shift],
+            "reason": self.reason_names[reason],
+            "comments": self.comments[rng.integers(0, len(self.comments), n)],
+        }
+
+    def chunks(self, rows: int, chunk_rows: int = CHUNK_ROWS):
+        done = 0
+        while done < rows:
+            n = min(chunk_rows, rows - done)
+            yield self.chunk(n)
+            done += n
+
+
+# -----------------
+# WRITERS
+# -----------------
+def write_sqlite(path: str, chunks, replace: bool = False) -> int:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")        # bulk load; rerun on crash
+    if replace:
+        conn.execute("DROP TABLE IF EXISTS scrap_logs")
+    conn.execute(SQLITE_SCHEMA)
+    sql = f"INSERT INTO scrap_logs ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+    total = 0
+    try:
+        for cols in chunks:
+            with conn:
+                conn.executemany(sql, zip(*(cols[c].tolist() for c in COLUMNS)))
+            total += len(cols["date"])
+    finally:
+        conn.close()
+    return total
+
+
+def write_postgres(chunks, replace: bool = False) -> int:
+    """COPY chunks (generated with ISO dates) into public.scrap_logs in one transaction."""
+    import pandas as pd
+    import psycopg2
+    from pg_pool import connect_params
+
+    conn = psycopg2.connect(**connect_params())
+    total = 0
+    try:
+        with conn.cursor() as cur:
+            if replace:
+                cur.execute("TRUNCATE public.scrap_logs RESTART IDENTITY")
+            for cols in chunks:
+                buf = io.StringIO()
+                frame = pd.DataFrame({c: cols[c] for c in COLUMNS})
+                frame.to_csv(buf, index=False, header=False)
+                buf.seek(0)
+                cur.copy_expert(f"COPY public.scrap_logs ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+                total += len(frame)
+        conn.commit()
+    finally:
+        conn.close()
+    return total
+
+
+# -----------------
+# CLI
+# -----------------
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="datagen", description="Generate synthetic scrap_logs rows.")
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--sqlite", help="SQLite file to write (created if missing)")
+    ap.add_argument("--postgres", action="store_true", help="also COPY into Postgres (PG* environment)")
+    ap.add_argument("--replace", action="store_true", help="empty scrap_logs first")
+    ap.add_argument("--machines", type=int, default=12)
+    ap.add_argument("--operators", type=int, default=30)
+    ap.add_argument("--reasons", type=int, default=len(REASONS))
+    ap.add_argument("--shifts", type=int, default=SHIFTS, help="shifts per day, named A, B, C, ...")
+    ap.add_argument("--start", type=date.fromisoformat, default=date(2024, 1, 1))
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--chunk", type=int, default=CHUNK_ROWS)
+    args = ap.parse_args(argv)
+    if not args.sqlite and not args.postgres:
+        ap.error("give --sqlite PATH and/or --postgres")
+    if args.shifts < 1:
+        ap.error("--shifts must be at least 1")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    opts = dict(machines=args.machines, operators=args.operators, reasons=args.reasons,
+                start=args.start, days=args.days, seed=args.seed, shifts=args.shifts)
+    if args.sqlite:
+        t0 = time.perf_counter()
+        n = write_sqlite(args.sqlite, ScrapGenerator(**opts).chunks(args.rows, args.chunk), args.replace)
+        print(f"SQLite {args.sqlite}: {n:,} rows in {time.perf_counter() - t0:.1f}s")
+    if args.postgres:
+        t0 = time.perf_counter()
+        # same rows as the SQLite run, with ISO dates for the date column
+        n = write_postgres(ScrapGenerator(**opts, date_format="%Y-%m-%d").chunks(args.rows, args.chunk),
+                           args.replace)
+        print(f"Postgres: {n:,} rows in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+# forecast.py — forecasting models, interval bands and rolling-origin backtest
+
+import time
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+# -----------------
+# SETTINGS
+# -----------------
+SEASON_LENGTH = 7          # daily data, weekly seasonality
+DEFAULT_MODEL = "linear"
+
+# Confidence-band estimators for fit_predict_with_ci:
+#   "quantile"  — empirical residual quantiles (sorted lookup), O(len(resid)) memory
+#   "normal"    — analytic mean ± z·std of the residuals
+#   "stream"    — bootstrap with streamed draw counts, memory independent of sims
+#   "bootstrap" — legacy sims × n / sims × horizon draw matrices
+INTERVAL_MODES = ("quantile", "normal", "stream", "bootstrap")
+DEFAULT_INTERVAL = "quantile"
+BOOTSTRAP_SIMS = 800
+STREAM_CHUNK = 65536       # bootstrap draws generated per chunk in "stream" mode
+
+MODEL_LABELS = {
+    "linear": "Linear Trend",
+    "holt_winters": "Holt-Winters",
+    "seasonal_naive": "Seasonal Naive",
+}
+
+# Smoothing-parameter grid searched by Holt-Winters (alpha, beta, gamma)
+HW_ALPHAS = (0.1, 0.3, 0.5, 0.8)
+HW_BETAS = (0.0, 0.05, 0.2)
+HW_GAMMAS = (0.05, 0.2, 0.5)
+
+
+# -----------------
+# MODEL REGISTRY
+# -----------------
+# Every model takes (y, horizon, season) and returns (fitted, future):
+#   fitted — in-sample predictions, len(y), NaN where the model has no estimate yet
+#   future — out-of-sample forecast, len == horizon
+MODELS = {}
+
+
+def register_model(name: str):
+    def deco(fn):
+        MODELS[name] = fn
+        return fn
+    return deco
+
+
+@register_model("linear")
+def linear_trend(y: np.ndarray, horizon: int, season: int = SEASON_LENGTH):
+    x = np.arange(len(y))
+    coef = np.polyfit(x, y, 1)
+    fitted = np.polyval(coef, x)
+    future = np.polyval(coef, np.arange(len(y), len(y) + horizon))
+    return fitted, future
+
+
+@register_model("seasonal_naive")
+def seasonal_naive(y: np.ndarray, horizon: int, season: int = SEASON_LENGTH):
+    n = len(y)
+    if n <= season:
+        # Not a full season yet: fall back to a plain naive forecast
+        fitted = np.concatenate([[np.nan], y[:-1]])
+        return fitted, np.full(horizon, y[-1], dtype=float)
+    fitted = np.full(n, np.nan)
+    fitted[season:] = y[:-season]
+    last_season = y[-season:]
+    future = last_season[np.arange(horizon) % season]
+    return fitted, future
+
+
+@register_model("holt_winters")
+def holt_winters(y: np.ndarray, horizon: int, season: int = SEASON_LENGTH):
+    """
+    Additive Holt-Winters. The recursion runs once over time, vectorized over
+    the whole (alpha, beta, gamma) grid; the grid point with the lowest
+    one-step-ahead SSE is kept.
+    """
+    n = len(y)
+    seasonal = n >= 2 * season
+    a, b, g = (np.array(p, dtype=float).ravel() for p in np.meshgrid(
+        HW_ALPHAS, HW_BETAS, HW_GAMMAS if seasonal else (0.0,), indexing="ij"))
+    m = season if seasonal else 1
+
+    if seasonal:
+        level0 = y[:season].mean()
+        trend0 = (y[season:2 * season].mean() - level0) / season
+        seas0 = y[:season] - level0
+    else:
+        level0 = y[0]
+        trend0 = (y[-1] - y[0]) / max(n - 1, 1)
+        seas0 = np.zeros(1)
+
+    level = np.full(a.size, level0)
+    trend = np.full(a.size, trend0)
+    seas = np.tile(seas0, (a.size, 1))
+    fitted = np.empty((a.size, n))
+
+    for t in range(n):
+        i = t % m
+        fitted[:, t] = level + trend + seas[:, i]
+        new_level = a * (y[t] - seas[:, i]) + (1 - a) * (level + trend)
+        trend = b * (new_level - level) + (1 - b) * trend
+        seas[:, i] = g * (y[t] - new_level) + (1 - g) * seas[:, i]
+        level = new_level
+
+    warmup = season if seasonal else 1
+    sse = ((fitted[:, warmup:] - y[warmup:]) ** 2).sum(axis=1)
+    best = int(np.argmin(sse))
+
+    steps = np.arange(1, horizon + 1)
+    future = level[best] + steps * trend[best] + seas[best, (n + steps - 1) % m]
+    best_fitted = fitted[best].copy()
+    best_fitted[:warmup] = np.nan
+    return best_fitted, future
+
+
+# -----------------
+# PREDICTION WITH CONFIDENCE BANDS
+# -----------------
+def residual_quantiles(resid: np.ndarray, ci=(10, 90), interval: str = DEFAULT_INTERVAL,
+                       sims: int = BOOTSTRAP_SIMS, rng=None):
+    """
+    Lower/upper residual offsets for a band at percentiles `ci`.
+
+    Every point of a residual bootstrap resamples the same residuals, so its
+    band is the fitted value plus a quantile of the residual distribution.
+    "quantile" reads that quantile off the sorted residuals; "stream" draws
+    `sims` bootstrap samples in chunks and only keeps how often each residual
+    was drawn, then reads the quantile from the cumulative counts.
+    """
+    q = np.asarray(ci, dtype=float) / 100.0
+    if interval == "normal":
+        mu, sd = float(np.mean(resid)), float(np.std(resid, ddof=1)) if len(resid) > 1 else 0.0
+        z = np.array([NormalDist().inv_cdf(min(max(p, 1e-9), 1 - 1e-9)) for p in q])
+        return mu + z * sd
+    if interval == "stream":
+        rng = rng or np.random.default_rng()
+        ordered = np.sort(resid)
+        counts = np.zeros(len(ordered), dtype=np.int64)
+        for start in range(0, sims, STREAM_CHUNK):
+            draws = rng.integers(0, len(ordered), size=min(STREAM_CHUNK, sims - start))
+            counts += np.bincount(draws, minlength=len(ordered))
+        cdf = np.cumsum(counts) / counts.sum()
+        return ordered[np.minimum(np.searchsorted(cdf, q), len(ordered) - 1)]
+    if interval != "quantile":
+        raise ValueError(f"unknown interval mode {interval!r} (expected one of {', '.join(INTERVAL_MODES)})")
+    return np.quantile(resid, q)
+
+
+def fit_predict_with_ci(y: np.ndarray, periods_ahead: int = 7, ci=(10, 90), model: str = DEFAULT_MODEL,
+                        interval: str = DEFAULT_INTERVAL, sims: int = BOOTSTRAP_SIMS):
+    """
+    Fit the named model and derive confidence bands from its residuals
+    (see INTERVAL_MODES). Returns arrays with upper/lower confidence bounds.
+    """
+    if interval not in INTERVAL_MODES:
+        raise ValueError(f"unknown interval mode {interval!r} (expected one of {', '.join(INTERVAL_MODES)})")
+    y = np.asarray(y, dtype=float)
+    y = y[~np.isnan(y) & ~np.isinf(y)]
+
+    if len(y) == 0:
+        empty = np.array([])
+        fut = np.zeros(periods_ahead)
+        return dict(y_pred=empty, lower=empty, upper=empty,
+                    future_pred=fut, future_lower=fut, future_upper=fut,
+                    resid=np.array([0.0]), model=model)
+
+    if len(y) == 1 or np.allclose(y, y[0]):
+        const = np.full(len(y), y.mean())
+        fut_const = np.full(periods_ahead, float(y.mean()))
+        return dict(y_pred=const, lower=const, upper=const,
+                    future_pred=fut_const, future_lower=fut_const, future_upper=fut_const,
+                    resid=np.array([0.0]), model=model)
+
+    n = len(y)
+    fitted, future = MODELS.get(model, MODELS[DEFAULT_MODEL])(y, periods_ahead)
+    resid = (y - fitted)[~np.isnan(fitted)]
+    if len(resid) == 0:
+        resid = np.array([0.0])
+    if len(resid) < 5:
+        resid = np.pad(resid, (0, 5 - len(resid)), constant_values=float(np.mean(resid)))
+
+    if interval == "bootstrap":
+        boot_in = np.random.choice(resid, size=(sims, n), replace=True)
+        sim_in = fitted + boot_in
+        lower, upper = np.percentile(sim_in, ci[0], axis=0), np.percentile(sim_in, ci[1], axis=0)
+
+        boot_out = np.random.choice(resid, size=(sims, periods_ahead), replace=True)
+        sim_out = future + boot_out
+        fl, fu = np.percentile(sim_out, ci[0], axis=0), np.percentile(sim_out, ci[1], axis=0)
+    else:
+        lo, hi = residual_quantiles(resid, ci, interval, sims)
+        lower, upper = fitted + lo, fitted + hi
+        fl, fu = future + lo, future + hi
+
+    return dict(y_pred=fitted, lower=lower, upper=upper,
+                future_pred=future, future_lower=fl, future_upper=fu,
+                resid=resid, model=model)
+
+
+# -----------------
+# BACKTEST
+# -----------------
+def mape(actual: np.ndarray, pred: np.ndarray) -> float:
+    """Mean absolute percentage error over the non-zero actuals (NaN if none)."""
+    actual = np.asarray(actual, dtype=float)
+    pred = np.asarray(pred, dtype=float)
+    mask = actual != 0
+    if not mask.any():
+        return float("nan")
+    return float(np.mean(np.abs((actual[mask] - pred[mask]) / actual[mask])) * 100.0)
+
+
+def _origins(n: int, horizon: int, folds: int, min_train: int):
+    """Rolling forecast origins, oldest first, each leaving `horizon` points to test."""
+    last = n - horizon
+    return [o for o in range(last - (folds - 1) * horizon, last + 1, horizon) if o >= min_train]
+
+
+def backtest(series: dict, models=None, horizon: int = 7, folds: int = 3,
+             season: int = SEASON_LENGTH, min_train: int | None = None) -> pd.DataFrame:
+    """
+    Rolling-origin backtest. `series` maps a series name to a 1-D array of
+    daily values. Returns one row per (series, model) with the mean MAPE over
+    the folds and the total fit time in seconds.
+    """
+    models = list(models or MODELS)
+    min_train = min_train if min_train is not None else 2 * season
+    rows = []
+    for name, y in series.items():
+        y = np.asarray(y, dtype=float)
+        origins = _origins(len(y), horizon, folds, min_train)
+        if not origins:
+            continue
+        for model in models:
+            fn = MODELS[model]
+            errs, elapsed = [], 0.0
+            for o in origins:
+                t0 = time.perf_counter()
+                _, future = fn(y[:o], horizon, season)
+                elapsed += time.perf_counter() - t0
+                errs.append(mape(y[o:o + horizon], future))
+            rows.append({"series": name, "model": model,
+                         "mape": float(np.nanmean(errs)) if not np.all(np.isnan(errs)) else float("nan"),
+                         "fit_time": elapsed, "folds": len(origins)})
+    return pd.DataFrame(rows, columns=["series", "model", "mape", "fit_time", "folds"])
+
+
+def summarize_backtest(results: pd.DataFrame) -> pd.DataFrame:
+    """Per-model mean MAPE and total fit time over all series, best model first."""
+    if results.empty:
+        return results
+    return (results.groupby("model", as_index=False)
+            .agg(mape=("mape", "mean"), fit_time=("fit_time", "sum"), series=("series", "nunique"))
+            .sort_values("mape", na_position="last")
+            .reset_index(drop=True))
+
+
+def select_model(y: np.ndarray, horizon: int = 7, time_budget: float = 0.25,
+                 season: int = SEASON_LENGTH) -> str:
+    """
+    Pick the model with the lowest backtest MAPE for one series. Models are
+    tried in registry order and the search stops once `time_budget` seconds
+    are spent; anything not yet tried is skipped.
+    """
+    y = np.asarray(y, dtype=float)
+    origins = _origins(len(y), horizon, folds=3, min_train=2 * season)
+    if not origins:
+        return DEFAULT_MODEL
+
+    best, best_err = DEFAULT_MODEL, float("inf")
+    start = time.perf_counter()
+    for model, fn in MODELS.items():
+        if time.perf_counter() - start > time_budget:
+            break
+        errs = [mape(y[o:o + horizon], fn(y[:o], horizon, season)[1]) for o in origins]
+        err = float(np.nanmean(errs)) if not np.all(np.isnan(errs)) else float("inf")
+        if err < best_err:
+            best, best_err = model, err
+    return best
+
+
+if __name__ == "__main__":
+    # Backtest every machine/shift daily series in the local database
+    from view_predictions import fetch_logs, daily_series
+
+    df = fetch_logs()
+    if df.empty:
+        print("No scrap logs to backtest.")
+    else:
+        series = {f"{m} / {s}": daily_series(g)["quantity"].to_numpy(dtype=float)
+                  for (m, s), g in df.groupby(["machine_key", "shift"], observed=True)}
+        results = backtest(series)
+        print(summarize_backtest(results).to_string(index=False))
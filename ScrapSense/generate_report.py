@@ -1,7 +1,7 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-import os, tempfile, shutil, webbrowser
+import os, tempfile, shutil, time, webbrowser, base64, mimetypes
 from datetime import datetime, date, timedelta
 from pathlib import Path
 
@@ -11,14 +11,20 @@ from tkinter import ttk, filedialog, messagebox
 from tkcalendar import Calendar
 import psycopg2
 import pandas as pd
-import plotly.express as px
 
-# HTML templating (PDF is optional)
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-try:
-    import pdfkit
-except Exception:
-    pdfkit = None  # optional
+from schema_catalog import CATALOG
+from pg_pool import get_pool, connect_params, read_sql_named
+from chart_renderer import render_charts, available_backend
+from report_queries import load_report_aggregates, load_report_detail, data_version, filter_sql
+from report_cache import CACHE as REPORT_CACHE, report_key
+from artifact_store import STORE as ARTIFACTS
+from perf import span
+from report_kpis import (aggregates_from_df, empty_aggregates, kpis_from_aggregates,
+                         report_summary, scrap_percent)
+
+# HTML templating (PDF is optional: needs wkhtmltopdf)
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+from pdf_pool import find_wkhtmltopdf, get_converter, PdfConversionError
 
 # ---------- THEME ----------
 APP_BG        = "#ECF4FA"
@@ -47,6 +53,16 @@ ICON_KPI_AVGDAY    = "kpi_trend.png"
 ICON_KPI_TOPREASON = "kpi_cause.png"
 ICON_CALENDAR      = "schedule.png"
 
+# Detail rows rendered inline; the rest go to a CSV appendix (None = all inline)
+MAX_INLINE_ROWS   = int(os.getenv("SCRAPSENSE_REPORT_MAX_ROWS") or 0) or None
+TABLE_CHUNK_ROWS  = 5000
+TABLE_CSV_NAME    = "report_rows.csv"
+CACHED_PDF_NAME   = "report.pdf"
+TEMPLATE_BUFFER   = 1000   # template events joined per file write
+JINJA_CACHE_DIR   = Path(tempfile.gettempdir()) / "scrapsense_jinja"
+# Single-file HTML with base64 charts instead of PNGs beside the page
+INLINE_CHARTS     = os.getenv("SCRAPSENSE_INLINE_CHARTS", "").lower() in ("1", "true", "yes")
+
 DEFAULT_PDF_NAME  = "ScrapSense_Report.pdf"
 DEFAULT_HTML_NAME = "ScrapSense_Report.html"
 
@@ -60,39 +76,20 @@ TEMPLATE_CANDIDATES = [
 ]
 
 # ---------- DB ----------
-def _env(name: str, default: str | None = None) -> str | None:
-    v = os.getenv(name)
-    return v if (v is not None and v != "") else default
-
 def get_db_connection():
-    host = _env("PGHOST", "127.0.0.1")
-    port = int(_env("PGPORT", "5432"))
-    db   = _env("PGDATABASE", "scrapsense")
-    user = _env("PGUSER", "scrapsense")
-    pwd  = _env("PGPASSWORD", "")
-
-    return psycopg2.connect(
-        dbname=db, user=user, password=pwd,
-        host=host, port=port, connect_timeout=10,
-        sslmode=os.getenv("PGSSLMODE", "prefer"),
-    )
+    """A dedicated (unpooled) connection; report loading goes through get_pool()."""
+    return psycopg2.connect(**connect_params())
 
 def table_has_column(conn, table_name: str, column_name: str, schema: str = "public") -> bool:
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT 1
-            FROM information_schema.columns
-            WHERE table_schema=%s AND table_name=%s AND column_name=%s
-            LIMIT 1
-        """, (schema, table_name, column_name))
-        return cur.fetchone() is not None
+    return CATALOG.has_column(conn, table_name, column_name, schema)
 
 # ---------- DATA ----------
-def load_scrap_data(start_date, end_date, shift=None, operator=None, reason=None):
-    conn = get_db_connection()
-    try:
-        has_entry_type = table_has_column(conn, "scrap_logs", "entry_type")
-        has_total_prod = table_has_column(conn, "scrap_logs", "total_produced")
+def load_scrap_data(start_date, end_date, shift=None, operator=None, reason=None, machine=None):
+    pool = get_pool()
+    with pool.connection() as conn:
+        columns = CATALOG.columns(conn, "scrap_logs", key=pool.key)
+        has_entry_type = "entry_type" in columns
+        has_total_prod = "total_produced" in columns
 
         cols = [
             "id","machine_operator","machine_name",
@@ -104,79 +101,44 @@ def load_scrap_data(start_date, end_date, shift=None, operator=None, reason=None
         if has_entry_type:
             cols.append("entry_type")
 
-        where = ["date::date BETWEEN %(start)s AND %(end)s"]
-        params = {"start": start_date, "end": end_date}
-        if shift and shift != "All":
-            where.append("shift = %(shift)s"); params["shift"] = shift
-        if operator:
-            where.append("machine_operator ILIKE %(op)s"); params["op"] = f"%{operator.strip()}%"
-        if reason:
-            where.append("reason ILIKE %(re)s"); params["re"] = f"%{reason.strip()}%"
+        where, params = filter_sql(shift, operator, reason, machine)
+        where.insert(0, "date::date BETWEEN %(start)s AND %(end)s")
+        params.update({"start": start_date, "end": end_date})
 
         sql = f"SELECT {', '.join(cols)} FROM public.scrap_logs WHERE {' AND '.join(where)} ORDER BY date ASC, id ASC"
-        df = pd.read_sql_query(sql, conn, params=params)
-        if df.empty:
-            return df
-
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce").fillna(0)
-        if "total_produced" in df.columns:
-            df["total_produced"] = pd.to_numeric(df["total_produced"], errors="coerce")
-            df["scrap_percent"] = df.apply(
-                lambda r: (float(r["quantity"]) / float(r["total_produced"]) * 100.0)
-                if pd.notnull(r["total_produced"]) and float(r["total_produced"]) > 0 else None,
-                axis=1
-            )
-        return df
-    finally:
-        conn.close()
-
-def compute_kpis(df: pd.DataFrame):
+        df = read_sql_named(conn, sql, params)
     if df.empty:
-        return {"total_scrap":0.0,"entries":0,"avg_per_day":0.0,"top_reason":"—",
-                "scrap_rate":None,"total_produced":None,"finished_qty":None,
-                "top_machine":None,"top_machine_qty":None}
-
-    total = float(df["quantity"].sum())
-    entries = int(len(df))
-    per_day = df.groupby("date")["quantity"].sum()
-    avg_day = float(per_day.mean()) if not per_day.empty else 0.0
-
-    top_reason = df.groupby("reason")["quantity"].sum().sort_values(ascending=False)
-    top_reason_label = top_reason.index[0] if len(top_reason) else "—"
+        return df
 
-    total_produced = None; scrap_rate = None
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce").fillna(0)
     if "total_produced" in df.columns:
-        total_produced = pd.to_numeric(df["total_produced"], errors="coerce").dropna().sum()
-        if total_produced > 0:
-            scrap_rate = total / total_produced * 100.0
-
-    finished_qty = (total_produced - total) if (total_produced is not None) else None
-
-    by_machine = df.groupby("machine_name")["quantity"].sum().sort_values(ascending=False)
-    top_machine = by_machine.index[0] if len(by_machine) else None
-    top_machine_qty = float(by_machine.iloc[0]) if len(by_machine) else None
-
-    return {
-        "total_scrap": total,
-        "entries": entries,
-        "avg_per_day": avg_day,
-        "top_reason": top_reason_label if top_reason_label else "—",
-        "scrap_rate": scrap_rate,
-        "total_produced": total_produced,
-        "finished_qty": finished_qty,
-        "top_machine": top_machine,
-        "top_machine_qty": top_machine_qty
-    }
-
-# ---------- Helpers ----------
-def _as_uri(p: Path) -> str:
-    return p.resolve().as_uri()
+        df["total_produced"] = pd.to_numeric(df["total_produced"], errors="coerce")
+        df["scrap_percent"] = scrap_percent(df["quantity"], df["total_produced"])
+    return df
+
+def load_report_data(start_date, end_date, filters: dict | None = None, with_detail: bool = False) -> dict:
+    """
+    Server-side totals for the period and the previous period of equal length
+    ("current"/"previous"), plus the detail-table rows ("detail") if asked.
+    """
+    filters = filters or {}
+    shift, operator, reason = filters.get("shift"), filters.get("operator"), filters.get("reason")
+    machine = filters.get("machine")
+    prev_start, _ = _period_delta(start_date, end_date)
+    pool = get_pool()
+    with pool.connection() as conn:
+        columns = CATALOG.columns(conn, "scrap_logs", key=pool.key)
+        data = load_report_aggregates(conn, start_date, end_date, prev_start, columns,
+                                      shift, operator, reason, machine)
+        if with_detail:
+            data["detail"] = load_report_detail(conn, start_date, end_date, shift, operator, reason, machine)
+    return data
 
-def _save_fig(fig, path: Path, w=680, h=260, scale=2):
-    fig.update_layout(margin=dict(l=10, r=10, t=10, b=10))
-    fig.write_image(str(path), width=w, height=h, scale=scale)  # needs kaleido
+def compute_kpis(df: pd.DataFrame):
+    return kpis_from_aggregates(aggregates_from_df(df))
 
+# ---------- Helpers ----------
 def _period_delta(start_date: date, end_date: date):
     days = (end_date - start_date).days + 1
     prev_end = start_date - timedelta(days=1)
@@ -202,178 +164,261 @@ def _choose_template_name():
             return name
     return TEMPLATE_CANDIDATES[0]
 
-# Generate HTML, and optionally PDF. If PDF unavailable, can save HTML with assets.
-def generate_report(df: pd.DataFrame, start_date: date, end_date: date,
-                    save_path: str | None, filters: dict | None = None) -> tuple[str, str | None]:
-    """Returns (html_path, pdf_path_or_none)."""
-    tmpdir = Path(tempfile.mkdtemp())
+_template_env = None
+
+def _get_template_env():
+    """One Jinja environment per process; compiled templates persist on disk."""
+    global _template_env
+    if _template_env is None:
+        JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _template_env = Environment(loader=FileSystemLoader(os.path.dirname(__file__)),
+                                    autoescape=select_autoescape(['html','xml']),
+                                    bytecode_cache=FileSystemBytecodeCache(str(JINJA_CACHE_DIR)))
+    return _template_env
+
+def _table_rows(df: pd.DataFrame, cols, limit: int | None = None):
+    """Detail rows as string tuples, converted a chunk at a time."""
+    n = len(df) if limit is None else min(limit, len(df))
+    for i in range(0, n, TABLE_CHUNK_ROWS):
+        chunk = df[cols].iloc[i:min(i + TABLE_CHUNK_ROWS, n)].astype(str)
+        yield from chunk.itertuples(index=False, name=None)
+
+def _data_uri(path: Path) -> str:
+    mime = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return f"data:{mime};base64,{base64.b64encode(path.read_bytes()).decode('ascii')}"
+
+def _render_report(df: pd.DataFrame | None, start_date: date, end_date: date,
+                   filters: dict | None, max_inline_rows: int | None, tmpdir: Path,
+                   inline_charts: bool = False):
+    """Load the period totals and render the report into tmpdir."""
+    # current + previous period totals (for deltas), aggregated server-side
     try:
-        # previous period (for deltas)
-        prev_start, prev_end = _period_delta(start_date, end_date)
-        try:
-            df_prev = load_scrap_data(prev_start, prev_end,
-                                      filters.get("shift") if filters else None,
-                                      filters.get("operator") if filters else None,
-                                      filters.get("reason") if filters else None)
-        except Exception:
-            df_prev = df.iloc[0:0]
-
-        k_cur = compute_kpis(df)
-        k_prev = compute_kpis(df_prev) if df_prev is not None else {"scrap_rate": None}
-
-        scrap_pct = (f"{k_cur['scrap_rate']:.2f}%" if k_cur["scrap_rate"] is not None else "—")
-        delta_str, delta_class = _fmt_delta(k_cur["scrap_rate"], k_prev["scrap_rate"], for_scrap_percent=True)
-        trend_class = "down" if delta_class == "down" else ("up" if delta_class == "up" else "")
-        trend_arrow = "▼" if trend_class == "down" else ("▲" if trend_class == "up" else "")
-
-        hero = {
-            "scrap_pct": scrap_pct,
-            "scrap_delta": delta_str if delta_str != "—" else "n/a",
-            "trend_class": trend_class,
-            "trend_arrow": trend_arrow,
-            "finished_qty": f"{(k_cur['total_produced']-k_cur['total_scrap']):.2f}" if k_cur.get("total_produced") else "—",
-            "scrap_qty": f"{k_cur['total_scrap']:.2f}"
-        }
+        data = load_report_data(start_date, end_date, filters, with_detail=df is None)
+        agg, agg_prev = data["current"], data["previous"]
+        if df is None:
+            df = data["detail"]
+    except Exception:
+        if df is None:
+            raise
+        agg, agg_prev = aggregates_from_df(df), empty_aggregates()
+    render_report_files(df, agg, agg_prev, start_date, end_date, tmpdir, max_inline_rows,
+                        inline_charts=inline_charts)
+
+def render_report_files(df: pd.DataFrame, agg: dict, agg_prev: dict, start_date: date, end_date: date,
+                        out_dir: Path, max_inline_rows: int | None = None,
+                        parallel_charts: bool = True, timings: dict | None = None,
+                        inline_charts: bool = False):
+    """
+    Write report.html, its chart images and the optional CSV appendix into
+    out_dir from precomputed aggregates. With `inline_charts` the images are
+    embedded as data URIs instead of written beside the page. Stage
+    durations (seconds) are recorded in `timings` when given.
+    """
+    tmpdir = Path(out_dir)
+    timings = timings if timings is not None else {}
+    t0 = time.perf_counter()
+    by = agg["by"]
+    summary = report_summary(agg, agg_prev)
+    k_cur, k_prev = summary["kpis"], summary["kpis_prev"]
+
+    scrap_pct = (f"{k_cur['scrap_rate']:.2f}%" if k_cur["scrap_rate"] is not None else "—")
+    delta_str, delta_class = _fmt_delta(k_cur["scrap_rate"], k_prev["scrap_rate"], for_scrap_percent=True)
+    trend_class = "down" if delta_class == "down" else ("up" if delta_class == "up" else "")
+    trend_arrow = "▼" if trend_class == "down" else ("▲" if trend_class == "up" else "")
+
+    hero = {
+        "scrap_pct": scrap_pct,
+        "scrap_delta": delta_str if delta_str != "—" else "n/a",
+        "trend_class": trend_class,
+        "trend_arrow": trend_arrow,
+        "finished_qty": f"{(k_cur['total_produced']-k_cur['total_scrap']):.2f}" if k_cur.get("total_produced") else "—",
+        "scrap_qty": f"{k_cur['total_scrap']:.2f}"
+    }
 
-        minis = [
-            {"label":"Work Center Scrap %",   "value": scrap_pct},
-            {"label":"Work Center Scrap",     "value": f"{k_cur['total_scrap']:.2f}"},
-            {"label":"Work Center Output",    "value": f"{(k_cur['total_produced'] or 0):.2f}" if k_cur.get("total_produced") else "—"},
-            {"label":"Machine Center Scrap %","value": f"{(k_cur.get('top_machine_qty')/k_cur['total_produced']*100):.2f}%"
-                                                      if (k_cur.get('top_machine_qty') and k_cur.get('total_produced')) else "—"},
-            {"label":"Machine Center Scrap",  "value": f"{(k_cur.get('top_machine_qty') or 0):.2f}" if k_cur.get("top_machine_qty") else "—"},
-            {"label":"Top Reason",            "value": k_cur['top_reason']},
-        ]
+    minis = [
+        {"label":"Work Center Scrap %",   "value": scrap_pct},
+        {"label":"Work Center Scrap",     "value": f"{k_cur['total_scrap']:.2f}"},
+        {"label":"Work Center Output",    "value": f"{(k_cur['total_produced'] or 0):.2f}" if k_cur.get("total_produced") else "—"},
+        {"label":"Machine Center Scrap %","value": f"{(k_cur.get('top_machine_qty')/k_cur['total_produced']*100):.2f}%"
+                                                  if (k_cur.get('top_machine_qty') and k_cur.get('total_produced')) else "—"},
+        {"label":"Machine Center Scrap",  "value": f"{(k_cur.get('top_machine_qty') or 0):.2f}" if k_cur.get("top_machine_qty") else "—"},
+        {"label":"Top Reason",            "value": k_cur['top_reason']},
+    ]
+
+    # Charts -> PNG files (rendered in parallel, reused when unchanged)
+    total_q = max(agg["total_scrap"], 1)
+    sh = by["shift"].sort_values()
+    rs = by["reason"].sort_values(ascending=False).head(12)
+    mc = by["machine_name"].sort_values(ascending=False).head(12)
+    specs = [
+        {"name": "line", "kind": "line", "x_label": "date", "y_label": "quantity",
+         "x": [str(d) for d in by["date"].index], "y": by["date"].tolist()},
+        {"name": "shift", "kind": "barh", "x_label": "percent", "y_label": "shift",
+         "x": (sh * 100.0 / total_q).tolist(), "y": [str(v) for v in sh.index]},
+        {"name": "reason", "kind": "bar", "x_label": "reason", "y_label": "quantity",
+         "x": [str(v) for v in rs.index], "y": rs.tolist()},
+        {"name": "machine", "kind": "bar", "x_label": "machine_name", "y_label": "quantity",
+         "x": [str(v) for v in mc.index], "y": mc.tolist()},
+    ]
+    t1 = time.perf_counter()
+    images = render_charts(specs, tmpdir, parallel=parallel_charts)
+    t2 = time.perf_counter()
+    if inline_charts:
+        charts = {name: _data_uri(path) for name, path in images.items()}
+        for path in images.values():
+            path.unlink()
+    else:
+        charts = {name: path.name for name, path in images.items()}
+
+    # top 3 with deltas
+    def top3_rows(top):
+        out = []
+        for t in top:
+            if t["delta_pct"] is None:
+                out.append({"name":t["name"],"qty":f"{t['qty']:.2f}","delta":"new","delta_class":"up"})
+            else:
+                sign = "up" if t["delta_pct"] > 0 else ("down" if t["delta_pct"] < 0 else "neutral")
+                out.append({"name":t["name"],"qty":f"{t['qty']:.2f}",
+                            "delta":f"{'▲' if sign=='up' else ('▼' if sign=='down' else '→')} {abs(t['delta_pct']):.1f}%",
+                            "delta_class":sign})
+        while len(out) < 3:
+            out.append({"name":"—","qty":"—","delta":"—","delta_class":""})
+        return out
+
+    top3_machines = top3_rows(summary["top"]["machine_name"])
+    top3_ops      = top3_rows(summary["top"]["machine_operator"])
+
+    insights = []
+    if agg["entries"]:
+        leaders = summary["leaders"]
+        for label, dim in (("Highest Shift", "shift"), ("Top Machine", "machine_name"),
+                           ("Top Operator", "machine_operator"), ("Leading Cause", "reason")):
+            if leaders[dim]:
+                insights.append(f"{label}: <b>{leaders[dim][0]}</b> ({leaders[dim][1]:.0f})")
+        if k_cur["scrap_rate"] is not None: insights.append(f"Scrap %: <b>{k_cur['scrap_rate']:.2f}%</b>")
+
+    table_cols = [c for c in ["date","shift","machine_operator","machine_name","reason","quantity","unit","comments"] if c in df.columns]
+    table_total = len(df)
+    table_csv = None
+    if max_inline_rows is not None and table_total > max_inline_rows:
+        df[table_cols].to_csv(tmpdir / TABLE_CSV_NAME, index=False, chunksize=TABLE_CHUNK_ROWS)
+        table_csv = TABLE_CSV_NAME
+
+    # Stream the page to disk; chart images sit beside it, so links are relative
+    template = _get_template_env().get_template(_choose_template_name())
+    html_tmp = tmpdir / "report.html"
+    stream = template.stream(
+        start_date=start_date, end_date=end_date,
+        generated_at=datetime.now().strftime("%Y-%m-%d %H:%M"),
+        hero=hero, minis=minis, insights=insights, charts=charts,
+        top3_machines=top3_machines, top3_ops=top3_ops,
+        table_cols=[c.title().replace("_"," ") for c in table_cols],
+        table_data=_table_rows(df, table_cols, max_inline_rows if table_csv else None),
+        table_total=table_total, table_inline=min(table_total, max_inline_rows or table_total),
+        table_csv=table_csv,
+    )
+    stream.enable_buffering(TEMPLATE_BUFFER)
+    stream.dump(str(html_tmp), encoding="utf-8")
+    t3 = time.perf_counter()
+    timings.update(summary=t1 - t0, charts=t2 - t1, template=t3 - t2)
 
-        # Charts -> PNG files
-        ts = df.groupby("date", as_index=False)["quantity"].sum() if not df.empty else pd.DataFrame({"date":[],"quantity":[]})
-        line_fig = px.line(ts, x="date", y="quantity");      _save_fig(line_fig, tmpdir/"line.png")
-        if not df.empty and "shift" in df.columns:
-            total_q = max(df["quantity"].sum(), 1)
-            s = df.groupby("shift")["quantity"].sum()
-            sh = (s * 100.0 / total_q).reset_index(); sh.columns = ["shift","percent"]
-            shift_fig = px.bar(sh.sort_values("percent"), x="percent", y="shift", orientation="h")
-        else:
-            shift_fig = px.bar(pd.DataFrame({"percent":[],"shift":[]}), x="percent", y="shift")
-        _save_fig(shift_fig, tmpdir/"shift.png")
+def pdf_tool():
+    """Path to wkhtmltopdf when PDF export is possible, else None."""
+    return find_wkhtmltopdf()
 
-        if not df.empty and "reason" in df.columns:
-            rs = df.groupby("reason", as_index=False)["quantity"].sum()
-            reason_fig = px.bar(rs.sort_values("quantity", ascending=False).head(12), x="reason", y="quantity")
-        else:
-            reason_fig = px.bar(pd.DataFrame({"reason":[],"quantity":[]}), x="reason", y="quantity")
-        _save_fig(reason_fig, tmpdir/"reason.png")
+def write_pdf(html_path: Path, pdf_path: Path) -> dict:
+    """Convert through the shared PdfConverter pool (timeouts + retries)."""
+    return get_converter().convert(html_path, pdf_path)
 
-        if not df.empty and "machine_name" in df.columns:
-            mc = df.groupby("machine_name", as_index=False)["quantity"].sum()
-            machine_fig = px.bar(mc.sort_values("quantity", ascending=False).head(12), x="machine_name", y="quantity")
+def _report_cache_key(start_date, end_date, filters, **options):
+    """Cache key for the report, or None when the data version is unavailable."""
+    try:
+        with get_pool().connection() as conn:
+            version = data_version(conn)
+    except Exception:
+        return None
+    template = Path(os.path.dirname(__file__)) / _choose_template_name()
+    return report_key(start_date, end_date, filters, template, version, **options)
+
+# Generate HTML, and optionally PDF. If PDF unavailable, can save HTML with assets.
+def generate_report(df: pd.DataFrame | None, start_date: date, end_date: date,
+                    save_path: str | None, filters: dict | None = None,
+                    max_inline_rows: int | None = MAX_INLINE_ROWS,
+                    use_cache: bool = True,
+                    inline_charts: bool = INLINE_CHARTS) -> tuple[str, str | None]:
+    """
+    Returns (html_path, pdf_path_or_none). `df` holds the detail-table rows
+    (e.g. from a preview); pass None to fetch just those rows with the totals.
+    With `max_inline_rows`, longer tables are cut off and written in full to
+    a CSV beside the report. Unchanged reports are served from the report
+    cache (same range, filters, template and data version). With
+    `inline_charts` the HTML is a single file with the charts embedded.
+
+    Work happens in an artifact-store directory that is removed once the
+    export is saved; a browser preview keeps its directory until the store's
+    age or size limit evicts it.
+    """
+    tmpdir = ARTIFACTS.workdir()
+    keep = False
+    try:
+        key = (_report_cache_key(start_date, end_date, filters, max_inline_rows=max_inline_rows,
+                                 charts=available_backend(), inline_charts=inline_charts)
+               if use_cache else None)
+        entry = REPORT_CACHE.get(key) if key else None
+        if entry is not None:
+            files = REPORT_CACHE.files(entry)
+            for name in files:
+                shutil.copy2(entry/name, tmpdir/name)
         else:
-            machine_fig = px.bar(pd.DataFrame({"machine_name":[],"quantity":[]}), x="machine_name", y="quantity")
-        _save_fig(machine_fig, tmpdir/"machine.png")
-
-        charts = {"line": _as_uri(tmpdir/"line.png"),
-                  "shift": _as_uri(tmpdir/"shift.png"),
-                  "reason": _as_uri(tmpdir/"reason.png"),
-                  "machine": _as_uri(tmpdir/"machine.png")}
-
-        # top 3 with deltas
-        def top3_with_delta(df_now, df_prev, by):
-            if df_now.empty:
-                return [{"name":"—","qty":"—","delta":"—","delta_class":""}]*3
-            now = df_now.groupby(by)["quantity"].sum().sort_values(ascending=False).head(3)
-            prev = df_prev.groupby(by)["quantity"].sum() if not df_prev.empty else pd.Series(dtype=float)
-            out = []
-            for name, qty in now.items():
-                prev_q = float(prev.get(name, 0))
-                if prev_q == 0:
-                    out.append({"name":name,"qty":f"{float(qty):.2f}","delta":"new","delta_class":"up"})
-                else:
-                    sign = "up" if qty > prev_q else ("down" if qty < prev_q else "neutral")
-                    pct = abs((qty - prev_q)/prev_q*100.0)
-                    out.append({"name":name,"qty":f"{float(qty):.2f}",
-                                "delta":f"{'▲' if sign=='up' else ('▼' if sign=='down' else '→')} {pct:.1f}%",
-                                "delta_class":sign})
-            while len(out) < 3:
-                out.append({"name":"—","qty":"—","delta":"—","delta_class":""})
-            return out
-
-        top3_machines = top3_with_delta(df, df_prev, "machine_name")
-        top3_ops      = top3_with_delta(df, df_prev, "machine_operator")
-
-        insights = []
-        if not df.empty:
-            by_shift = df.groupby('shift')['quantity'].sum()
-            by_machine = df.groupby('machine_name')['quantity'].sum()
-            by_operator = df.groupby('machine_operator')['quantity'].sum()
-            by_reason = df.groupby('reason')['quantity'].sum()
-            if not by_shift.empty: insights.append(f"Highest Shift: <b>{by_shift.idxmax()}</b> ({by_shift.max():.0f})")
-            if not by_machine.empty: insights.append(f"Top Machine: <b>{by_machine.idxmax()}</b> ({by_machine.max():.0f})")
-            if not by_operator.empty: insights.append(f"Top Operator: <b>{by_operator.idxmax()}</b> ({by_operator.max():.0f})")
-            if not by_reason.empty: insights.append(f"Leading Cause: <b>{by_reason.idxmax()}</b> ({by_reason.max():.0f})")
-            if k_cur["scrap_rate"] is not None: insights.append(f"Scrap %: <b>{k_cur['scrap_rate']:.2f}%</b>")
-
-        table_cols = [c for c in ["date","shift","machine_operator","machine_name","reason","quantity","unit","comments"] if c in df.columns]
-        table_data = df[table_cols].astype(str).values.tolist() if not df.empty else []
-
-        env = Environment(loader=FileSystemLoader(os.path.dirname(__file__)),
-                          autoescape=select_autoescape(['html','xml']))
-        template = env.get_template(_choose_template_name())
-
-        html = template.render(
-            start_date=start_date, end_date=end_date,
-            generated_at=datetime.now().strftime("%Y-%m-%d %H:%M"),
-            hero=hero, minis=minis, insights=insights, charts=charts,
-            top3_machines=top3_machines, top3_ops=top3_ops,
-            table_cols=[c.title().replace("_"," ") for c in table_cols],
-            table_data=table_data
-        )
+            with span("report.render"):
+                _render_report(df, start_date, end_date, filters, max_inline_rows, tmpdir, inline_charts)
+            files = [f.name for f in tmpdir.iterdir()]
+            if key:
+                REPORT_CACHE.put(key, tmpdir, files)
 
-        # write temp HTML
         html_tmp = tmpdir / "report.html"
-        html_tmp.write_text(html, encoding="utf-8")
+        assets = [name for name in files if name not in ("report.html", CACHED_PDF_NAME)]
+        table_csv = TABLE_CSV_NAME if TABLE_CSV_NAME in files else None
 
         # Decide outcome
-        pdf_path = None
         if save_path and str(save_path).lower().endswith(".pdf"):
-            wkhtml = (os.getenv("WKHTMLTOPDF_PATH") or shutil.which("wkhtmltopdf"))
-            if pdfkit and wkhtml:
-                cfg = pdfkit.configuration(wkhtmltopdf=wkhtml)
-                options = {
-                    "enable-local-file-access": "",
-                    "load-error-handling": "ignore",
-                    "quiet": "",
-                    "margin-bottom": "15mm",
-                    "footer-left": "ScrapSense | Confidential",
-                    "footer-right": "Page [page] of [toPage]",
-                    "footer-font-size": "8"
-                }
-                pdfkit.from_file(str(html_tmp), save_path, configuration=cfg, options=options)
-                pdf_path = save_path
-            else:
-                # fallback: change to HTML path beside requested PDF
-                save_path = os.path.splitext(save_path)[0] + ".html"
+            wkhtml = pdf_tool()
+            if wkhtml and CACHED_PDF_NAME not in files:
+                try:
+                    with span("report.pdf"):
+                        write_pdf(html_tmp, tmpdir/CACHED_PDF_NAME)
+                    files.append(CACHED_PDF_NAME)
+                    if key:
+                        REPORT_CACHE.add_file(key, tmpdir/CACHED_PDF_NAME)
+                except PdfConversionError:
+                    wkhtml = None  # conversion kept failing: save the HTML instead
+            if wkhtml:
+                Path(save_path).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(tmpdir/CACHED_PDF_NAME, save_path)
+                if table_csv:
+                    shutil.copy2(tmpdir/table_csv, Path(save_path).parent/table_csv)
+                return str(save_path), str(save_path)
+            # fallback: change to HTML path beside requested PDF
+            save_path = os.path.splitext(save_path)[0] + ".html"
 
         if save_path and str(save_path).lower().endswith(".html"):
-            # copy html + chart images next to it, and rewrite srcs to filenames
+            # copy html + chart images (+ CSV appendix) next to it
             out = Path(save_path)
             out.parent.mkdir(parents=True, exist_ok=True)
-            # rewrite src to filenames
-            html_local = html.replace(str(charts["line"]), "line.png") \
-                             .replace(str(charts["shift"]), "shift.png") \
-                             .replace(str(charts["reason"]), "reason.png") \
-                             .replace(str(charts["machine"]), "machine.png")
-            out.write_text(html_local, encoding="utf-8")
-            for name in ["line.png","shift.png","reason.png","machine.png"]:
+            shutil.copyfile(html_tmp, out)
+            for name in assets:
                 shutil.copy2(tmpdir/name, out.parent/name)
-            return str(out), pdf_path
+            return str(out), None
 
-        # no save path: open temp HTML in browser
+        # no save path: open the HTML in the browser; the store evicts it later
+        keep = True
         webbrowser.open_new_tab(html_tmp.as_uri())
-        return str(html_tmp), pdf_path
-
+        return str(html_tmp), None
     finally:
-        # keep tmpdir if we returned temp HTML path; otherwise, safe to remove
-        pass  # temp cleaned by OS; do not force-delete to keep temp HTML viewable
+        if keep:
+            ARTIFACTS.done(tmpdir)
+        else:
+            ARTIFACTS.release(tmpdir)
 
 
 # ---------- TK UI ----------
@@ -395,6 +440,7 @@ class GenerateReportFrame(tk.Frame):
         super().__init__(parent, bg=APP_BG)
         self.controller = controller
         self.current_df = pd.DataFrame()
+        self._preview_key = None     # filters + data version of what the table shows
         self._calendar_imgs = []
         self._init_style()
         self._build()
@@ -580,10 +626,17 @@ class GenerateReportFrame(tk.Frame):
     def on_preview(self):
         flt = self._get_filters()
         if not flt: return
-        df = load_scrap_data(flt["start"], flt["end"], flt["shift"], flt["operator"], flt["reason"])
+        key = _report_cache_key(flt["start"], flt["end"], flt, kind="preview")
+        if key and key == self._preview_key:
+            return  # same filters and unchanged data: the table and KPIs are current
+        with span("report.preview_db"):
+            df = load_scrap_data(flt["start"], flt["end"], flt["shift"], flt["operator"], flt["reason"])
         self.current_df = df
-        self._populate_table(df)
-        k = compute_kpis(df)
+        self._preview_key = key
+        with span("report.preview_render"):
+            self._populate_table(df)
+        with span("report.kpis"):
+            k = compute_kpis(df)
         self.kpi_vars["total"].set(f"{k['total_scrap']:.2f}")
         self.kpi_vars["entries"].set(str(k["entries"]))
         self.kpi_vars["avg"].set(f"{k['avg_per_day']:.2f}")
@@ -607,11 +660,11 @@ class GenerateReportFrame(tk.Frame):
             messagebox.showwarning("No Data", "Preview data first (or no rows matched your filters).")
             return
         # Offer PDF or HTML filename; default to PDF if tool exists
-        wkhtml = (os.getenv("WKHTMLTOPDF_PATH") or shutil.which("wkhtmltopdf"))
-        default_name = DEFAULT_PDF_NAME if (pdfkit and wkhtml) else DEFAULT_HTML_NAME
+        wkhtml = pdf_tool()
+        default_name = DEFAULT_PDF_NAME if wkhtml else DEFAULT_HTML_NAME
 
         path = filedialog.asksaveasfilename(
-            defaultextension=".pdf" if (pdfkit and wkhtml) else ".html",
+            defaultextension=".pdf" if wkhtml else ".html",
             filetypes=[("PDF files","*.pdf"), ("HTML files","*.html")],
             initialfile=default_name,
             title="Save Report"
@@ -623,13 +676,14 @@ class GenerateReportFrame(tk.Frame):
         if not flt: return
 
         try:
-            html_path, pdf_path = generate_report(
-                df=self.current_df,
-                start_date=flt["start"],
-                end_date=flt["end"],
-                save_path=path,
-                filters={"shift": flt["shift"], "operator": flt["operator"], "reason": flt["reason"]}
-            )
+            with span("report.export"):
+                html_path, pdf_path = generate_report(
+                    df=self.current_df,
+                    start_date=flt["start"],
+                    end_date=flt["end"],
+                    save_path=path,
+                    filters={"shift": flt["shift"], "operator": flt["operator"], "reason": flt["reason"]}
+                )
             if pdf_path:
                 messagebox.showinfo("Success", f"PDF saved to:\n{pdf_path}")
             else:
@@ -640,6 +694,12 @@ class GenerateReportFrame(tk.Frame):
 
 
 if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1:
+        # headless bulk mode, see report_batch.py
+        from report_batch import main
+        sys.exit(main(sys.argv[1:]))
+
     root = tk.Tk()
     root.title("ScrapSense - Generate Report")
     root.configure(bg=APP_BG)
@@ -1,6 +1,7 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import argparse
 import os
 import tkinter as tk
 from PIL import Image, ImageTk
@@ -8,6 +9,8 @@ from PIL import Image, ImageTk
 from dashboard import DashboardFrame
 from view_log import ViewLogFrame
 from addscrap import AddScrapFrame
+from perf import METRICS, MetricsExporter
+from watchdog import StallWatchdog
 
 try:
     from view_predictions import ViewPredictionsFrame
@@ -66,6 +69,57 @@ class Tooltip:
             self.tipwindow = None
 
 
+class PerfOverlay:
+    """Always-on-top p50/p95/p99 table for every timing span (toggle with F12)."""
+
+    REFRESH_MS = 500
+
+    def __init__(self, root):
+        self.root = root
+        self.win = None
+        self.label = None
+        self._job = None
+
+    def toggle(self, event=None):
+        if self.win:
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        self.win = tw = tk.Toplevel(self.root)
+        tw.wm_overrideredirect(True)
+        tw.attributes("-topmost", True)
+        self.label = tk.Label(
+            tw, justify="left", anchor="nw",
+            background="#111827", foreground="#D1FAE5",
+            font=("Consolas", 9), padx=8, pady=6
+        )
+        self.label.pack()
+        self._refresh()
+
+    def hide(self):
+        if self._job:
+            self.root.after_cancel(self._job)
+            self._job = None
+        if self.win:
+            self.win.destroy()
+            self.win = None
+
+    def _refresh(self):
+        snap = METRICS.snapshot()
+        lines = [f"{'span':<26}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}"]
+        for name, m in snap.items():
+            lines.append(f"{name[:25]:<26}{m['count']:>6}{m['p50']:>9.1f}{m['p95']:>9.1f}{m['p99']:>9.1f}")
+        if not snap:
+            lines.append("(no samples yet)")
+        self.label.config(text="\n".join(lines) + f"\n(ms, last {METRICS.window} per span)")
+        self.win.update_idletasks()
+        x = self.root.winfo_rootx() + self.root.winfo_width() - self.win.winfo_reqwidth() - 12
+        self.win.wm_geometry(f"+{max(0, x)}+{self.root.winfo_rooty() + 12}")
+        self._job = self.root.after(self.REFRESH_MS, self._refresh)
+
+
 class ScrapSenseApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -89,6 +143,9 @@ class ScrapSenseApp(tk.Tk):
         self._build_container()
         self.show_frame("Dashboard")
 
+        self.perf_overlay = PerfOverlay(self)
+        self.bind_all("<F12>", self.perf_overlay.toggle)
+
     # ---------- Sidebar ----------
     def _build_sidebar(self):
         self.sidebar = tk.Frame(self, bg=SIDEBAR_BG, width=80)
@@ -192,6 +249,33 @@ class ScrapSenseApp(tk.Tk):
             frame.tkraise()
 
 
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="scrapsense")
+    ap.add_argument("--memprofile", action="store_true",
+                    help="track memory growth and write a leak report on exit")
+    ap.add_argument("--memprofile-interval", type=float, default=None, help="seconds between samples")
+    return ap.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    profiler = None
+    if args.memprofile:
+        from memprofile import MemProfiler, INTERVAL
+        profiler = MemProfiler(args.memprofile_interval or INTERVAL).start()
+    exporter = MetricsExporter().start()
+    # started before the window is built, so slow start-up work is reported too
+    watchdog = StallWatchdog().start()
     app = ScrapSenseApp()
-    app.mainloop()
+    watchdog.attach(app)
+    if profiler:
+        profiler.attach(app)
+    try:
+        app.mainloop()
+    finally:
+        watchdog.stop()
+        exporter.stop()
+        if profiler:
+            report = profiler.stop()
+            if report:
+                print(f"Memory report: {report}")
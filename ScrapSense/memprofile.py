@@ -0,0 +1,352 @@
+# memprofile.py — memory growth tracking for long-running sessions
+#
+#   python main.py --memprofile [--memprofile-interval 300]
+#
+# Starts tracemalloc before the window is built. Once the frames exist, a
+# background thread wakes every INTERVAL seconds and records:
+#
+#   * tracemalloc totals per allocating line, diffed against the previous
+#     sample (top growth only)
+#   * per frame of ScrapSenseApp: live Tk widgets, matplotlib figures whose
+#     canvas sits inside the frame, and the size of DataFrames held as frame
+#     attributes (df, df_raw, current_df, ...)
+#   * live PhotoImage objects and figures across the whole app
+#
+# Samples are appended to samples.jsonl. The last sample is taken when the
+# window is closed (attach() installs a WM_DELETE_WINDOW handler), before
+# Tk.destroy() empties the widget tree: on a helper thread while the window
+# shows "Writing memory report…", so the Tk loop keeps running. If a periodic
+# sample is still in progress it becomes the last one instead. On exit a leak report compares the
+# first sample with the last one, by line, by file, and by the innermost
+# ScrapSense line on each allocation's stack (not just the pandas or
+# matplotlib line that made it); anything that grew in most intervals is
+# listed as a suspected leak. Only per-line totals are kept between samples,
+# never whole snapshots; grouping a snapshot still takes seconds on a large
+# heap, which is why the default interval is long. Everything is read from
+# Python-side state (tkinter's children dicts, gc), so the sampler never
+# calls into Tcl from its thread.
+
+import gc
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import pandas as pd
+
+# -----------------
+# SETTINGS
+# -----------------
+INTERVAL = float(os.getenv("SCRAPSENSE_MEMPROFILE_INTERVAL") or 300)
+OUT_DIR = Path(os.getenv("SCRAPSENSE_MEMPROFILE_DIR") or Path(tempfile.gettempdir()) / "scrapsense_mem")
+TRACE_FRAMES = 10          # stack depth kept per allocation (for app-line attribution)
+TOP_LINES = 25             # lines / files listed per diff
+LEAK_RATIO = 0.75          # share of intervals an item must grow in to be a suspected leak
+LEAK_MIN_BYTES = 256 * 1024
+STOP_TIMEOUT = 120.0       # seconds to wait on exit for a sample in progress
+CLOSE_JOIN = 0.5           # seconds the window close waits for one (on the Tk thread)
+CLOSE_POLL_MS = 100
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+_MB = 1024 * 1024
+
+
+def _filters():
+    return [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__, all_frames=True),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+
+def _short(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, "lib" + os.sep + "python"):
+        i = filename.rfind(marker)
+        if i >= 0:
+            return filename[i + len(marker):]
+    return os.path.relpath(filename, APP_DIR) if filename.startswith(APP_DIR) else filename
+
+
+def _line_stats(snapshot) -> dict:
+    """{"file.py:line": (bytes, blocks)} by allocating line."""
+    return {f"{_short(st.traceback[0].filename)}:{st.traceback[0].lineno}": (st.size, st.count)
+            for st in snapshot.statistics("lineno")}
+
+
+def _by_app_line(snapshot) -> dict:
+    """{"file.py:line": bytes} keyed by the innermost ScrapSense frame of each allocation."""
+    out = defaultdict(int)
+    for st in snapshot.statistics("traceback"):
+        key = "(outside app code)"
+        for frame in reversed(st.traceback):         # innermost first
+            if frame.filename.startswith(APP_DIR):
+                key = f"{_short(frame.filename)}:{frame.lineno}"
+                break
+        out[key] += st.size
+    return out
+
+
+def _growth(new: dict, old: dict) -> list:
+    """[(key, size diff, count diff)] for keys that grew, largest first."""
+    out = []
+    for key, (size, count) in new.items():
+        size0, count0 = old.get(key, (0, 0))
+        if size > size0:
+            out.append((key, size - size0, count - count0))
+    out.sort(key=lambda d: d[1], reverse=True)
+    return out
+
+
+def _by_file(lines: dict) -> dict:
+    out = defaultdict(lambda: (0, 0))
+    for key, (size, count) in lines.items():
+        size0, count0 = out[key.rsplit(":", 1)[0]]
+        out[key.rsplit(":", 1)[0]] = (size0 + size, count0 + count)
+    return dict(out)
+
+
+def _walk(widget):
+    stack = [widget]
+    while stack:
+        w = stack.pop()
+        yield w
+        stack.extend(list(w.children.values()))
+
+
+def _of_type(*types) -> list:
+    return [o for o in gc.get_objects() if isinstance(o, types)]
+
+
+def _loaded(module: str, name: str) -> list:
+    """[class] if the app has imported `module` (the profiler never imports it itself)."""
+    mod = sys.modules.get(module)
+    return [getattr(mod, name)] if mod is not None and hasattr(mod, name) else []
+
+
+def _photo_types() -> tuple:
+    return tuple(_loaded("tkinter", "PhotoImage") + _loaded("PIL.ImageTk", "PhotoImage"))
+
+
+def _figure_types() -> tuple:
+    return tuple(_loaded("matplotlib.figure", "Figure"))
+
+
+class MemProfiler:
+    def __init__(self, interval: float = INTERVAL, out_dir=OUT_DIR):
+        self.interval = interval
+        self.dir = Path(out_dir) / time.strftime("%Y%m%d-%H%M%S")
+        self.app = None
+        self.samples = []          # dicts written to samples.jsonl
+        self._first = None         # {"lines", "app"} totals at attach
+        self._prev = None          # line totals of the previous sample
+        self._last_app = None
+        self._grew = Counter()     # line / frame metric -> intervals it grew in
+        self._stop = threading.Event()
+        self._thread = None
+        self._finished = False     # final sample taken (or skipped)
+        self._closing = False
+        self._status = None        # "Writing memory report…" label, left out of the widget counts
+
+    def start(self):
+        """Begin tracing; call before the window is built so start-up allocations are tagged too."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def attach(self, app):
+        """Take the baseline once the frames exist, start sampling, and sample again on window close."""
+        self.app = app
+        app.protocol("WM_DELETE_WINDOW", self.close_window)
+        self._thread = threading.Thread(target=self._run, name="memprofile", daemon=True)
+        self._thread.start()
+        return self
+
+    def close_window(self):
+        """
+        WM_DELETE_WINDOW handler: final sample while the widgets still exist,
+        then destroy the app. The sample runs on a helper thread; the Tk loop
+        polls it so the window keeps repainting.
+        """
+        if self._closing:
+            return
+        self._closing = True
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=CLOSE_JOIN)
+            if self._thread.is_alive():
+                # a sample is in progress and will be the last one; sampling now would race it
+                self._finished = True
+                self._write({"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                             "note": "final sample skipped: a sample was in progress at window close"})
+                self.app.destroy()
+                return
+            self._thread = None
+        self._show_status("Writing memory report…")
+        worker = threading.Thread(target=self.finish, name="memprofile-final", daemon=True)
+        worker.start()
+
+        def wait():
+            if worker.is_alive():
+                self.app.after(CLOSE_POLL_MS, wait)
+            else:
+                self.app.destroy()
+        wait()
+
+    def _show_status(self, text: str):
+        import tkinter as tk
+        self.app.title(f"{self.app.title()} — {text}")
+        self._status = tk.Label(self.app, text=text, bg="#0F172A", fg="white", padx=16, pady=8,
+                                font=("Segoe UI", 12))
+        self._status.place(relx=0.5, rely=0.5, anchor="center")
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:         # diagnostics must never take the app down
+                self._write({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "error": repr(e)})
+            if self._stop.wait(self.interval):
+                break
+
+    # -----------------
+    # SAMPLING
+    # -----------------
+    def _frame_stats(self) -> dict:
+        fig_types, photo_types = _figure_types(), _photo_types()
+        figures = _of_type(*fig_types) if fig_types else []
+        fig_paths = []
+        for fig in figures:
+            widget = getattr(getattr(fig, "canvas", None), "get_tk_widget", None)
+            fig_paths.append(widget()._w if widget else None)
+
+        stats = {}
+        claimed = set()
+        for name, frame in getattr(self.app, "frames", {}).items():
+            widgets = list(_walk(frame))
+            claimed.update(id(w) for w in widgets)
+            prefix = frame._w + "."
+            frames_df = [v for v in list(vars(frame).values()) if isinstance(v, pd.DataFrame)]
+            stats[name] = {
+                "widgets": len(widgets),
+                "figures": sum(1 for p in fig_paths if p and p.startswith(prefix)),
+                "dataframes_mb": round(sum(int(df.memory_usage(index=True).sum()) for df in frames_df) / _MB, 3),
+                "by_class": dict(Counter(type(w).__name__ for w in widgets).most_common(6)),
+            }
+        others = [w for w in _walk(self.app)
+                  if id(w) not in claimed and w is not self.app and w is not self._status]
+        stats["(other)"] = {"widgets": len(others), "figures": sum(1 for p in fig_paths if p is None)}
+        return {"frames": stats, "figures": len(figures), "images": len(_of_type(*photo_types)) if photo_types else 0}
+
+    def sample(self, final: bool = False) -> dict:
+        snap = tracemalloc.take_snapshot().filter_traces(_filters())
+        current, peak = tracemalloc.get_traced_memory()
+        entry = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "traced_mb": round(current / _MB, 2), "peak_mb": round(peak / _MB, 2)}
+        entry.update(self._frame_stats())
+        lines = _line_stats(snap)
+
+        if self._first is None:
+            self._first = {"lines": lines, "app": _by_app_line(snap)}
+        else:
+            diff = _growth(lines, self._prev)
+            entry["top_lines"] = [[key, round(size / 1024, 1), count] for key, size, count in diff[:TOP_LINES]]
+            for key, _, _ in diff:
+                self._grew[key] += 1
+            last = self.samples[-1]
+            for name, s in entry["frames"].items():
+                for key in ("widgets", "figures", "dataframes_mb"):
+                    if s.get(key, 0) > last["frames"].get(name, {}).get(key, 0):
+                        self._grew[f"{name}.{key}"] += 1
+            for key in ("images", "figures"):
+                if entry[key] > last[key]:
+                    self._grew[key] += 1
+        if final:
+            self._last_app = _by_app_line(snap)
+        del snap
+        self._prev = lines
+        self.samples.append(entry)
+        self._write(entry)
+        return entry
+
+    def _write(self, entry: dict):
+        with open(self.dir / "samples.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+
+    # -----------------
+    # LEAK REPORT
+    # -----------------
+    def finish(self):
+        """Stop the sampler and take the final sample (once)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=STOP_TIMEOUT)     # let a sample in progress finish
+            self._thread = None
+        if self._first is not None and not self._finished:
+            self._finished = True
+            try:
+                self.sample(final=True)
+            except Exception as e:
+                self._write({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "error": repr(e)})
+
+    def stop(self) -> Path | None:
+        """Final sample (unless the window close took it), then write leak_report.txt. Returns its path."""
+        self.finish()
+        if self._first is None:
+            return None
+        path = self.dir / "leak_report.txt"
+        path.write_text(self.report(), encoding="utf-8")
+        tracemalloc.stop()
+        return path
+
+    def report(self) -> str:
+        first_lines, last_lines = self._first["lines"], self._prev
+        first, last = self.samples[0], self.samples[-1]
+        intervals = max(1, len(self.samples) - 1)
+        out = [f"ScrapSense memory report: {first['time']} to {last['time']}, "
+               f"{len(self.samples)} samples every {self.interval:g} s",
+               f"traced: {first['traced_mb']:.1f} MB -> {last['traced_mb']:.1f} MB (peak {last['peak_mb']:.1f} MB)",
+               f"figures: {first['figures']} -> {last['figures']}   images: {first['images']} -> {last['images']}",
+               ""]
+
+        out.append("Growth by line (allocating line):")
+        by_line = _growth(last_lines, first_lines)
+        for key, size, count in by_line[:TOP_LINES]:
+            out.append(f"  {size / _MB:+9.2f} MB {count:+9d} blocks  {key}")
+
+        out += ["", "Growth by file:"]
+        for key, size, _ in _growth(_by_file(last_lines), _by_file(first_lines))[:TOP_LINES]:
+            out.append(f"  {size / _MB:+9.2f} MB  {key}")
+
+        out += ["", "Growth by ScrapSense line (innermost app frame on the allocation's stack):"]
+        first_app, last_app = self._first["app"], self._last_app or {}
+        growth = sorted(((last_app[k] - first_app.get(k, 0), k) for k in last_app), reverse=True)
+        for size, key in [g for g in growth if g[0] > 0][:TOP_LINES]:
+            out.append(f"  {size / _MB:+9.2f} MB  {key}")
+
+        out += ["", f"{'Frame':<20}{'widgets':>18}{'figures':>12}{'dataframes MB':>22}"]
+        for name, s in last["frames"].items():
+            f0 = first["frames"].get(name, {})
+            out.append(f"{name:<20}{f0.get('widgets', 0):>8} -> {s['widgets']:<6}"
+                       f"{f0.get('figures', 0):>4} -> {s['figures']:<4}"
+                       f"{f0.get('dataframes_mb', 0):>10.2f} -> {s.get('dataframes_mb', 0):<8.2f}")
+
+        out += ["", f"Suspected leaks (grew in >= {LEAK_RATIO:.0%} of {intervals} intervals):"]
+        line_growth = {key: size for key, size, _ in by_line}
+        suspects = []
+        for key, n in self._grew.most_common():
+            if n / intervals < LEAK_RATIO or intervals < 2:
+                continue
+            if key in line_growth:
+                if line_growth[key] >= LEAK_MIN_BYTES:
+                    suspects.append(f"  {key}  {line_growth[key] / _MB:+.2f} MB, grew in {n} intervals")
+            else:
+                suspects.append(f"  {key}  grew in {n} intervals")
+        out += suspects or ["  none"]
+        return "\n".join(out) + "\n"
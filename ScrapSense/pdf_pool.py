@@ -0,0 +1,175 @@
+# pdf_pool.py — concurrent HTML -> PDF conversion with wkhtmltopdf
+#
+# PdfConverter keeps a bounded set of worker threads, each driving one
+# wkhtmltopdf subprocess at a time, so many reports convert concurrently
+# without oversubscribing the machine. Every conversion has a timeout (the
+# process is killed when it hangs) and is retried with a short backoff.
+# The converter counts documents, pages and busy time so callers can report
+# throughput in pages per second.
+
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# -----------------
+# SETTINGS
+# -----------------
+PDF_WORKERS = int(os.getenv("SCRAPSENSE_PDF_WORKERS") or min(4, os.cpu_count() or 1))
+PDF_TIMEOUT = float(os.getenv("SCRAPSENSE_PDF_TIMEOUT") or 120)    # seconds per attempt
+PDF_RETRIES = 2            # extra attempts after a failure or timeout
+RETRY_BACKOFF = 0.5        # seconds, doubled after each failed attempt
+
+# wkhtmltopdf options used for every report
+PDF_OPTIONS = {
+    "enable-local-file-access": "",
+    "load-error-handling": "ignore",
+    "quiet": "",
+    "margin-bottom": "15mm",
+    "footer-left": "ScrapSense | Confidential",
+    "footer-right": "Page [page] of [toPage]",
+    "footer-font-size": "8",
+}
+
+_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+
+class PdfConversionError(RuntimeError):
+    pass
+
+
+class PdfToolError(PdfConversionError):
+    """wkhtmltopdf could not be started at all (missing or not executable); not retried."""
+
+
+def find_wkhtmltopdf() -> str | None:
+    return os.getenv("WKHTMLTOPDF_PATH") or shutil.which("wkhtmltopdf")
+
+
+def count_pages(pdf_path) -> int:
+    """Page objects in a PDF (wkhtmltopdf writes them uncompressed)."""
+    with open(pdf_path, "rb") as f:
+        return len(_PAGE_RE.findall(f.read()))
+
+
+def _command(wkhtml: str, options: dict, html_path, pdf_path) -> list:
+    cmd = [wkhtml]
+    for key, value in options.items():
+        cmd.append(f"--{key}")
+        if value != "":
+            cmd.append(str(value))
+    return cmd + [str(html_path), str(pdf_path)]
+
+
+class PdfConverter:
+    def __init__(self, wkhtml: str | None = None, workers: int = PDF_WORKERS, timeout: float = PDF_TIMEOUT,
+                 retries: int = PDF_RETRIES, options: dict | None = None):
+        self.wkhtml = wkhtml or find_wkhtmltopdf()
+        if not self.wkhtml:
+            raise PdfConversionError("wkhtmltopdf not found (set WKHTMLTOPDF_PATH)")
+        self.timeout = timeout
+        self.retries = retries
+        self.options = dict(PDF_OPTIONS if options is None else options)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pdf")
+        self._lock = threading.Lock()
+        self._stats = {"documents": 0, "pages": 0, "failures": 0, "retries": 0, "busy_seconds": 0.0}
+        self._started = None
+
+    # ----- one document -----
+    def _attempt(self, html_path, pdf_path):
+        tmp = Path(f"{pdf_path}.part")
+        try:
+            proc = subprocess.Popen(_command(self.wkhtml, self.options, html_path, tmp),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise PdfToolError(f"cannot run wkhtmltopdf at {self.wkhtml!r}: {e}") from e
+        try:
+            _, err = proc.communicate(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            tmp.unlink(missing_ok=True)
+            raise PdfConversionError(f"wkhtmltopdf timed out after {self.timeout:.0f}s")
+        # exit code 1 with output is wkhtmltopdf's "finished with load errors", which we ignore
+        if proc.returncode not in (0, 1) or not tmp.exists() or tmp.stat().st_size == 0:
+            tmp.unlink(missing_ok=True)
+            msg = err.decode("utf-8", "replace").strip().splitlines()[-1:] or ["no output"]
+            raise PdfConversionError(f"wkhtmltopdf exited with {proc.returncode}: {msg[0]}")
+        os.replace(tmp, pdf_path)
+
+    def _convert(self, html_path, pdf_path) -> dict:
+        t0 = time.perf_counter()
+        delay = RETRY_BACKOFF
+        for attempt in range(self.retries + 1):
+            try:
+                self._attempt(html_path, pdf_path)
+                break
+            except PdfConversionError as e:
+                if attempt == self.retries or isinstance(e, PdfToolError):
+                    with self._lock:
+                        self._stats["failures"] += 1
+                    raise
+                with self._lock:
+                    self._stats["retries"] += 1
+                time.sleep(delay)
+                delay *= 2
+        elapsed = time.perf_counter() - t0
+        pages = count_pages(pdf_path)
+        with self._lock:
+            self._stats["documents"] += 1
+            self._stats["pages"] += pages
+            self._stats["busy_seconds"] += elapsed
+        return {"pdf": str(pdf_path), "pages": pages, "attempts": attempt + 1, "seconds": elapsed}
+
+    # ----- public API -----
+    def submit(self, html_path, pdf_path):
+        """Queue one conversion; returns a Future of {"pdf", "pages", "attempts", "seconds"}."""
+        with self._lock:
+            if self._started is None:
+                self._started = time.perf_counter()
+        return self._executor.submit(self._convert, html_path, pdf_path)
+
+    def convert(self, html_path, pdf_path) -> dict:
+        return self.submit(html_path, pdf_path).result()
+
+    def convert_many(self, pairs) -> list:
+        """Convert (html, pdf) pairs concurrently; failures are returned as {"error": ...}."""
+        futures = [(html, pdf, self.submit(html, pdf)) for html, pdf in pairs]
+        results = []
+        for html, pdf, f in futures:
+            try:
+                results.append(f.result())
+            except PdfConversionError as e:
+                results.append({"pdf": str(pdf), "html": str(html), "error": str(e)})
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+            wall = time.perf_counter() - self._started if self._started else 0.0
+        out["wall_seconds"] = wall
+        out["pages_per_second"] = out["pages"] / wall if wall > 0 else 0.0
+        return out
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+# -----------------
+# SHARED CONVERTER
+# -----------------
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_converter() -> PdfConverter:
+    """Process-wide converter, created on first use (raises if wkhtmltopdf is missing)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PdfConverter()
+        return _shared
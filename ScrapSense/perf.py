@@ -0,0 +1,149 @@
+# perf.py — lightweight timing spans with rolling percentiles
+#
+#   with span("view_log.db"):
+#       df, total = repo.fetch_page(...)
+#
+#   @timed("report.export")
+#   def on_export(self): ...
+#
+# Every span name keeps its last WINDOW durations in memory; snapshot()
+# returns count, p50/p95/p99 and max in milliseconds. Recording costs two
+# perf_counter() calls and a deque append, so spans can stay on in the
+# field. MetricsExporter appends snapshots to a JSON-lines file. The live
+# overlay is in main.py (F12); this module has no Tk imports so worker
+# processes can use it too.
+
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+# -----------------
+# SETTINGS
+# -----------------
+ENABLED = os.getenv("SCRAPSENSE_PERF", "1") != "0"
+WINDOW = 512               # durations kept per span name
+EXPORT_PATH = Path(os.getenv("SCRAPSENSE_PERF_FILE") or Path(tempfile.gettempdir()) / "scrapsense_perf.jsonl")
+EXPORT_INTERVAL = 60.0     # seconds between exported snapshots
+
+
+class Metrics:
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}        # name -> deque of seconds
+        self._counts = {}         # name -> total count since start
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            d = self._samples.get(name)
+            if d is None:
+                d = self._samples[name] = deque(maxlen=self.window)
+                self._counts[name] = 0
+            d.append(seconds)
+            self._counts[name] += 1
+
+    def snapshot(self) -> dict:
+        """{name: {"count", "p50", "p95", "p99", "max", "last"}} with times in ms."""
+        with self._lock:
+            items = [(name, np.fromiter(d, float, len(d)), self._counts[name])
+                     for name, d in self._samples.items()]
+        out = {}
+        for name, arr, count in sorted(items):
+            p50, p95, p99 = np.percentile(arr, (50, 95, 99)) * 1000.0
+            out[name] = {"count": count, "p50": round(float(p50), 3), "p95": round(float(p95), 3),
+                         "p99": round(float(p99), 3), "max": round(float(arr.max()) * 1000.0, 3),
+                         "last": round(float(arr[-1]) * 1000.0, 3)}
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+# Shared registry used by every frame
+METRICS = Metrics()
+
+
+def record(name: str, seconds: float):
+    """Add a duration measured elsewhere (e.g. in a worker process)."""
+    if ENABLED:
+        METRICS.record(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    if not ENABLED:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        METRICS.record(name, time.perf_counter() - t0)
+
+
+def timed(name: str):
+    """Decorator form of span()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+# -----------------
+# EXPORT
+# -----------------
+class MetricsExporter:
+    """Appends {"time", "pid", "metrics"} lines to `path` every `interval` seconds."""
+
+    def __init__(self, path=EXPORT_PATH, interval: float = EXPORT_INTERVAL, metrics: Metrics = METRICS):
+        self.path = Path(path)
+        self.interval = interval
+        self.metrics = metrics
+        self._stop = threading.Event()
+        self._thread = None
+
+    def export_now(self):
+        snap = self.metrics.snapshot()
+        if not snap:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid(), "metrics": snap})
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.export_now()
+            except OSError:
+                pass          # a full or read-only disk must not take the app down
+
+    def start(self):
+        if ENABLED and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="perf-exporter", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and write a final snapshot."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        try:
+            self.export_now()
+        except OSError:
+            pass
@@ -0,0 +1,191 @@
+# pg_pool.py — pooled Postgres connections for report generation
+#
+# Opening a connection costs a TCP (and often TLS) handshake plus backend
+# start-up, which used to be paid on every preview and report. PgPool keeps
+# a few connections open in a ThreadedConnectionPool, checks them before
+# handing them out, sets a per-session statement timeout, and offers
+# server-side (named) cursors so large result sets stream in batches instead
+# of being buffered whole by the client. Pooled connections use
+# querylog.TimedCursor, so slow statements land in the slow-query log.
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from itertools import count
+
+import pandas as pd
+import psycopg2
+from psycopg2 import pool as pg_pool
+
+from querylog import SLOW_LOG, TimedCursor, explain_postgres
+
+# -----------------
+# SETTINGS
+# -----------------
+POOL_MIN = int(os.getenv("PGPOOL_MIN") or 1)
+POOL_MAX = int(os.getenv("PGPOOL_MAX") or 4)
+STATEMENT_TIMEOUT_MS = int(os.getenv("PGSTATEMENT_TIMEOUT_MS") or 30000)
+HEALTH_CHECK_IDLE = 30.0   # ping connections idle longer than this (seconds)
+CURSOR_ITERSIZE = 5000     # rows per round trip for named cursors
+
+_cursor_ids = count()
+
+
+def _env(name: str, default: str | None = None) -> str | None:
+    v = os.getenv(name)
+    return v if (v is not None and v != "") else default
+
+
+def connect_params() -> dict:
+    """psycopg2.connect keyword arguments from the PG* environment variables."""
+    return dict(
+        dbname=_env("PGDATABASE", "scrapsense"),
+        user=_env("PGUSER", "scrapsense"),
+        password=_env("PGPASSWORD", ""),
+        host=_env("PGHOST", "127.0.0.1"),
+        port=int(_env("PGPORT", "5432")),
+        connect_timeout=10,
+        sslmode=os.getenv("PGSSLMODE", "prefer"),
+    )
+
+
+class PgPool:
+    def __init__(self, minconn: int = POOL_MIN, maxconn: int = POOL_MAX,
+                 statement_timeout_ms: int = STATEMENT_TIMEOUT_MS, **params):
+        params = params or connect_params()
+        if statement_timeout_ms:
+            params["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+        params.setdefault("cursor_factory", TimedCursor)
+        # Same shape as schema_catalog.connection_key, so the catalog is shared per pool
+        self.key = (params.get("host"), str(params.get("port")), params.get("dbname"), params.get("user"))
+        self._pool = pg_pool.ThreadedConnectionPool(minconn, maxconn, **params)
+        self._last_used = {}       # id(conn) -> monotonic time it was returned
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last = self._last_used.get(id(conn))
+        if last is not None and time.monotonic() - last < HEALTH_CHECK_IDLE:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def getconn(self):
+        """A checked-out connection; replaces dead ones transparently."""
+        for _ in range(POOL_MAX + 1):
+            conn = self._pool.getconn()
+            if self._healthy(conn):
+                return conn
+            self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("no healthy Postgres connection available")
+
+    def putconn(self, conn, broken: bool = False):
+        broken = broken or conn.closed
+        if not broken:
+            try:
+                conn.rollback()    # never hand out a connection mid-transaction
+            except psycopg2.Error:
+                broken = True
+        if broken:
+            self._last_used.pop(id(conn), None)
+        else:
+            self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=broken)
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, broken)
+
+    def close(self):
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+# -----------------
+# SHARED POOL
+# -----------------
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_pool() -> PgPool:
+    """The process-wide pool, created on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared._pool.closed:
+            _shared = PgPool()
+        return _shared
+
+
+def close_pool():
+    global _shared
+    with _shared_lock:
+        if _shared is not None:
+            _shared.close()
+            _shared = None
+
+
+# -----------------
+# STREAMED READS
+# -----------------
+def iter_sql_named(conn, sql: str, params=None, itersize: int = CURSOR_ITERSIZE):
+    """
+    Like read_sql_named, but yields the result as DataFrames of up to
+    `itersize` rows, so only one batch is held at a time. The connection
+    must stay checked out until the generator is exhausted or closed.
+    """
+    columns, rows_read = None, 0
+    t0 = time.perf_counter()
+    with conn.cursor(name=f"scrapsense_{next(_cursor_ids)}") as cur:
+        cur.itersize = itersize
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(itersize)
+            if columns is None:
+                columns = [d[0] for d in cur.description]
+            if not rows:
+                break
+            rows_read += len(rows)
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    SLOW_LOG.observe("postgres", sql, params, time.perf_counter() - t0, rows_read,
+                     explain=lambda: explain_postgres(conn, sql, params))
+
+
+def read_sql_named(conn, sql: str, params=None, itersize: int = CURSOR_ITERSIZE) -> pd.DataFrame:
+    """
+    Like pd.read_sql_query, but through a server-side cursor: rows arrive in
+    batches of `itersize`, so the client never holds a second full copy of
+    the result set in libpq's buffer.
+    """
+    batches, columns = [], None
+    t0 = time.perf_counter()
+    with conn.cursor(name=f"scrapsense_{next(_cursor_ids)}") as cur:
+        cur.itersize = itersize
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(itersize)
+            if columns is None:
+                columns = [d[0] for d in cur.description]
+            if not rows:
+                break
+            batches.append(pd.DataFrame.from_records(rows, columns=columns))
+    SLOW_LOG.observe("postgres", sql, params, time.perf_counter() - t0, sum(len(b) for b in batches),
+                     explain=lambda: explain_postgres(conn, sql, params))
+    if not batches:
+        return pd.DataFrame(columns=columns or [])
+    return pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
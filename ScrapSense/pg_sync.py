@@ -0,0 +1,328 @@
+# pg_sync.py — incremental SQLite -> Postgres sync of scrap_logs
+#
+# Each shop-floor SQLite file is a "station". New rows are found by id above
+# a high-water mark kept in the SQLite file itself (sync_state table); rows
+# deleted locally are recorded by a trigger in scrap_logs_tombstones. A sync
+# pass streams both to Postgres in batches: rows are written as CSV into
+# COPY ... FROM STDIN on a temporary staging table, then merged with
+# INSERT ... ON CONFLICT (source_station, source_id) DO NOTHING, so replaying
+# a batch after a crash or restart is harmless. The high-water mark only
+# moves after the Postgres transaction commits.
+#
+# A row whose date, quantity or total_produced does not parse is not merged:
+# it goes to public.scrap_sync_rejects (with its raw values and the failing
+# fields) and the batch carries on, so one bad entry never stalls a
+# station. Stations on the original schema (init_db.py / db.py: machine,
+# scrap_weight) sync those columns as machine_name and quantity.
+#
+#   python pg_sync.py line1.db line2.db press=/data/press.db --interval 10
+#
+# scrap_logs ids must come from INTEGER PRIMARY KEY AUTOINCREMENT (as in
+# init_db.py) so a deleted id is never handed out again.
+
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pg_pool import PgPool
+from schema_catalog import bump_schema_version
+
+# -----------------
+# SETTINGS
+# -----------------
+BATCH_ROWS = int(os.getenv("SCRAPSENSE_SYNC_BATCH") or 50000)
+SYNC_WORKERS = int(os.getenv("SCRAPSENSE_SYNC_WORKERS") or 8)
+SYNC_INTERVAL = 5.0        # seconds between passes in daemon mode
+# Columns copied from SQLite, in COPY order (after source_id)
+SYNC_COLUMNS = ("machine_operator", "machine_name", "date", "quantity", "unit",
+                "total_produced", "shift", "reason", "comments")
+# Original sample schema column -> the column it syncs as (as normalize_logs reads them)
+LEGACY_COLUMNS = {"machine_name": "machine", "quantity": "scrap_weight"}
+
+_SQLITE_SETUP = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    target TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL DEFAULT 0,
+    last_tombstone INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS scrap_logs_tombstones (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id INTEGER NOT NULL,
+    deleted_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TRIGGER IF NOT EXISTS scrap_logs_tombstone AFTER DELETE ON scrap_logs
+BEGIN
+    INSERT INTO scrap_logs_tombstones (id) VALUES (old.id);
+END;
+"""
+
+_PG_SETUP = """
+ALTER TABLE public.scrap_logs ADD COLUMN IF NOT EXISTS source_station text;
+ALTER TABLE public.scrap_logs ADD COLUMN IF NOT EXISTS source_id bigint;
+CREATE UNIQUE INDEX IF NOT EXISTS scrap_logs_source_uq ON public.scrap_logs (source_station, source_id);
+CREATE TABLE IF NOT EXISTS public.scrap_sync_state (
+    station text PRIMARY KEY,
+    last_id bigint NOT NULL DEFAULT 0,
+    last_tombstone bigint NOT NULL DEFAULT 0,
+    rows_copied bigint NOT NULL DEFAULT 0,
+    synced_at timestamptz
+);
+CREATE TABLE IF NOT EXISTS public.scrap_sync_rejects (
+    station text NOT NULL,
+    source_id bigint NOT NULL,
+    fields text NOT NULL,
+    raw jsonb,
+    rejected_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (station, source_id)
+);
+-- NULL instead of an error for values that do not parse (dates may be MM/DD/YYYY or ISO)
+CREATE OR REPLACE FUNCTION public.scrapsense_try_date(v text) RETURNS date
+LANGUAGE plpgsql STABLE AS $$
+BEGIN
+    v := nullif(btrim(v), '');
+    IF v ~ '^\\d{1,2}/\\d{1,2}/\\d{4}$' THEN
+        RETURN to_date(v, 'MM/DD/YYYY');
+    END IF;
+    RETURN left(v, 10)::date;
+EXCEPTION WHEN data_exception THEN
+    RETURN NULL;
+END $$;
+CREATE OR REPLACE FUNCTION public.scrapsense_try_numeric(v text) RETURNS numeric
+LANGUAGE plpgsql IMMUTABLE AS $$
+BEGIN
+    RETURN nullif(btrim(v), '')::numeric;
+EXCEPTION WHEN data_exception THEN
+    RETURN NULL;
+END $$;
+"""
+
+# Staging columns are text. Plain numbers are cast directly and everything
+# else goes through the try_ functions (dates once per distinct value); a row
+# with a non-empty value that did not parse gets its field names in `bad`.
+_NUMBER = "'^\\s*[-+]?(\\d+\\.?\\d*|\\.\\d+)([eE][-+]?\\d+)?\\s*$'"
+_CHECK = f"""
+CREATE TEMP TABLE sync_checked ON COMMIT DROP AS
+WITH dates AS (
+    SELECT v, public.scrapsense_try_date(v) AS d FROM (SELECT DISTINCT date AS v FROM sync_stage) u
+)
+SELECT s.*, dt.d, c.q, c.tp,
+       concat_ws(', ', CASE WHEN dt.d IS NULL AND nullif(btrim(s.date), '') IS NOT NULL THEN 'date' END,
+                       CASE WHEN c.q IS NULL AND nullif(btrim(s.quantity), '') IS NOT NULL THEN 'quantity' END,
+                       CASE WHEN c.tp IS NULL AND nullif(btrim(s.total_produced), '') IS NOT NULL
+                            THEN 'total_produced' END) AS bad
+FROM sync_stage s
+LEFT JOIN dates dt ON dt.v = s.date
+CROSS JOIN LATERAL (
+    SELECT CASE WHEN s.quantity ~ {_NUMBER} THEN s.quantity::numeric
+                ELSE public.scrapsense_try_numeric(s.quantity) END AS q,
+           CASE WHEN s.total_produced ~ {_NUMBER} THEN s.total_produced::numeric
+                ELSE public.scrapsense_try_numeric(s.total_produced) END AS tp
+) c
+"""
+
+_REJECT = f"""
+INSERT INTO public.scrap_sync_rejects (station, source_id, fields, raw)
+SELECT %(station)s, source_id, bad, jsonb_build_object({", ".join(f"'{c}', {c}" for c in SYNC_COLUMNS)})
+FROM sync_checked WHERE bad <> ''
+ON CONFLICT (station, source_id) DO UPDATE SET fields = EXCLUDED.fields, raw = EXCLUDED.raw,
+    rejected_at = now()
+"""
+
+_MERGE = f"""
+INSERT INTO public.scrap_logs (source_station, source_id, {", ".join(SYNC_COLUMNS)})
+SELECT %(station)s, source_id, machine_operator, machine_name, d, q, unit, tp, shift, reason, comments
+FROM sync_checked WHERE bad = ''
+ON CONFLICT (source_station, source_id) DO NOTHING
+"""
+
+
+def pg_target(pool: PgPool) -> str:
+    """Name of a Postgres target as stored in each station's sync_state."""
+    host, port, dbname, user = pool.key
+    return f"{user}@{host}:{port}/{dbname}"
+
+
+def ensure_pg_schema(pool: PgPool):
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(_PG_SETUP)
+        conn.commit()
+    bump_schema_version()      # scrap_logs may have gained columns
+
+
+class Station:
+    """One SQLite file and its sync bookkeeping."""
+
+    def __init__(self, path, name: str | None = None):
+        self.path = Path(path)
+        self.name = name or self.path.stem
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.executescript(_SQLITE_SETUP)
+        cols = {r[1] for r in self.conn.execute("PRAGMA table_info(scrap_logs)")}
+        # older files may lack some columns, or name them as the original schema did
+        self.select = ", ".join(c if c in cols
+                                else f"{LEGACY_COLUMNS[c]} AS {c}" if LEGACY_COLUMNS.get(c) in cols
+                                else f"NULL AS {c}" for c in SYNC_COLUMNS)
+
+    def state(self, target: str) -> tuple:
+        row = self.conn.execute("SELECT last_id, last_tombstone FROM sync_state WHERE target = ?",
+                                (target,)).fetchone()
+        return row or (0, 0)
+
+    def save_state(self, target: str, last_id: int, last_tombstone: int):
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO sync_state (target, last_id, last_tombstone, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (target) DO UPDATE SET last_id = excluded.last_id,
+                    last_tombstone = excluded.last_tombstone, updated_at = excluded.updated_at
+            """, (target, last_id, last_tombstone))
+            # tombstones every target has seen are no longer needed
+            self.conn.execute("""DELETE FROM scrap_logs_tombstones
+                                 WHERE seq <= (SELECT MIN(last_tombstone) FROM sync_state)""")
+
+    def new_rows(self, after_id: int, limit: int) -> list:
+        return self.conn.execute(f"SELECT id, {self.select} FROM scrap_logs WHERE id > ? ORDER BY id LIMIT ?",
+                                 (after_id, limit)).fetchall()
+
+    def tombstones(self, after_seq: int, limit: int) -> list:
+        return self.conn.execute("SELECT seq, id FROM scrap_logs_tombstones WHERE seq > ? ORDER BY seq LIMIT ?",
+                                 (after_seq, limit)).fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def _csv_buffer(rows) -> io.StringIO:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    buf.seek(0)
+    return buf
+
+
+def sync_station(station: Station, pool: PgPool, batch_rows: int = BATCH_ROWS) -> dict:
+    """Push everything new (rows, then deletions) from one station. Returns counts."""
+    target = pg_target(pool)
+    last_id, last_tomb = station.state(target)
+    stats = {"station": station.name, "inserted": 0, "copied": 0, "rejected": 0, "deleted": 0, "batches": 0}
+    t0 = time.perf_counter()
+
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            while True:
+                rows = station.new_rows(last_id, batch_rows)
+                tombs = [] if rows else station.tombstones(last_tomb, batch_rows)
+                if not rows and not tombs:
+                    break
+                if rows:
+                    cur.execute(f"""CREATE TEMP TABLE sync_stage (source_id bigint,
+                                    {", ".join(f"{c} text" for c in SYNC_COLUMNS)}) ON COMMIT DROP""")
+                    cur.copy_expert("COPY sync_stage FROM STDIN WITH (FORMAT csv)", _csv_buffer(rows))
+                    cur.execute(_CHECK)
+                    cur.execute(_REJECT, {"station": station.name})
+                    stats["rejected"] += cur.rowcount
+                    cur.execute(_MERGE, {"station": station.name})
+                    stats["inserted"] += cur.rowcount
+                    stats["copied"] += len(rows)
+                    last_id = rows[-1][0]
+                else:
+                    cur.execute("CREATE TEMP TABLE sync_gone (source_id bigint) ON COMMIT DROP")
+                    cur.copy_expert("COPY sync_gone FROM STDIN WITH (FORMAT csv)",
+                                    _csv_buffer((i,) for _, i in tombs))
+                    cur.execute("""DELETE FROM public.scrap_logs s USING sync_gone g
+                                   WHERE s.source_station = %s AND s.source_id = g.source_id""",
+                                (station.name,))
+                    stats["deleted"] += cur.rowcount
+                    last_tomb = tombs[-1][0]
+                cur.execute("""
+                    INSERT INTO public.scrap_sync_state (station, last_id, last_tombstone, rows_copied, synced_at)
+                    VALUES (%(s)s, %(id)s, %(t)s, %(n)s, now())
+                    ON CONFLICT (station) DO UPDATE SET last_id = EXCLUDED.last_id,
+                        last_tombstone = EXCLUDED.last_tombstone,
+                        rows_copied = scrap_sync_state.rows_copied + EXCLUDED.rows_copied,
+                        synced_at = EXCLUDED.synced_at
+                """, {"s": station.name, "id": last_id, "t": last_tomb, "n": len(rows)})
+                conn.commit()
+                # the mark moves only after Postgres has the batch
+                station.save_state(target, last_id, last_tomb)
+                stats["batches"] += 1
+
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+
+def sync_all(stations: list, pool: PgPool, workers: int = SYNC_WORKERS, batch_rows: int = BATCH_ROWS) -> list:
+    """One pass over every station, `workers` stations at a time."""
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(stations)))) as ex:
+        futures = [ex.submit(sync_station, st, pool, batch_rows) for st in stations]
+        results = []
+        for st, f in zip(stations, futures):
+            try:
+                results.append(f.result())
+            except Exception as e:
+                results.append({"station": st.name, "error": repr(e)})
+        return results
+
+
+# -----------------
+# CLI
+# -----------------
+def _station_arg(text: str) -> tuple:
+    name, sep, path = text.partition("=")
+    return (name, path) if sep else (None, text)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="pg_sync", description="Sync station SQLite files into Postgres.")
+    ap.add_argument("stations", nargs="+", type=_station_arg,
+                    help="SQLite files, optionally as NAME=PATH (default name: file stem)")
+    ap.add_argument("--interval", type=float, default=SYNC_INTERVAL, help="seconds between passes")
+    ap.add_argument("--once", action="store_true", help="run one pass and exit")
+    ap.add_argument("--workers", type=int, default=SYNC_WORKERS)
+    ap.add_argument("--batch", type=int, default=BATCH_ROWS, help="rows per COPY batch")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    workers = max(1, min(args.workers, len(args.stations)))
+    pool = PgPool(minconn=1, maxconn=workers)
+    ensure_pg_schema(pool)
+    stations = [Station(path, name) for name, path in args.stations]
+    stop = threading.Event()
+    failed = False
+    try:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            results = sync_all(stations, pool, workers, args.batch)
+            failed = any("error" in r for r in results)
+            for r in results:
+                if "error" in r:
+                    print(f"{r['station']}: FAILED {r['error']}", file=sys.stderr)
+                elif r["copied"] or r["deleted"]:
+                    print(f"{r['station']}: +{r['inserted']} -{r['deleted']} in {r['seconds']:.2f}s")
+                if r.get("rejected"):
+                    print(f"{r['station']}: {r['rejected']} rows with unparseable values skipped "
+                          f"(see public.scrap_sync_rejects)", file=sys.stderr)
+            if args.once:
+                break
+            stop.wait(max(0.0, args.interval - (time.perf_counter() - t0)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for st in stations:
+            st.close()
+        pool.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
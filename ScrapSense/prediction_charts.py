@@ -0,0 +1,227 @@
+# prediction_charts.py — persistent matplotlib charts for the predictions view
+#
+# Each chart owns one Figure and a fixed set of artists that are updated in
+# place on refresh. When the axes limits and title are unchanged the data
+# artists are blitted over a cached background; otherwise a single
+# draw_idle() redraws the figure. Works with any Agg-based canvas
+# (FigureCanvasTkAgg in the app, FigureCanvasAgg headless).
+
+import numpy as np
+import matplotlib
+import matplotlib.dates as mdates
+from matplotlib.ticker import MaxNLocator
+from matplotlib.patches import Wedge
+
+LINE_COLOR = "#0078D7"
+PRED_COLOR = "#1F8EFA"
+EMPTY_PIE_TEXT = "No scrap causes available\nin the selected window."
+PIE_START_ANGLE = 140
+PIE_MIN_SHARE = 0.05   # slices below this share are folded into "Other"
+KEEP_LIMITS_FILL = 0.6 # keep y-limits while the data spans at least this share of them
+
+
+class BlitManager:
+    """Redraw a set of animated artists over a background captured on the last full draw."""
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.artists = []
+        self._bg = None
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add(self, artist):
+        artist.set_animated(True)
+        self.artists.append(artist)
+        return artist
+
+    def _on_draw(self, event):
+        self._bg = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        for a in self.artists:
+            self.canvas.figure.draw_artist(a)
+
+    def update(self, full: bool = False):
+        if full or self._bg is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._bg)
+        self._draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+
+def _band_verts(x, lower, upper):
+    """Closed polygon for a fill_between band, skipping non-finite points."""
+    ok = np.isfinite(lower) & np.isfinite(upper)
+    x, lower, upper = x[ok], lower[ok], upper[ok]
+    if not len(x):
+        return []
+    return [np.column_stack([np.concatenate([x, x[::-1]]),
+                             np.concatenate([lower, upper[::-1]])])]
+
+
+def _nice_limits(lo, hi):
+    """
+    Round limits outward to the enclosing tick values so that small data
+    changes keep the same limits (and can be blitted instead of redrawn).
+    """
+    lo, hi = _padded(lo, hi)
+    ticks = MaxNLocator(nbins=6).tick_values(lo, hi)
+    return float(ticks[0]), float(ticks[-1])
+
+
+def _padded(lo, hi, frac=0.05):
+    if not np.isfinite(lo) or not np.isfinite(hi):
+        return 0.0, 1.0
+    if lo == hi:
+        pad = abs(lo) * frac or 1.0
+    else:
+        pad = (hi - lo) * frac
+    return float(lo - pad), float(hi + pad)
+
+
+class LineChart:
+    """Actual / fitted / forecast line chart with confidence bands."""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.ax = ax = figure.add_subplot(111)
+        ax.xaxis_date()
+        self.blit = BlitManager(figure.canvas)
+
+        self.actual = self.blit.add(ax.plot([], [], "o--", label="Actual", color=LINE_COLOR, linewidth=1.2)[0])
+        self.pred = self.blit.add(ax.plot([], [], "-", label="Predicted", color=PRED_COLOR, linewidth=2)[0])
+        self.band = self.blit.add(ax.fill_between([], [], [], alpha=0.2, color=PRED_COLOR, label="Confidence"))
+        self.forecast = self.blit.add(ax.plot([], [], ":", color=PRED_COLOR, linewidth=2, label="Forecast")[0])
+        self.future_band = self.blit.add(ax.fill_between([], [], [], alpha=0.15, color=PRED_COLOR))
+
+        ax.set_xlabel("Date")
+        ax.grid(True, linestyle="--", alpha=0.35)
+        ax.legend(loc="upper left")
+
+    def update(self, dates, y, model, fut_dates, unit="", model_label=""):
+        x = mdates.date2num(np.asarray(dates, dtype="datetime64[ns]"))
+        xf = mdates.date2num(np.asarray(fut_dates, dtype="datetime64[ns]"))
+        y = np.asarray(y, dtype=float)
+
+        self.actual.set_data(x, y)
+        series = [y]
+        if len(model["y_pred"]) == len(x) and len(x):
+            self.pred.set_data(x, model["y_pred"])
+            series.append(model["y_pred"])
+            if len(model["lower"]) == len(x):
+                self.band.set_verts(_band_verts(x, model["lower"], model["upper"]))
+                series += [model["lower"], model["upper"]]
+            else:
+                self.band.set_verts([])
+        else:
+            self.pred.set_data([], [])
+            self.band.set_verts([])
+
+        if len(xf) and len(model["future_pred"]):
+            self.forecast.set_data(xf, model["future_pred"])
+            series.append(model["future_pred"])
+            if len(model["future_lower"]):
+                self.future_band.set_verts(_band_verts(xf, model["future_lower"], model["future_upper"]))
+                series += [model["future_lower"], model["future_upper"]]
+            else:
+                self.future_band.set_verts([])
+        else:
+            self.forecast.set_data([], [])
+            self.future_band.set_verts([])
+
+        values = np.concatenate([np.asarray(s, dtype=float).ravel() for s in series])
+        values = values[np.isfinite(values)]
+        all_x = np.concatenate([x, xf]) if len(xf) else x
+        xlim = _padded(all_x.min(), all_x.max(), 0.02) if len(all_x) else (0.0, 1.0)
+        ylim = _nice_limits(values.min(), values.max()) if len(values) else (0.0, 1.0)
+        cur = self.ax.get_ylim()
+        if len(values) and cur[0] <= values.min() and values.max() <= cur[1] \
+                and values.max() - values.min() >= KEEP_LIMITS_FILL * (cur[1] - cur[0]):
+            ylim = cur  # data still fills the current view: keep it and blit
+        title = f"Predicted Scrap Volume ({unit})" + (f" — {model_label}" if model_label else "")
+
+        ax = self.ax
+        full = (xlim != ax.get_xlim() or ylim != ax.get_ylim() or title != ax.get_title())
+        if full:
+            ax.set_xlim(*xlim)
+            ax.set_ylim(*ylim)
+            ax.set_title(title, fontsize=11)
+            ax.set_ylabel(f"Scrap ({unit})")
+        self.blit.update(full=full)
+
+
+class PieChart:
+    """Cause breakdown pie whose wedges and labels are reused across refreshes."""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.ax = ax = figure.add_subplot(111)
+        ax.set_frame_on(False)
+        ax.set_xticks([]); ax.set_yticks([])
+        ax.set_xlim(-1.25, 1.25); ax.set_ylim(-1.25, 1.25)
+        ax.set_aspect("equal")
+        self.blit = BlitManager(figure.canvas)
+        self.colors = matplotlib.rcParams["axes.prop_cycle"].by_key()["color"]
+        self.wedges, self.labels, self.pcts = [], [], []
+        self.empty_text = self.blit.add(ax.text(0, 0, EMPTY_PIE_TEXT, ha="center", va="center",
+                                                fontsize=11, visible=False))
+
+    def _slot(self, i):
+        """Wedge + label + percentage artists for slice i, created on first use."""
+        while len(self.wedges) <= i:
+            k = len(self.wedges)
+            self.wedges.append(self.blit.add(self.ax.add_patch(
+                Wedge((0, 0), 1, 0, 0, facecolor=self.colors[k % len(self.colors)]))))
+            self.labels.append(self.blit.add(self.ax.text(0, 0, "", fontsize=9)))
+            self.pcts.append(self.blit.add(self.ax.text(0, 0, "", fontsize=9, ha="center", va="center")))
+        return self.wedges[i], self.labels[i], self.pcts[i]
+
+    @staticmethod
+    def slices(reasons, quantities):
+        """Shares per reason with small slices folded into 'Other'."""
+        q = np.asarray(quantities, dtype=float)
+        total = float(q.sum()) if len(q) else 0.0
+        if total <= 0:
+            return [], np.array([])
+        share = q / total
+        main = share >= PIE_MIN_SHARE
+        labels = [str(r) for r, m in zip(reasons, main) if m]
+        values = list(q[main])
+        other = float(q[~main].sum())
+        if other > 0:
+            labels.append("Other"); values.append(other)
+        return labels, np.asarray(values) / total
+
+    def update(self, reasons, quantities, title="Scrap Source Breakdown"):
+        labels, shares = self.slices(reasons, quantities)
+        self.empty_text.set_visible(not labels)
+
+        theta = PIE_START_ANGLE
+        for i, (label, share) in enumerate(zip(labels, shares)):
+            wedge, text, pct = self._slot(i)
+            theta2 = theta + 360.0 * share
+            wedge.set_theta1(theta); wedge.set_theta2(theta2)
+            wedge.set_visible(True)
+            mid = np.deg2rad((theta + theta2) / 2)
+            cx, cy = np.cos(mid), np.sin(mid)
+            text.set_position((1.1 * cx, 1.1 * cy))
+            text.set_text(label)
+            text.set_horizontalalignment("left" if cx >= 0 else "right")
+            text.set_verticalalignment("center")
+            text.set_visible(True)
+            pct.set_position((0.6 * cx, 0.6 * cy))
+            pct.set_text(f"{share * 100:.0f}%")
+            pct.set_visible(True)
+            theta = theta2
+        for i in range(len(labels), len(self.wedges)):
+            self.wedges[i].set_visible(False)
+            self.labels[i].set_visible(False)
+            self.pcts[i].set_visible(False)
+
+        title = title if labels else ""
+        full = title != self.ax.get_title()
+        if full:
+            self.ax.set_title(title, fontsize=11)
+        self.blit.update(full=full)
@@ -0,0 +1,100 @@
+# prediction_jobs.py — forecast/risk computation run in a worker process
+#
+# The predictions view ships compact NumPy arrays here (day numbers,
+# quantities, category codes) instead of pickled DataFrames, and gets plain
+# arrays/lists back. Keep this module free of Tk and matplotlib imports so
+# worker processes start quickly.
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecast import fit_predict_with_ci, select_model
+
+
+def risk_bucket(value: float, threshold_low: float, threshold_high: float) -> str:
+    if value >= threshold_high:
+        return "High"
+    if value >= threshold_low:
+        return "Medium"
+    return "Low"
+
+
+def make_payload(df: pd.DataFrame, **settings) -> dict:
+    """
+    Encode a filtered, normalized scrap-log frame as arrays for `run_forecast_job`.
+    `settings` is passed through (model, horizon, time_budget, thresholds, ...).
+    """
+    key_codes, key_uniques = pd.factorize(
+        pd.MultiIndex.from_arrays([df["machine_key"].astype(str), df["shift"].astype(str)]))
+    reason = df["reason"].fillna("").astype(str).str.strip() if "reason" in df.columns \
+        else pd.Series("", index=df.index)
+    reason_codes, reason_uniques = pd.factorize(reason)
+    return dict(
+        day=df["date"].to_numpy(dtype="datetime64[D]").astype(np.int64),
+        quantity=df["quantity"].to_numpy(dtype=float),
+        key_codes=key_codes.astype(np.int32),
+        key_machines=[m for m, _ in key_uniques],
+        key_shifts=[s for _, s in key_uniques],
+        reason_codes=reason_codes.astype(np.int32),
+        reasons=list(reason_uniques),
+        **settings,
+    )
+
+
+def daily_totals(day: np.ndarray, quantity: np.ndarray):
+    """Continuous daily totals: (first_day, totals) with missing days as 0."""
+    first = int(day.min())
+    return first, np.bincount(day - first, weights=quantity)
+
+
+def build_risk_rows(day, quantity, key_codes, key_machines, key_shifts, top_causes,
+                    threshold_low: float, threshold_high: float, limit: int = 10):
+    """Per (machine, shift) totals on the latest day, largest first."""
+    if len(day) == 0:
+        return []
+    last = day == day.max()
+    totals = np.bincount(key_codes[last], weights=quantity[last], minlength=len(key_machines))
+    present = np.flatnonzero(np.bincount(key_codes[last], minlength=len(key_machines)))
+    order = present[np.argsort(-totals[present], kind="stable")][:limit]
+    return [{
+        "rank": i + 1,
+        "machine_key": str(key_machines[k]),
+        "shift": str(key_shifts[k]),
+        "quantity": float(totals[k]),
+        "Risk Level": risk_bucket(float(totals[k]), threshold_low, threshold_high),
+        "Predicted Top Cause": top_causes[k] if top_causes else "—",
+    } for i, k in enumerate(order)]
+
+
+def run_forecast_job(payload: dict) -> dict:
+    day, quantity = payload["day"], payload["quantity"]
+    horizon = payload.get("horizon", 7)
+
+    t0 = time.perf_counter()
+    first, y = daily_totals(day, quantity)
+    model_name = payload.get("model") or select_model(y, horizon=horizon,
+                                                      time_budget=payload.get("time_budget", 0.25))
+    model = fit_predict_with_ci(y, periods_ahead=horizon, model=model_name)
+    t1 = time.perf_counter()
+
+    rows = build_risk_rows(day, quantity, payload["key_codes"],
+                           payload["key_machines"], payload["key_shifts"],
+                           payload.get("top_causes"),
+                           payload["threshold_low"], payload["threshold_high"])
+    t2 = time.perf_counter()
+
+    # Observed cause mix (used when the cause model has nothing for this filter)
+    named = np.array([r != "" for r in payload["reasons"]], dtype=bool)
+    reason_totals = np.bincount(payload["reason_codes"], weights=quantity, minlength=len(named))
+    keep = np.flatnonzero(named & (reason_totals > 0))
+    keep = keep[np.argsort(-reason_totals[keep], kind="stable")]
+
+    return dict(
+        job_id=payload.get("job_id"),
+        first_day=first, y=y, model=model, rows=rows,
+        cause_reasons=[payload["reasons"][i] for i in keep],
+        cause_quantities=reason_totals[keep],
+        timings={"forecast": t1 - t0, "risk_rows": t2 - t1},   # seconds, for perf metrics
+    )
@@ -0,0 +1,248 @@
+# querylog.py — slow-query log with automatic plan capture
+#
+# Every statement the data layer runs is timed. Anything slower than
+# SLOW_MS is appended to a JSON-lines file with its SQL, parameters,
+# duration and row count, plus the query plan:
+#
+#   SQLite   — EXPLAIN QUERY PLAN on the same connection
+#   Postgres — EXPLAIN (ANALYZE, BUFFERS) for read-only queries, inside a
+#              savepoint that is rolled back; plain EXPLAIN for anything
+#              that writes, so it is not run (and does not lock rows or
+#              use up sequence values) a second time
+#
+# Plans are checked for full table scans ("SCAN scrap_logs" / "Seq Scan on
+# scrap_logs") and on-disk or temp-B-tree sorts, and each entry carries those
+# flags. A plan is captured at most once per PLAN_TTL for the same
+# statement shape, so a slow query that runs in a loop is not re-explained
+# every time. Postgres statements are hooked through TimedCursor (installed
+# by PgPool); SQLite statements through repository.SqliteRepository.
+#
+#   python querylog.py --top 10 --sort total       # summarize the log
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import psycopg2.extensions
+
+# -----------------
+# SETTINGS
+# -----------------
+SLOW_MS = float(os.getenv("SCRAPSENSE_SLOW_MS") or 250)
+LOG_PATH = Path(os.getenv("SCRAPSENSE_SLOW_LOG") or Path(tempfile.gettempdir()) / "scrapsense_slow.jsonl")
+# 0 = plain EXPLAIN for read-only Postgres queries too (writes never get ANALYZE)
+PG_ANALYZE = os.getenv("SCRAPSENSE_SLOW_ANALYZE", "1") != "0"
+PLAN_TTL = 600.0           # seconds before the same statement shape is explained again
+SQL_MAX = 4000             # characters of SQL / parameters kept per entry
+EXPLAINABLE = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "EXECUTE", "VALUES"}
+READ_ONLY = {"SELECT", "WITH", "VALUES"}   # statement kinds ANALYZE may run again
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(?!CONSTANT\b)(\w+)\b(?! USING)")
+_PG_SCAN = re.compile(r"Seq Scan on (?:\w+\.)?(\w+)")
+# writing CTEs, SELECT INTO, row locks (FOR UPDATE/SHARE) and sequence calls
+_WRITES = re.compile(r"\b(?:INSERT|UPDATE|DELETE|MERGE|INTO|SHARE|nextval|setval)\b", re.IGNORECASE)
+
+
+def fingerprint(sql: str) -> str:
+    """SQL with literals replaced by ? and whitespace collapsed (groups execute_values batches too)."""
+    return _SPACE.sub(" ", _LITERALS.sub("?", sql)).strip()[:SQL_MAX]
+
+
+def is_read_only(sql: str) -> bool:
+    """True for queries that only read, i.e. safe to execute again under EXPLAIN ANALYZE."""
+    words = sql.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in READ_ONLY and not _WRITES.search(_LITERALS.sub("?", sql))
+
+
+def plan_flags(plan) -> list:
+    flags = set()
+    for line in plan or ():
+        text = line.strip()
+        m = _SQLITE_SCAN.match(text) or _PG_SCAN.search(text)
+        if m:
+            flags.add(f"full_scan:{m.group(1)}")
+        if "USE TEMP B-TREE" in text:
+            flags.add("temp_btree")
+        if "external merge" in text or "Disk:" in text:
+            flags.add("disk_sort")
+    return sorted(flags)
+
+
+# -----------------
+# EXPLAIN
+# -----------------
+def explain_sqlite(conn, sql: str, params=()) -> list:
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params or ()).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def explain_postgres(conn, sql: str, params=None, analyze: bool = PG_ANALYZE) -> list | None:
+    if sql.lstrip().split(None, 1)[0].upper() not in EXPLAINABLE:
+        return None
+    analyze = analyze and is_read_only(sql)
+    # a plain cursor, so the EXPLAIN itself is not timed and logged
+    cur = psycopg2.extensions.cursor(conn)
+    own_txn = conn.autocommit
+    cur.execute("BEGIN" if own_txn else "SAVEPOINT querylog_explain")
+    try:
+        cur.execute(f"EXPLAIN {'(ANALYZE, BUFFERS) ' if analyze else ''}{sql}", params)
+        return [r[0] for r in cur.fetchall()]
+    finally:
+        cur.execute("ROLLBACK" if own_txn else "ROLLBACK TO SAVEPOINT querylog_explain")
+        cur.close()
+
+
+# -----------------
+# LOG
+# -----------------
+class SlowQueryLog:
+    def __init__(self, path=LOG_PATH, threshold_ms: float = SLOW_MS):
+        self.path = Path(path)
+        self.threshold = threshold_ms / 1000.0
+        self._lock = threading.Lock()
+        self._explained = {}       # fingerprint -> monotonic time of the last captured plan
+
+    def observe(self, backend: str, sql: str, params, seconds: float, rows: int, explain=None):
+        """Record one statement; `explain` is a zero-argument callable returning plan lines."""
+        if seconds < self.threshold:
+            return
+        fp = fingerprint(sql)
+        now = time.monotonic()
+        plan, plan_error = None, None
+        if explain is not None and now - self._explained.get(fp, -PLAN_TTL) >= PLAN_TTL:
+            self._explained[fp] = now
+            try:
+                plan = explain()
+            except Exception as e:         # a plan is diagnostic only; never fail the query
+                plan_error = repr(e)
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "backend": backend,
+            "ms": round(seconds * 1000.0, 3), "rows": rows,
+            "sql": sql[:SQL_MAX], "fingerprint": fp,
+            "params": repr(params)[:SQL_MAX] if params is not None else None,
+        }
+        if plan is not None:
+            entry["plan"] = plan
+            entry["flags"] = plan_flags(plan)
+        if plan_error:
+            entry["plan_error"] = plan_error
+        try:
+            with self._lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+        except OSError:
+            pass
+
+
+# Shared log used by the repository and the Postgres pool
+SLOW_LOG = SlowQueryLog()
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """psycopg2 cursor that reports slow execute() calls to SLOW_LOG (named cursors are timed by their readers)."""
+
+    def execute(self, sql, params=None):
+        if self.name is not None:
+            return super().execute(sql, params)
+        t0 = time.perf_counter()
+        result = super().execute(sql, params)
+        seconds = time.perf_counter() - t0
+        if seconds >= SLOW_LOG.threshold:
+            if isinstance(sql, bytes):           # execute_values sends bytes
+                text = sql.decode(self.connection.encoding if self.connection.encoding != "UTF8" else "utf-8")
+            else:
+                text = sql if isinstance(sql, str) else sql.as_string(self.connection)
+            SLOW_LOG.observe("postgres", text, params, seconds, self.rowcount,
+                             explain=lambda: explain_postgres(self.connection, text, params))
+        return result
+
+
+# -----------------
+# REPORT
+# -----------------
+def load_entries(path=LOG_PATH) -> list:
+    entries = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue       # a line cut short by a crash
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def summarize(entries, sort: str = "total") -> list:
+    """One row per (backend, fingerprint): count, total/p95/max ms, mean rows, flags and the latest plan."""
+    groups = defaultdict(list)
+    for e in entries:
+        groups[(e.get("backend"), e.get("fingerprint") or fingerprint(e.get("sql", "")))].append(e)
+    out = []
+    for (backend, fp), items in groups.items():
+        ms = sorted(e["ms"] for e in items)
+        planned = [e for e in items if e.get("plan")]
+        out.append({
+            "backend": backend, "fingerprint": fp, "count": len(items),
+            "total_ms": round(sum(ms), 1), "p95_ms": ms[min(len(ms) - 1, int(0.95 * len(ms)))],
+            "max_ms": ms[-1], "mean_rows": round(sum(e.get("rows") or 0 for e in items) / len(items), 1),
+            "flags": sorted({f for e in items for f in e.get("flags", ())}),
+            "plan": planned[-1]["plan"] if planned else None, "last": items[-1]["time"],
+        })
+    key = {"total": "total_ms", "max": "max_ms", "count": "count", "p95": "p95_ms"}[sort]
+    return sorted(out, key=lambda r: r[key], reverse=True)
+
+
+def print_report(rows, top: int, show_plans: bool = True, out=sys.stdout):
+    if not rows:
+        print("No slow statements logged.", file=out)
+        return
+    print(f"{'#':>3} {'backend':<9}{'count':>7}{'total ms':>12}{'p95 ms':>10}{'max ms':>10}{'rows':>9}  flags",
+          file=out)
+    for i, r in enumerate(rows[:top], 1):
+        print(f"{i:>3} {r['backend']:<9}{r['count']:>7}{r['total_ms']:>12.1f}{r['p95_ms']:>10.1f}"
+              f"{r['max_ms']:>10.1f}{r['mean_rows']:>9.0f}  {', '.join(r['flags']) or '-'}", file=out)
+        print(f"    {r['fingerprint'][:200]}", file=out)
+        if show_plans and r["plan"]:
+            for line in r["plan"][:25]:
+                print(f"      | {line}", file=out)
+    print(f"\n{len(rows)} statement shapes, {sum(r['count'] for r in rows)} slow executions", file=out)
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="querylog", description="Summarize the ScrapSense slow-query log.")
+    ap.add_argument("--file", default=str(LOG_PATH), help=f"log to read (default {LOG_PATH})")
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--sort", choices=("total", "max", "p95", "count"), default="total")
+    ap.add_argument("--full-scans", action="store_true", help="only statements whose plan scans a whole table")
+    ap.add_argument("--no-plans", action="store_true")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    rows = summarize(load_entries(args.file), args.sort)
+    if args.full_scans:
+        rows = [r for r in rows if any(f.startswith("full_scan:") for f in r["flags"])]
+    print_report(rows, args.top, not args.no_plans)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
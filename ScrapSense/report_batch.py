@@ -0,0 +1,265 @@
+# report_batch.py — headless bulk report generation
+#
+# Builds one report per (period × filter combination), e.g. per machine,
+# per shift and per week:
+#
+#   python generate_report.py --start 2025-01-06 --end 2025-02-02 --period week \
+#          --by machine shift --out reports/2025-w02
+#
+# All rows for the whole window (plus the previous period used for deltas)
+# are loaded with one query and factorized once; every report is then a
+# bincount over a row mask. Reports are rendered in a process pool. Each
+# report directory gets a manifest.json with its stage timings, and the
+# output root gets a manifest covering the whole batch.
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, timedelta
+from itertools import product
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from report_kpis import Aggregator
+from report_queries import DETAIL_COLUMNS
+
+PERIODS = ("day", "week", "month", "range")
+# CLI name -> scrap_logs column
+SPLIT_DIMENSIONS = {"machine": "machine_name", "shift": "shift",
+                    "operator": "machine_operator", "reason": "reason"}
+MANIFEST_NAME = "manifest.json"
+
+
+# -----------------
+# PLANNING
+# -----------------
+def split_periods(start: date, end: date, period: str) -> list:
+    """Consecutive (start, end) date pairs covering [start, end]."""
+    if period == "range":
+        return [(start, end)]
+    out, s = [], start
+    while s <= end:
+        if period == "day":
+            e = s
+        elif period == "week":
+            e = s + timedelta(days=6 - s.weekday())          # through Sunday
+        else:
+            nxt = (s.replace(day=1) + timedelta(days=32)).replace(day=1)
+            e = nxt - timedelta(days=1)
+        e = min(e, end)
+        out.append((s, e))
+        s = e + timedelta(days=1)
+    return out
+
+
+def _slug(text) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", str(text)).strip("-") or "blank"
+
+
+def build_jobs(df: pd.DataFrame, periods: list, by: list) -> list:
+    """One job per period and combination of the values found for each `by` dimension."""
+    values = [sorted(df[SPLIT_DIMENSIONS[d]].dropna().unique().tolist(), key=str) if not df.empty else []
+              for d in by]
+    jobs = []
+    for (s, e), combo in product(periods, product(*values)):
+        filters = dict(zip(by, combo))
+        name = f"{s:%Y-%m-%d}_{e:%Y-%m-%d}" + "".join(f"__{d}-{_slug(v)}" for d, v in filters.items())
+        jobs.append({"name": name, "start": s, "end": e, "filters": filters})
+    return jobs
+
+
+def plan_reports(df: pd.DataFrame, jobs: list, skip_empty: bool = True):
+    """
+    Aggregates and detail rows for every job from one Aggregator. Yields
+    (job, task) where task is what a render worker needs; empty jobs are
+    yielded with task None when skip_empty is set.
+    """
+    from generate_report import _period_delta
+
+    agg_engine = Aggregator(df)
+    days = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]") if len(df) else np.array([], "datetime64[D]")
+    value_masks = {}                               # (dim, value) -> bool mask, built once
+
+    def value_mask(dim, value):
+        k = (dim, value)
+        if k not in value_masks:
+            codes, uniques, _ = agg_engine.codes[SPLIT_DIMENSIONS[dim]]
+            idx = pd.Index(uniques).get_indexer([value])[0]
+            value_masks[k] = codes == idx
+        return value_masks[k]
+
+    def period_mask(s, e):
+        return (days >= np.datetime64(s)) & (days <= np.datetime64(e))
+
+    for job in jobs:
+        t0 = time.perf_counter()
+        fmask = np.ones(len(df), dtype=bool)
+        for dim, value in job["filters"].items():
+            fmask &= value_mask(dim, value)
+        cur = fmask & period_mask(job["start"], job["end"])
+        if skip_empty and not cur.any():
+            yield job, None
+            continue
+        prev_start, prev_end = _period_delta(job["start"], job["end"])
+        task = {
+            "job": job,
+            "agg": agg_engine.aggregate(cur),
+            "agg_prev": agg_engine.aggregate(fmask & period_mask(prev_start, prev_end)),
+            "detail": df.loc[cur, [c for c in DETAIL_COLUMNS if c in df.columns]].reset_index(drop=True),
+        }
+        task["slice_time"] = time.perf_counter() - t0
+        yield job, task
+
+
+# -----------------
+# RENDERING (worker side)
+# -----------------
+def _write_manifest(out_dir: Path, manifest: dict):
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def render_job(task: dict, out_root: str, max_inline_rows) -> dict:
+    from generate_report import render_report_files
+
+    job = task["job"]
+    out_dir = Path(out_root) / job["name"]
+    out_dir.mkdir(parents=True, exist_ok=True)
+    t0 = time.perf_counter()
+    timings = {"slice": task["slice_time"]}
+    render_report_files(task["detail"], task["agg"], task["agg_prev"], job["start"], job["end"],
+                        out_dir, max_inline_rows, parallel_charts=False, timings=timings)
+    timings["render_total"] = time.perf_counter() - t0
+
+    manifest = {
+        "name": job["name"], "start": str(job["start"]), "end": str(job["end"]),
+        "filters": job["filters"], "rows": int(task["agg"]["entries"]),
+        "files": sorted(f.name for f in out_dir.iterdir() if f.name != MANIFEST_NAME),
+        "pdf": None,
+        "timings": {k: round(v, 4) for k, v in timings.items()},
+        "worker_pid": os.getpid(),
+    }
+    _write_manifest(out_dir, manifest)
+    return manifest
+
+
+def convert_pdfs(results: list, out_root: Path, workers: int) -> dict:
+    """Convert every rendered report to report.pdf through one PdfConverter pool."""
+    from pdf_pool import PdfConverter, PdfConversionError
+
+    try:
+        converter = PdfConverter(workers=workers)
+    except PdfConversionError as e:
+        return {"error": str(e)}
+    try:
+        pairs = [(out_root / m["name"] / "report.html", out_root / m["name"] / "report.pdf") for m in results]
+        for manifest, res in zip(results, converter.convert_many(pairs)):
+            if "error" in res:
+                manifest["pdf_error"] = res["error"]
+            else:
+                manifest["pdf"] = "report.pdf"
+                manifest["pages"] = res["pages"]
+                manifest["files"] = sorted(set(manifest["files"]) | {"report.pdf"})
+                manifest["timings"]["pdf"] = round(res["seconds"], 4)
+                manifest["timings"]["pdf_attempts"] = res["attempts"]
+            _write_manifest(out_root / manifest["name"], manifest)
+        return converter.stats()
+    finally:
+        converter.close()
+
+
+# -----------------
+# CLI
+# -----------------
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(prog="generate_report", description="Generate ScrapSense reports in bulk.")
+    ap.add_argument("--start", type=date.fromisoformat, required=True, help="first day (YYYY-MM-DD)")
+    ap.add_argument("--end", type=date.fromisoformat, required=True, help="last day (YYYY-MM-DD)")
+    ap.add_argument("--period", choices=PERIODS, default="week", help="one report per period (default: week)")
+    ap.add_argument("--by", nargs="*", choices=list(SPLIT_DIMENSIONS), default=[],
+                    help="also split by these dimensions, e.g. --by machine shift")
+    ap.add_argument("--operator", help="only operators matching this text")
+    ap.add_argument("--reason", help="only reasons matching this text")
+    ap.add_argument("--out", type=Path, required=True, help="output directory")
+    ap.add_argument("--format", choices=("html", "pdf"), default="html")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--max-rows", type=int, default=None, help="inline detail rows per report (rest as CSV)")
+    ap.add_argument("--keep-empty", action="store_true", help="also write reports with no rows")
+    args = ap.parse_args(argv)
+    if args.start > args.end:
+        ap.error("--start must be on or before --end")
+    return args
+
+
+def main(argv=None) -> int:
+    from generate_report import load_scrap_data, _period_delta
+
+    args = parse_args(argv)
+    t_start = time.perf_counter()
+    stages = {}
+
+    periods = split_periods(args.start, args.end, args.period)
+    window_start = min(_period_delta(s, e)[0] for s, e in periods)   # earliest previous period
+    t0 = time.perf_counter()
+    df = load_scrap_data(window_start, args.end, operator=args.operator, reason=args.reason)
+    stages["load"] = time.perf_counter() - t0
+
+    jobs = build_jobs(df[df["date"] >= args.start] if not df.empty else df, periods, args.by)
+    args.out.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    planned = list(plan_reports(df, jobs, skip_empty=not args.keep_empty))
+    stages["aggregate"] = time.perf_counter() - t0
+    tasks = [task for _, task in planned if task is not None]
+    skipped = [job["name"] for job, task in planned if task is None]
+    print(f"{len(df):,} rows loaded, {len(tasks)} reports to render ({len(skipped)} empty skipped)")
+
+    t0 = time.perf_counter()
+    results, failures = [], []
+    workers = max(1, min(args.workers, len(tasks) or 1))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(render_job, task, str(args.out), args.max_rows): task["job"]["name"]
+                   for task in tasks}
+        for i, f in enumerate(as_completed(futures), 1):
+            name = futures[f]
+            try:
+                results.append(f.result())
+                print(f"[{i}/{len(tasks)}] {name}")
+            except Exception as e:
+                failures.append({"name": name, "error": repr(e)})
+                print(f"[{i}/{len(tasks)}] {name} FAILED: {e}", file=sys.stderr)
+    stages["render"] = time.perf_counter() - t0
+
+    pdf_stats = None
+    if args.format == "pdf" and results:
+        t0 = time.perf_counter()
+        pdf_stats = convert_pdfs(results, args.out, args.workers)
+        stages["pdf"] = time.perf_counter() - t0
+        if "error" in pdf_stats:
+            print(f"PDF skipped, HTML reports kept: {pdf_stats['error']}", file=sys.stderr)
+        else:
+            print(f"{pdf_stats['documents']} PDFs, {pdf_stats['pages']} pages, "
+                  f"{pdf_stats['pages_per_second']:.1f} pages/s ({pdf_stats['failures']} failed)")
+    stages["total"] = time.perf_counter() - t_start
+
+    manifest = {
+        "start": str(args.start), "end": str(args.end), "period": args.period, "by": args.by,
+        "filters": {"operator": args.operator, "reason": args.reason},
+        "format": args.format, "workers": workers, "rows_loaded": int(len(df)),
+        "timings": {k: round(v, 4) for k, v in stages.items()},
+        "reports": sorted(results, key=lambda m: m["name"]),
+        "skipped_empty": skipped, "failed": failures, "pdf": pdf_stats,
+    }
+    _write_manifest(args.out, manifest)
+    print(f"{len(results)} reports in {stages['total']:.1f}s -> {args.out / MANIFEST_NAME}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# report_cache.py — size-bounded LRU disk cache of rendered reports
+#
+# A finished report (report.html, chart images, optional CSV appendix and
+# PDF) is stored as one directory named by a hash of everything that shapes
+# it: date range, filters, template, render options and the data version of
+# scrap_logs. Reading an entry touches it; when the cache grows past
+# MAX_BYTES the least recently used entries are removed.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# -----------------
+# SETTINGS
+# -----------------
+CACHE_ROOT = Path(os.getenv("SCRAPSENSE_REPORT_CACHE") or Path(tempfile.gettempdir()) / "scrapsense_reports")
+MAX_BYTES = int(os.getenv("SCRAPSENSE_REPORT_CACHE_MB") or 512) * 2**20
+META_NAME = "meta.json"
+
+
+def report_key(start_date, end_date, filters: dict | None, template_path, data_version, **options) -> str:
+    """Cache key for one report. `options` holds render settings (row cap, chart backend...)."""
+    filters = filters or {}
+    tpl = Path(template_path)
+    try:
+        st = tpl.stat()
+        tpl_id = [tpl.name, st.st_mtime_ns, st.st_size]
+    except OSError:
+        tpl_id = [tpl.name]
+    payload = {
+        "start": str(start_date), "end": str(end_date),
+        "shift": filters.get("shift") or "All",
+        "operator": (filters.get("operator") or "").strip().lower(),
+        "reason": (filters.get("reason") or "").strip().lower(),
+        "machine": filters.get("machine") or "",
+        "template": tpl_id, "data": data_version, "options": options,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file())
+
+
+class ReportCache:
+    def __init__(self, root=CACHE_ROOT, max_bytes: int = MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """Entry directory for `key`, or None. A hit counts as a use for LRU."""
+        entry = self.root / key
+        if not (entry / META_NAME).exists():
+            return None
+        now = time.time()
+        try:
+            os.utime(entry / META_NAME, (now, now))
+        except OSError:
+            return None          # evicted between the check and the touch
+        return entry
+
+    def put(self, key: str, src_dir, files) -> Path:
+        """Copy `files` (names inside src_dir) into the entry for `key`."""
+        src_dir = Path(src_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=self.root))
+        for name in files:
+            shutil.copy2(src_dir / name, tmp / name)
+        (tmp / META_NAME).write_text(json.dumps({"files": sorted(files), "created": time.time()}),
+                                     encoding="utf-8")
+        entry = self.root / key
+        with self._lock:
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)   # readers see either no entry or a complete one
+        self.evict()
+        return entry
+
+    def add_file(self, key: str, src, name: str | None = None):
+        """Attach one more artifact (e.g. a PDF made later) to an existing entry."""
+        entry = self.get(key)
+        if entry is None:
+            return
+        name = name or Path(src).name
+        shutil.copy2(src, entry / name)
+        meta = json.loads((entry / META_NAME).read_text(encoding="utf-8"))
+        meta["files"] = sorted(set(meta["files"]) | {name})
+        (entry / META_NAME).write_text(json.dumps(meta), encoding="utf-8")
+        self.evict()
+
+    def files(self, entry: Path) -> list:
+        return json.loads((entry / META_NAME).read_text(encoding="utf-8"))["files"]
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            if not self.root.exists():
+                return
+            entries = []
+            for d in self.root.iterdir():
+                meta = d / META_NAME
+                if d.is_dir() and meta.exists():
+                    entries.append((meta.stat().st_mtime, _dir_size(d), d))
+            total = sum(size for _, size, _ in entries)
+            for _, size, d in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(d, ignore_errors=True)
+                total -= size
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+# Shared cache used by generate_report
+CACHE = ReportCache()
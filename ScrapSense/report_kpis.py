@@ -0,0 +1,154 @@
+# report_kpis.py — single-pass KPI / top-k / delta engine for reports
+#
+# Every report section (KPIs, charts, top-3 tables, insights) reads from one
+# aggregates dict: totals plus a quantity-per-key Series for each report
+# dimension. Built from raw rows, each dimension is factorized once into
+# integer codes and summed with one np.bincount, so the cost is a single
+# linear pass per column instead of repeated groupbys. The server-side path
+# (report_queries.load_report_aggregates) returns the same structure.
+
+import numpy as np
+import pandas as pd
+
+# Report dimension -> source column (the server query groups the same ones)
+DIMENSIONS = ("date", "shift", "reason", "machine_name", "machine_operator")
+
+
+def empty_aggregates(has_total_produced: bool = False) -> dict:
+    return {
+        "total_scrap": 0.0,
+        "entries": 0,
+        "total_produced": 0.0 if has_total_produced else None,
+        "by": {dim: pd.Series(dtype=float) for dim in DIMENSIONS},
+    }
+
+
+def _codes(col: pd.Series):
+    """Integer codes (-1 for missing), the values they index, and whether all values occur."""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.codes.to_numpy(), col.cat.categories, False
+    codes, uniques = pd.factorize(col, sort=False)
+    return codes, uniques, True
+
+
+def _sum_by(codes: np.ndarray, uniques, weights: np.ndarray, dense: bool = True) -> pd.Series:
+    # Shift by one so missing keys (-1) land in bin 0 and are dropped without a mask copy
+    sums = np.bincount(codes + 1, weights=weights, minlength=len(uniques) + 1)[1:]
+    index = pd.Index(np.asarray(uniques, dtype=object))
+    if not dense:
+        present = np.bincount(codes + 1, minlength=len(uniques) + 1)[1:] > 0
+        sums, index = sums[present], index[present]
+    return pd.Series(sums, index=index, dtype=float)
+
+
+class Aggregator:
+    """
+    Factorizes the rows once; aggregate(mask) then reduces any subset of
+    them with bincounts over the shared codes. Used to build many reports
+    (one per machine/shift/week...) from a single load.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.has_prod = "total_produced" in df.columns
+        self.n = len(df)
+        self.qty = pd.to_numeric(df["quantity"], errors="coerce").fillna(0).to_numpy(dtype=float) \
+            if self.n else np.zeros(0)
+        self.produced = (pd.to_numeric(df["total_produced"], errors="coerce").to_numpy(dtype=float)
+                         if self.has_prod and self.n else None)
+        self.codes = {dim: _codes(df[dim]) for dim in DIMENSIONS if dim in df.columns and self.n}
+
+    def aggregate(self, mask: np.ndarray | None = None) -> dict:
+        agg = empty_aggregates(self.has_prod)
+        qty = self.qty if mask is None else self.qty[mask]
+        if not len(qty):
+            return agg
+        agg["total_scrap"] = float(qty.sum())
+        agg["entries"] = int(len(qty))
+        if self.has_prod:
+            produced = self.produced if mask is None else self.produced[mask]
+            agg["total_produced"] = float(np.nansum(produced))
+        for dim, (codes, uniques, dense) in self.codes.items():
+            if mask is not None:
+                codes, dense = codes[mask], False
+            s = _sum_by(codes, uniques, qty, dense)
+            agg["by"][dim] = s.sort_index() if dim == "date" else s
+        return agg
+
+
+def aggregates_from_df(df: pd.DataFrame) -> dict:
+    """The report aggregates, computed from raw rows in one pass per column."""
+    return Aggregator(df).aggregate()
+
+
+def scrap_percent(quantity, total_produced) -> np.ndarray:
+    """Per-row scrap % of production; NaN where production is missing or zero."""
+    q = np.asarray(quantity, dtype=float)
+    p = np.asarray(total_produced, dtype=float)
+    out = np.full(q.shape, np.nan)
+    ok = p > 0
+    np.divide(q * 100.0, p, out=out, where=ok)
+    return out
+
+
+# -----------------
+# KPIs / TOP-K / DELTAS
+# -----------------
+def _leader(s: pd.Series):
+    """(key, value) of the largest entry, first one on ties; None if empty."""
+    if s.empty:
+        return None
+    i = int(np.argmax(s.to_numpy()))
+    return s.index[i], float(s.iloc[i])
+
+
+def kpis_from_aggregates(agg: dict) -> dict:
+    if not agg["entries"]:
+        return {"total_scrap": 0.0, "entries": 0, "avg_per_day": 0.0, "top_reason": "—",
+                "scrap_rate": None, "total_produced": None, "finished_qty": None,
+                "top_machine": None, "top_machine_qty": None}
+
+    total = agg["total_scrap"]
+    total_produced = agg["total_produced"]
+    per_day = agg["by"]["date"]
+    reason = _leader(agg["by"]["reason"])
+    machine = _leader(agg["by"]["machine_name"])
+    return {
+        "total_scrap": total,
+        "entries": agg["entries"],
+        "avg_per_day": float(per_day.mean()) if not per_day.empty else 0.0,
+        "top_reason": (reason[0] if reason and reason[0] else "—"),
+        "scrap_rate": total / total_produced * 100.0 if (total_produced or 0) > 0 else None,
+        "total_produced": total_produced,
+        "finished_qty": (total_produced - total) if total_produced is not None else None,
+        "top_machine": machine[0] if machine else None,
+        "top_machine_qty": machine[1] if machine else None,
+    }
+
+
+def top_k_with_delta(now: pd.Series, prev: pd.Series, k: int = 3) -> list:
+    """
+    The k largest keys of `now` with their previous-period quantity and the
+    percent change (None when the key had nothing in the previous period).
+    """
+    if now.empty:
+        return []
+    values = now.to_numpy()
+    order = np.argsort(-values, kind="stable")[:k]
+    keys = now.index[order]
+    prev_q = prev.reindex(keys).fillna(0).to_numpy(dtype=float) if not prev.empty else np.zeros(len(keys))
+    out = []
+    for key, qty, pq in zip(keys, values[order], prev_q):
+        out.append({"name": key, "qty": float(qty), "prev": float(pq),
+                    "delta_pct": float((qty - pq) / pq * 100.0) if pq else None})
+    return out
+
+
+def report_summary(agg: dict, agg_prev: dict, k: int = 3) -> dict:
+    """Everything the report template needs, derived from the two aggregates."""
+    by, by_prev = agg["by"], agg_prev["by"]
+    return {
+        "kpis": kpis_from_aggregates(agg),
+        "kpis_prev": kpis_from_aggregates(agg_prev),
+        "top": {dim: top_k_with_delta(by[dim], by_prev[dim], k) for dim in ("machine_name", "machine_operator")},
+        "leaders": {dim: _leader(by[dim]) for dim in ("shift", "machine_name", "machine_operator", "reason")},
+    }
@@ -0,0 +1,188 @@
+# report_queries.py — Postgres query layer for report generation
+#
+# Reports need per-day/shift/reason/machine/operator totals for the selected
+# period and for the previous period of equal length. Instead of pulling every
+# raw row into pandas twice, one GROUPING SETS query computes all of them for
+# both periods in a single round trip; only the columns shown in the detail
+# table are transferred row by row.
+
+import pandas as pd
+import psycopg2
+
+from pg_pool import read_sql_named
+from report_kpis import empty_aggregates
+
+# Report dimension (report_kpis.DIMENSIONS) -> SQL expression in the aggregate query
+DIMENSIONS = {
+    "date": "day",
+    "shift": "shift",
+    "reason": "reason",
+    "machine_name": "machine_name",
+    "machine_operator": "machine_operator",
+}
+
+# Columns of the detailed rows table, in display order
+DETAIL_COLUMNS = ["date", "shift", "machine_operator", "machine_name", "reason", "quantity", "unit", "comments"]
+
+
+def filter_sql(shift=None, operator=None, reason=None, machine=None):
+    """WHERE fragments and params for the report filters (dates excluded)."""
+    where, params = [], {}
+    if machine:
+        where.append("machine_name = %(machine)s"); params["machine"] = machine
+    if shift and shift != "All":
+        where.append("shift = %(shift)s"); params["shift"] = shift
+    if operator:
+        where.append("machine_operator ILIKE %(op)s"); params["op"] = f"%{operator.strip()}%"
+    if reason:
+        where.append("reason ILIKE %(re)s"); params["re"] = f"%{reason.strip()}%"
+    return where, params
+
+
+def load_report_aggregates(conn, start_date, end_date, prev_start, columns: set,
+                           shift=None, operator=None, reason=None, machine=None) -> dict:
+    """
+    Totals for the current period [start_date, end_date] and the previous
+    period [prev_start, start_date) in one query.
+    Returns {"current": aggregates, "previous": aggregates}.
+    """
+    has_total_prod = "total_produced" in columns
+    where, params = filter_sql(shift, operator, reason, machine)
+    where.insert(0, "date::date BETWEEN %(prev_start)s AND %(end)s")
+    params.update({"start": start_date, "end": end_date, "prev_start": prev_start})
+
+    dim_case = " ".join(f"WHEN GROUPING({col}) = 0 THEN '{dim}'" for dim, col in DIMENSIONS.items())
+    sets = ", ".join(["(period)"] + [f"(period, {col})" for col in DIMENSIONS.values()])
+    sql = f"""
+        WITH base AS (
+            SELECT CASE WHEN date::date >= %(start)s THEN 'current' ELSE 'previous' END AS period,
+                   date::date AS day, shift, reason, machine_name, machine_operator,
+                   quantity::numeric AS quantity,
+                   {"total_produced::numeric" if has_total_prod else "NULL::numeric"} AS total_produced
+            FROM public.scrap_logs
+            WHERE {' AND '.join(where)}
+        )
+        SELECT period,
+               CASE {dim_case} ELSE 'total' END AS dim,
+               COALESCE(day::text, {", ".join(c for c in DIMENSIONS.values() if c != "day")}) AS key,
+               SUM(quantity)::float8 AS quantity,
+               COUNT(*) AS entries,
+               SUM(total_produced)::float8 AS total_produced
+        FROM base
+        GROUP BY GROUPING SETS ({sets})
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+
+    out = {"current": empty_aggregates(has_total_prod), "previous": empty_aggregates(has_total_prod)}
+    by_dim = {}
+    for period, dim, key, qty, entries, produced in rows:
+        agg = out[period]
+        if dim == "total":
+            agg["total_scrap"] = float(qty or 0)
+            agg["entries"] = int(entries)
+            if has_total_prod:
+                agg["total_produced"] = float(produced or 0)
+        elif key is not None:
+            by_dim.setdefault((period, dim), {})[key] = float(qty or 0)
+
+    for (period, dim), values in by_dim.items():
+        s = pd.Series(values, dtype=float)
+        if dim == "date":
+            s.index = pd.to_datetime(s.index).date
+            s = s.sort_index()
+        out[period]["by"][dim] = s
+    return out
+
+
+def load_report_detail(conn, start_date, end_date, shift=None, operator=None, reason=None,
+                       machine=None) -> pd.DataFrame:
+    """Only the rows and columns shown in the report's detail table."""
+    where, params = filter_sql(shift, operator, reason, machine)
+    where.insert(0, "date::date BETWEEN %(start)s AND %(end)s")
+    params.update({"start": start_date, "end": end_date})
+    cols = [c if c != "date" else "date::date AS date" for c in DETAIL_COLUMNS]
+    cols = [c if c != "quantity" else "quantity::numeric AS quantity" for c in cols]
+    sql = f"SELECT {', '.join(cols)} FROM public.scrap_logs WHERE {' AND '.join(where)} ORDER BY date ASC, id ASC"
+    df = read_sql_named(conn, sql, params)
+    if not df.empty:
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+        df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce").fillna(0)
+    return df
+
+
+# Statement-level trigger that bumps a per-table counter in the writing
+# transaction, so data_version is a single-row lookup that moves exactly
+# when a write commits. Installed on first use; datagen/pg_sync writes and
+# TRUNCATE all go through it.
+_VERSION_SETUP = """
+CREATE TABLE IF NOT EXISTS public.scrapsense_data_versions (
+    table_name text PRIMARY KEY,
+    version bigint NOT NULL DEFAULT 0
+);
+CREATE OR REPLACE FUNCTION public.scrapsense_bump_data_version() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO public.scrapsense_data_versions AS v (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = v.version + 1;
+    RETURN NULL;
+END $$;
+DROP TRIGGER IF EXISTS scrapsense_data_version ON public.{table};
+CREATE TRIGGER scrapsense_data_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.{table}
+    FOR EACH STATEMENT EXECUTE FUNCTION public.scrapsense_bump_data_version();
+-- (re)installing bumps too: writes made while the trigger was missing went uncounted
+INSERT INTO public.scrapsense_data_versions AS v (table_name, version) VALUES (%(table)s, 1)
+ON CONFLICT (table_name) DO UPDATE SET version = v.version + 1;
+"""
+
+# The table oid is part of the key, so a dropped and recreated table never reuses one
+_VERSION_READ = """
+SELECT c.oid, v.version
+FROM pg_class c
+JOIN pg_trigger t ON t.tgrelid = c.oid AND t.tgname = 'scrapsense_data_version'
+JOIN public.scrapsense_data_versions v ON v.table_name = c.relname
+WHERE c.oid = to_regclass(%(qualified)s)
+"""
+
+
+def ensure_data_version(conn, table: str = "scrap_logs"):
+    """Install the version counter and trigger for `table` (idempotent, commits)."""
+    with conn.cursor() as cur:
+        cur.execute(_VERSION_SETUP.format(table=table), {"table": table})
+    conn.commit()
+
+
+def data_version(conn, table: str = "scrap_logs") -> str:
+    """
+    Cheap fingerprint of a table's committed contents: its oid and a counter
+    bumped by a statement trigger in every writing transaction, so the key
+    changes as soon as an insert, update, delete or truncate commits. The
+    trigger is installed on first use; without the rights to do that, falls
+    back to count(*), max(id) and sum(xmin), which costs a table scan.
+    """
+    params = {"qualified": f"public.{table}"}
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('public.scrapsense_data_versions') IS NOT NULL")
+        row = None
+        if cur.fetchone()[0]:
+            cur.execute(_VERSION_READ, params)
+            row = cur.fetchone()
+    if row is None:
+        try:
+            ensure_data_version(conn, table)
+        except psycopg2.Error:
+            conn.rollback()
+            return _scan_version(conn, table)
+        with conn.cursor() as cur:
+            cur.execute(_VERSION_READ, params)
+            row = cur.fetchone()
+    return f"{row[0]}:{row[1]}" if row else "none"
+
+
+def _scan_version(conn, table: str) -> str:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT count(*), max(id), sum(xmin::text::bigint) FROM public.{table}")
+        row = cur.fetchone()
+    return "scan:" + ":".join(str(v) for v in row) if row else "none"
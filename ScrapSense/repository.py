@@ -0,0 +1,464 @@
+# repository.py — one data-access API for scrap_logs over SQLite or Postgres
+#
+# Frames call typed methods (fetch_page, fetch_all, aggregate, insert_batch,
+# delete_by_ids) instead of writing SQL against a particular driver. Each
+# backend has its own fast paths:
+#
+#   SQLite   — one WAL-mode connection; SQL text is built once per filter
+#              shape so sqlite3's statement cache reuses the compiled
+#              statement; batches go through executemany in one transaction;
+#              date filters use an expression index on the normalized day.
+#   Postgres — pooled connections (pg_pool); page queries are PREPAREd once
+#              per connection and filter shape; batches use execute_values,
+#              deletes a single `id = ANY(array)`; aggregates are the
+#              GROUPING SETS query from report_queries.
+#
+# Filters are a dict with any of: shift, operator, reason, machine (text,
+# operator/reason match substrings case-insensitively) and start, end
+# (dates, inclusive). The backend is chosen with SCRAPSENSE_DB_BACKEND
+# ("sqlite", the default, or "postgres"). Statements slower than
+# querylog.SLOW_MS are written to the slow-query log with their plan.
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from functools import lru_cache
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from pg_pool import get_pool, iter_sql_named, read_sql_named
+from querylog import SLOW_LOG, explain_sqlite
+from report_kpis import empty_aggregates, DIMENSIONS
+from report_queries import filter_sql, load_report_aggregates
+from schema_catalog import CATALOG
+
+# -----------------
+# SETTINGS
+# -----------------
+BACKEND = (os.getenv("SCRAPSENSE_DB_BACKEND") or "sqlite").lower()
+SQLITE_PATH = os.getenv("SCRAPSENSE_SQLITE_PATH") or os.path.join(os.path.dirname(__file__), "sample_data.db")
+TABLE = "scrap_logs"
+# Columns written by the entry form, in insert order
+SCRAP_COLUMNS = ("machine_operator", "machine_name", "date", "quantity", "unit",
+                 "total_produced", "shift", "reason", "comments")
+PAGE_SIZE = 50
+BATCH_SIZE = 1000          # rows per execute_values / executemany chunk
+EXPORT_CHUNK = 5000        # rows per DataFrame yielded by iter_all
+DELETE_CHUNK = 500         # ids per SQLite DELETE (bound-variable limit)
+FILTER_KEYS = ("machine", "shift", "operator", "reason", "start", "end")
+
+
+def _as_date(value):
+    """date objects pass through; 'YYYY-MM-DD' and 'MM/DD/YYYY' strings are parsed."""
+    if value is None or isinstance(value, date):
+        return value.date() if isinstance(value, datetime) else value
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"not a date: {value!r}")
+
+
+def _shape(filters: dict | None) -> tuple:
+    """The filters that are set, in a fixed order (one SQL text per shape)."""
+    filters = filters or {}
+    return tuple(k for k in FILTER_KEYS if filters.get(k) not in (None, "", "All"))
+
+
+def _filter_values(filters: dict | None, shape: tuple) -> list:
+    values = []
+    for k in shape:
+        v = filters[k]
+        if k in ("operator", "reason"):
+            v = f"%{str(v).strip()}%"
+        elif k in ("start", "end"):
+            v = _as_date(v)
+        values.append(v)
+    return values
+
+
+def _frame(rows, columns) -> pd.DataFrame:
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+class ScrapRepository(ABC):
+    """Backend-neutral interface; see SqliteRepository and PostgresRepository."""
+    backend = ""
+
+    @abstractmethod
+    def columns(self) -> set:
+        """Column names of scrap_logs."""
+
+    @abstractmethod
+    def fetch_page(self, filters: dict | None = None, page: int = 1,
+                   page_size: int = PAGE_SIZE) -> tuple[pd.DataFrame, int]:
+        """Rows of one page (newest first, with `id`) and the total matching row count."""
+
+    @abstractmethod
+    def fetch_all(self, filters: dict | None = None, columns=None) -> pd.DataFrame:
+        """Every matching row; `columns` defaults to all columns of the table."""
+
+    @abstractmethod
+    def iter_all(self, filters: dict | None = None, columns=None, chunk_rows: int = EXPORT_CHUNK):
+        """fetch_all's rows as DataFrames of up to `chunk_rows` rows, for exports that stream to disk."""
+
+    @abstractmethod
+    def fetch_since(self, after_id: int, columns=None) -> pd.DataFrame:
+        """Rows with id > after_id in id order, for incremental readers (snapshot.py)."""
+
+    @abstractmethod
+    def table_stats(self) -> dict:
+        """{"rows": row count, "max_id": highest id (0 when empty)}."""
+
+    @abstractmethod
+    def aggregate(self, start, end, filters: dict | None = None, prev_start=None) -> dict:
+        """
+        report_kpis aggregates for [start, end], and for [prev_start, start)
+        when given: {"current": ..., "previous": ...}.
+        """
+
+    @abstractmethod
+    def insert_batch(self, rows) -> int:
+        """Insert dicts keyed by SCRAP_COLUMNS (missing keys are NULL); returns rows written."""
+
+    @abstractmethod
+    def delete_by_ids(self, ids) -> int:
+        """Delete rows by id; returns rows removed."""
+
+    def close(self):
+        pass
+
+
+# -----------------
+# SQLITE
+# -----------------
+# Entry forms store MM/DD/YYYY text; older sample rows use YYYY-MM-DD
+_SQLITE_DAY = ("(CASE WHEN date LIKE '__/__/____' "
+               "THEN substr(date, 7, 4) || '-' || substr(date, 1, 2) || '-' || substr(date, 4, 2) "
+               "ELSE substr(date, 1, 10) END)")
+# Expression index on exactly that text, so start/end filters search instead of scanning
+_SQLITE_DAY_INDEX = f"CREATE INDEX IF NOT EXISTS {TABLE}_day_idx ON {TABLE} {_SQLITE_DAY}"
+
+
+@lru_cache(maxsize=None)
+def _sqlite_where(shape: tuple) -> str:
+    clause = {
+        "machine": "machine_name = ?", "shift": "shift = ?",
+        "operator": "machine_operator LIKE ?", "reason": "reason LIKE ?",
+        "start": f"{_SQLITE_DAY} >= ?", "end": f"{_SQLITE_DAY} <= ?",
+    }
+    return " AND ".join(clause[k] for k in shape) or "1=1"
+
+
+class SqliteRepository(ScrapRepository):
+    backend = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._columns = None
+        self._ensure_day_index()
+
+    def _ensure_day_index(self):
+        has_date = any(r[1] == "date" for r in self._conn.execute(f"PRAGMA table_info({TABLE})"))
+        if not has_date:
+            return
+        try:
+            with self._conn:
+                self._conn.execute(_SQLITE_DAY_INDEX)
+        except sqlite3.OperationalError:
+            pass               # read-only file: filters still work, just without the index
+
+    def _values(self, filters, shape):
+        return [v.isoformat() if isinstance(v, date) else v for v in _filter_values(filters, shape)]
+
+    def _run(self, sql, params=(), fetch: bool = True):
+        """Execute (caller holds the lock) and time it. Returns (cursor, rows or None)."""
+        t0 = time.perf_counter()
+        cur = self._conn.execute(sql, params)
+        rows = cur.fetchall() if fetch else None
+        SLOW_LOG.observe("sqlite", sql, params, time.perf_counter() - t0,
+                         len(rows) if fetch else cur.rowcount,
+                         explain=lambda: explain_sqlite(self._conn, sql, params))
+        return cur, rows
+
+    def columns(self) -> set:
+        if self._columns is None:
+            with self._lock:
+                rows = self._conn.execute(f"PRAGMA table_info({TABLE})").fetchall()
+            self._columns = {r[1] for r in rows}
+        return self._columns
+
+    def fetch_page(self, filters=None, page=1, page_size=PAGE_SIZE):
+        shape = _shape(filters)
+        cols = ["id"] + [c for c in SCRAP_COLUMNS if c in self.columns()]
+        sql = (f"SELECT {', '.join(cols)}, COUNT(*) OVER () FROM {TABLE} WHERE {_sqlite_where(shape)} "
+               f"ORDER BY {_SQLITE_DAY} DESC, id DESC LIMIT ? OFFSET ?")
+        params = self._values(filters, shape) + [page_size, (max(page, 1) - 1) * page_size]
+        with self._lock:
+            _, rows = self._run(sql, params)
+            if rows:
+                total = rows[0][-1]
+            else:
+                _, count = self._run(f"SELECT COUNT(*) FROM {TABLE} WHERE {_sqlite_where(shape)}", params[:-2])
+                total = count[0][0]
+        return _frame([r[:-1] for r in rows], cols), int(total)
+
+    def _select_all(self, filters, columns) -> tuple:
+        shape = _shape(filters)
+        cols = list(columns) if columns else ["*"]
+        order = f"{_SQLITE_DAY} DESC, id DESC" if "date" in self.columns() else "id DESC"
+        sql = f"SELECT {', '.join(cols)} FROM {TABLE} WHERE {_sqlite_where(shape)} ORDER BY {order}"
+        return sql, self._values(filters, shape)
+
+    def fetch_all(self, filters=None, columns=None):
+        sql, params = self._select_all(filters, columns)
+        with self._lock:
+            cur, rows = self._run(sql, params)
+            names = [d[0] for d in cur.description]
+        return _frame(rows, names)
+
+    def iter_all(self, filters=None, columns=None, chunk_rows=EXPORT_CHUNK):
+        # a connection of its own: WAL lets it read while the shared one keeps serving the UI
+        sql, params = self._select_all(filters, columns)
+        conn = sqlite3.connect(self.path)
+        try:
+            t0 = time.perf_counter()
+            cur = conn.execute(sql, params)
+            names = [d[0] for d in cur.description]
+            rows_read = 0
+            while True:
+                rows = cur.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                rows_read += len(rows)
+                yield _frame(rows, names)
+            SLOW_LOG.observe("sqlite", sql, params, time.perf_counter() - t0, rows_read,
+                             explain=lambda: explain_sqlite(conn, sql, params))
+        finally:
+            conn.close()
+
+    def fetch_since(self, after_id, columns=None):
+        cols = ", ".join(columns) if columns else "*"
+        with self._lock:
+            cur, rows = self._run(f"SELECT {cols} FROM {TABLE} WHERE id > ? ORDER BY id", [int(after_id)])
+            names = [d[0] for d in cur.description]
+        return _frame(rows, names)
+
+    def table_stats(self):
+        with self._lock:
+            _, rows = self._run(f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {TABLE}")
+        return {"rows": int(rows[0][0]), "max_id": int(rows[0][1])}
+
+    def aggregate(self, start, end, filters=None, prev_start=None):
+        has_total_prod = "total_produced" in self.columns()
+        filters = dict(filters or {}, start=prev_start or start, end=end)
+        shape = _shape(filters)
+        start_iso = _as_date(start).isoformat()
+        sql = f"""
+            SELECT CASE WHEN {_SQLITE_DAY} >= ? THEN 'current' ELSE 'previous' END AS period,
+                   {_SQLITE_DAY} AS date, shift, reason, machine_name, machine_operator,
+                   SUM(quantity) AS quantity, COUNT(*) AS entries,
+                   {"SUM(total_produced)" if has_total_prod else "NULL"} AS total_produced
+            FROM {TABLE} WHERE {_sqlite_where(shape)}
+            GROUP BY 1, 2, 3, 4, 5, 6
+        """
+        with self._lock:
+            _, rows = self._run(sql, [start_iso] + self._values(filters, shape))
+        grouped = _frame(rows, ["period", *DIMENSIONS, "quantity", "entries", "total_produced"])
+        return _rollup(grouped, has_total_prod)
+
+    def insert_batch(self, rows) -> int:
+        cols = [c for c in SCRAP_COLUMNS if c in self.columns()]
+        sql = f"INSERT INTO {TABLE} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})"
+        values = [tuple(r.get(c) for c in cols) for r in rows]
+        t0 = time.perf_counter()
+        with self._lock, self._conn:          # one transaction for the whole batch
+            self._conn.executemany(sql, values)
+        SLOW_LOG.observe("sqlite", sql, values[:1], time.perf_counter() - t0, len(values))
+        return len(values)
+
+    def delete_by_ids(self, ids) -> int:
+        ids = [int(i) for i in ids]
+        deleted = 0
+        with self._lock, self._conn:
+            for i in range(0, len(ids), DELETE_CHUNK):
+                chunk = ids[i:i + DELETE_CHUNK]
+                cur, _ = self._run(f"DELETE FROM {TABLE} WHERE id IN ({', '.join('?' * len(chunk))})", chunk,
+                                   fetch=False)
+                deleted += cur.rowcount
+        return deleted
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _rollup(grouped: pd.DataFrame, has_total_prod: bool) -> dict:
+    """Per-dimension totals for each period from rows grouped by every dimension."""
+    out = {}
+    for period in ("current", "previous"):
+        agg = empty_aggregates(has_total_prod)
+        part = grouped[grouped["period"] == period]
+        if not part.empty:
+            qty = pd.to_numeric(part["quantity"], errors="coerce").fillna(0)
+            agg["total_scrap"] = float(qty.sum())
+            agg["entries"] = int(part["entries"].sum())
+            if has_total_prod:
+                agg["total_produced"] = float(pd.to_numeric(part["total_produced"], errors="coerce").sum())
+            for dim in DIMENSIONS:
+                s = qty.groupby(part[dim].to_numpy()).sum().astype(float)
+                if dim == "date":
+                    s.index = pd.to_datetime(s.index).date
+                    s = s.sort_index()
+                agg["by"][dim] = s
+        out[period] = agg
+    return out
+
+
+# -----------------
+# POSTGRES
+# -----------------
+_PG_FILTERS = {
+    "machine": ("machine_name = {}", "text"), "shift": ("shift = {}", "text"),
+    "operator": ("machine_operator ILIKE {}", "text"), "reason": ("reason ILIKE {}", "text"),
+    "start": ("date::date >= {}", "date"), "end": ("date::date <= {}", "date"),
+}
+
+
+@lru_cache(maxsize=None)
+def _pg_page_statement(shape: tuple, cols: tuple) -> tuple:
+    """(name, PREPARE sql) for the page query of one filter shape."""
+    where = [_PG_FILTERS[k][0].format(f"${i}") for i, k in enumerate(shape, 1)] or ["TRUE"]
+    types = [_PG_FILTERS[k][1] for k in shape] + ["int", "int"]
+    n = len(shape)
+    body = (f"SELECT {', '.join(cols)}, count(*) OVER () FROM public.{TABLE} WHERE {' AND '.join(where)} "
+            f"ORDER BY date DESC, id DESC LIMIT ${n + 1} OFFSET ${n + 2}")
+    name = "scrap_page_" + hashlib.sha1(body.encode("utf-8")).hexdigest()[:12]
+    return name, f"PREPARE {name} ({', '.join(types)}) AS {body}"
+
+
+class PostgresRepository(ScrapRepository):
+    backend = "postgres"
+
+    def __init__(self, pool=None):
+        self.pool = pool or get_pool()
+        self._prepared = weakref.WeakKeyDictionary()   # connection -> names prepared on it
+
+    def _where(self, filters, shape):
+        filters = filters or {}
+        where, params = filter_sql(filters.get("shift"), filters.get("operator"),
+                                   filters.get("reason"), filters.get("machine"))
+        if "start" in shape:
+            where.append("date::date >= %(start)s"); params["start"] = _as_date(filters["start"])
+        if "end" in shape:
+            where.append("date::date <= %(end)s"); params["end"] = _as_date(filters["end"])
+        return " AND ".join(where) or "TRUE", params
+
+    def columns(self) -> set:
+        with self.pool.connection() as conn:
+            return set(CATALOG.columns(conn, TABLE))
+
+    def fetch_page(self, filters=None, page=1, page_size=PAGE_SIZE):
+        shape = _shape(filters)
+        with self.pool.connection() as conn:
+            available = CATALOG.columns(conn, TABLE)
+            cols = ("id",) + tuple(c for c in SCRAP_COLUMNS if c in available)
+            name, prepare = _pg_page_statement(shape, cols)
+            done = self._prepared.setdefault(conn, set())
+            params = _filter_values(filters, shape) + [page_size, (max(page, 1) - 1) * page_size]
+            with conn.cursor() as cur:
+                if name not in done:
+                    cur.execute(prepare)
+                    done.add(name)
+                cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+                rows = cur.fetchall()
+                if rows:
+                    total = rows[0][-1]
+                else:
+                    where, wparams = self._where(filters, shape)
+                    cur.execute(f"SELECT count(*) FROM public.{TABLE} WHERE {where}", wparams)
+                    total = cur.fetchone()[0]
+        return _frame([r[:-1] for r in rows], list(cols)), int(total)
+
+    def fetch_all(self, filters=None, columns=None):
+        where, params = self._where(filters, _shape(filters))
+        cols = ", ".join(columns) if columns else "*"
+        with self.pool.connection() as conn:
+            order = "date DESC, id DESC" if "date" in CATALOG.columns(conn, TABLE) else "id DESC"
+            return read_sql_named(conn, f"SELECT {cols} FROM public.{TABLE} WHERE {where} ORDER BY {order}", params)
+
+    def iter_all(self, filters=None, columns=None, chunk_rows=EXPORT_CHUNK):
+        where, params = self._where(filters, _shape(filters))
+        cols = ", ".join(columns) if columns else "*"
+        with self.pool.connection() as conn:
+            order = "date DESC, id DESC" if "date" in CATALOG.columns(conn, TABLE) else "id DESC"
+            yield from iter_sql_named(conn, f"SELECT {cols} FROM public.{TABLE} WHERE {where} ORDER BY {order}",
+                                      params, itersize=chunk_rows)
+
+    def fetch_since(self, after_id, columns=None):
+        cols = ", ".join(columns) if columns else "*"
+        with self.pool.connection() as conn:
+            return read_sql_named(conn, f"SELECT {cols} FROM public.{TABLE} WHERE id > %(after)s ORDER BY id",
+                                  {"after": int(after_id)})
+
+    def table_stats(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT count(*), COALESCE(max(id), 0) FROM public.{TABLE}")
+                rows, max_id = cur.fetchone()
+        return {"rows": int(rows), "max_id": int(max_id)}
+
+    def aggregate(self, start, end, filters=None, prev_start=None):
+        filters = filters or {}
+        start, end = _as_date(start), _as_date(end)
+        with self.pool.connection() as conn:
+            return load_report_aggregates(conn, start, end, _as_date(prev_start) or start,
+                                          CATALOG.columns(conn, TABLE),
+                                          shift=filters.get("shift"), operator=filters.get("operator"),
+                                          reason=filters.get("reason"), machine=filters.get("machine"))
+
+    def insert_batch(self, rows) -> int:
+        rows = list(rows)
+        with self.pool.connection() as conn:
+            cols = [c for c in SCRAP_COLUMNS if c in CATALOG.columns(conn, TABLE)]
+            with conn.cursor() as cur:
+                execute_values(cur, f"INSERT INTO public.{TABLE} ({', '.join(cols)}) VALUES %s",
+                               [tuple(r.get(c) for c in cols) for r in rows], page_size=BATCH_SIZE)
+            conn.commit()
+        return len(rows)
+
+    def delete_by_ids(self, ids) -> int:
+        ids = [int(i) for i in ids]
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(f"DELETE FROM public.{TABLE} WHERE id = ANY(%s)", (ids,))
+                deleted = cur.rowcount
+            conn.commit()
+        return deleted
+
+
+# -----------------
+# SHARED REPOSITORY
+# -----------------
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_repository() -> ScrapRepository:
+    """Process-wide repository for the configured backend, created on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = PostgresRepository() if BACKEND == "postgres" else SqliteRepository()
+        return _shared
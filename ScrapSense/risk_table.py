@@ -0,0 +1,127 @@
+# risk_table.py — retained-mode canvas table for the predictions risk rows
+#
+# Canvas items are created once and reused: a resize only moves them with
+# coords(), and new data only changes their text/image. Risk pills are
+# pre-rendered PIL images (one image item instead of six primitives per
+# pill), and <Configure> bursts are coalesced into one relayout per frame.
+
+import tkinter as tk
+from PIL import Image, ImageDraw, ImageTk
+
+TEXT_FG = "#0F172A"
+HEADER_FG = "#475569"
+FALLBACK_PILL = "#6B7280"
+PILL_W, PILL_H, PILL_RADIUS = 70, 20, 8
+PILL_SUPERSAMPLE = 4       # draw large and downscale for smooth corners
+HEADER_Y = 12
+FIRST_ROW_Y = HEADER_Y + 24
+ROW_HEIGHT = 28
+FRAME_MS = 16              # resize events are coalesced to at most one per frame
+
+
+def render_pill(color: str, width: int = PILL_W, height: int = PILL_H, radius: int = PILL_RADIUS):
+    """Anti-aliased rounded-rectangle pill as a PIL image."""
+    s = PILL_SUPERSAMPLE
+    img = Image.new("RGBA", (width * s, height * s), (0, 0, 0, 0))
+    ImageDraw.Draw(img).rounded_rectangle((0, 0, width * s - 1, height * s - 1), radius=radius * s, fill=color)
+    return img.resize((width, height), Image.LANCZOS)
+
+
+class RiskTable:
+    def __init__(self, canvas: tk.Canvas, columns, risk_colors: dict):
+        self.canvas = canvas
+        self.columns = columns            # [(header, relx), ...]
+        self.risk_colors = risk_colors
+        self.rows = []
+        self._pills = {}                  # color -> PhotoImage
+        self._row_items = []              # per row: dict of canvas item ids
+        self._width = None
+        self._after_id = None
+
+        c = canvas
+        self._headers = [c.create_text(0, HEADER_Y, text=text, anchor="w",
+                                       font=("Segoe UI", 10, "bold"), fill=HEADER_FG)
+                         for text, _ in columns]
+        self._empty = c.create_text(0, 24, text="No data available.", font=("Segoe UI", 11), state="hidden")
+        c.bind("<Configure>", self._on_configure)
+
+    # ----- Resize -----
+    def _on_configure(self, event=None):
+        if self._after_id is None:
+            self._after_id = self.canvas.after(FRAME_MS, self._relayout)
+
+    def _relayout(self):
+        self._after_id = None
+        w = self.canvas.winfo_width() or 900
+        if w == self._width:
+            return
+        self._width = w
+        self._layout()
+
+    def _layout(self):
+        c = self.canvas
+        w = self._width or c.winfo_width() or 900
+        xs = [int(w * relx) for _, relx in self.columns]
+        for item, x in zip(self._headers, xs):
+            c.coords(item, x, HEADER_Y)
+        c.coords(self._empty, w / 2, 24)
+        for i, items in enumerate(self._row_items):
+            y = FIRST_ROW_Y + i * ROW_HEIGHT
+            for key, col in (("rank", 0), ("machine", 1), ("shift", 2), ("pred", 3), ("cause", 5)):
+                c.coords(items[key], xs[col], y)
+            c.coords(items["pill"], xs[4], y)
+            c.coords(items["pill_text"], xs[4] + PILL_W / 2, y)
+
+    # ----- Data -----
+    def _pill(self, risk: str):
+        color = self.risk_colors.get(risk, FALLBACK_PILL)
+        img = self._pills.get(color)
+        if img is None:
+            img = self._pills[color] = ImageTk.PhotoImage(render_pill(color), master=self.canvas)
+        return img
+
+    def _ensure_rows(self, n: int) -> bool:
+        """Create item sets until there are `n` rows; True if any were created."""
+        c = self.canvas
+        created = False
+        while len(self._row_items) < n:
+            font = ("Segoe UI", 10)
+            self._row_items.append({
+                "rank": c.create_text(0, 0, anchor="w", font=font, fill=TEXT_FG),
+                "machine": c.create_text(0, 0, anchor="w", font=font, fill=TEXT_FG),
+                "shift": c.create_text(0, 0, anchor="w", font=font, fill=TEXT_FG),
+                "pred": c.create_text(0, 0, anchor="w", font=font, fill=TEXT_FG),
+                "pill": c.create_image(0, 0, anchor="w"),
+                "pill_text": c.create_text(0, 0, fill="white", font=("Segoe UI", 9, "bold")),
+                "cause": c.create_text(0, 0, anchor="w", font=font, fill=TEXT_FG),
+            })
+            created = True
+        return created
+
+    def set_rows(self, rows):
+        c = self.canvas
+        self.rows = list(rows)
+        grew = self._ensure_rows(len(self.rows))
+
+        c.itemconfigure(self._empty, state="normal" if not self.rows else "hidden")
+        header_state = "normal" if self.rows else "hidden"
+        for item in self._headers:
+            c.itemconfigure(item, state=header_state)
+
+        for i, items in enumerate(self._row_items):
+            if i >= len(self.rows):
+                for item in items.values():
+                    c.itemconfigure(item, state="hidden")
+                continue
+            row = self.rows[i]
+            risk = row.get("Risk Level", "Low")
+            c.itemconfigure(items["rank"], text=str(row.get("rank", i + 1)), state="normal")
+            c.itemconfigure(items["machine"], text=row.get("machine_key", "—"), state="normal")
+            c.itemconfigure(items["shift"], text=row.get("shift", "—"), state="normal")
+            c.itemconfigure(items["pred"], text=f"{int(float(row.get('quantity', 0))):,}", state="normal")
+            c.itemconfigure(items["pill"], image=self._pill(risk), state="normal")
+            c.itemconfigure(items["pill_text"], text=risk, state="normal")
+            c.itemconfigure(items["cause"], text=row.get("Predicted Top Cause", "—"), state="normal")
+
+        if grew or self._width is None:
+            self._layout()
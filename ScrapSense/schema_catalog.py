@@ -0,0 +1,86 @@
+# schema_catalog.py — cached column lists for the Postgres tables
+#
+# Optional columns (total_produced, entry_type) decide how report queries are
+# built. Instead of asking information_schema on every load, the column set
+# of a table is read once per database and kept for SCHEMA_TTL seconds.
+# Bumping the migration version (SCRAPSENSE_SCHEMA_VERSION, or
+# bump_schema_version() from a migration running in-process) drops every
+# cached entry so the next query sees the new columns.
+
+import os
+import threading
+import time
+
+SCHEMA_TTL = 300.0         # seconds a cached column set stays valid
+
+
+def _env_version() -> str:
+    return os.getenv("SCRAPSENSE_SCHEMA_VERSION") or "0"
+
+
+def connection_key(conn) -> tuple:
+    """Identifies the database behind a psycopg2 connection (password excluded)."""
+    p = conn.get_dsn_parameters()
+    return (p.get("host"), p.get("port"), p.get("dbname"), p.get("user"))
+
+
+class SchemaCatalog:
+    def __init__(self, ttl: float = SCHEMA_TTL, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}         # (db key, schema, table) -> (expires, frozenset of columns)
+        self._bumped = 0           # in-process migration bumps
+        self._version = self.version
+
+    @property
+    def version(self) -> tuple:
+        return (_env_version(), self._bumped)
+
+    def bump_version(self):
+        """Call after a migration changes the schema."""
+        with self._lock:
+            self._bumped += 1
+
+    def invalidate(self, key=None):
+        """Drop all cached tables, or only those of one database key."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries = {k: v for k, v in self._entries.items() if k[0] != key}
+
+    def columns(self, conn, table: str, schema: str = "public", key=None) -> frozenset:
+        """Column names of schema.table, from cache when still fresh."""
+        key = key if key is not None else connection_key(conn)
+        now = self._clock()
+        with self._lock:
+            if self._version != self.version:
+                self._entries.clear()
+                self._version = self.version
+            hit = self._entries.get((key, schema, table))
+            if hit and hit[0] > now:
+                return hit[1]
+
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_schema=%s AND table_name=%s
+            """, (schema, table))
+            cols = frozenset(r[0] for r in cur.fetchall())
+
+        with self._lock:
+            self._entries[(key, schema, table)] = (now + self.ttl, cols)
+        return cols
+
+    def has_column(self, conn, table: str, column: str, schema: str = "public", key=None) -> bool:
+        return column in self.columns(conn, table, schema, key)
+
+
+# Shared catalog; pooled callers pass key=pool.key
+CATALOG = SchemaCatalog()
+
+
+def bump_schema_version():
+    CATALOG.bump_version()
@@ -0,0 +1,290 @@
+# snapshot.py — columnar on-disk snapshot of the normalized scrap_logs frame
+#
+# The predictions view used to re-read and re-normalize the whole table on
+# every launch and every "Reload from DB". A snapshot keeps the normalized
+# frame on disk, one .npy file per column:
+#
+#   numbers / datetimes  stored as-is, opened with np.load(mmap_mode="r"),
+#                        so a column is a zero-copy view of the page cache
+#   text                 int32 codes (-1 = missing) plus an append-only
+#                        vocabulary, loaded as pandas Categoricals
+#
+# refresh() asks the repository for rows with id above the snapshot's last
+# id, normalizes only those, and appends them to the column files in place
+# (the .npy header is rewritten with the new length; numpy pads it so the
+# shape can grow). meta.json is replaced last and is the commit point:
+# readers only ever see the row count it names. The snapshot is rebuilt
+# from scratch when rows were deleted (the table's row count no longer
+# adds up), the columns or dtypes change, or FORMAT_VERSION moves.
+# Rebuilds go to a new generation directory, so frames still mapped from
+# the old one stay valid (and Windows can keep its file mappings).
+#
+# scrap_logs rows are only ever inserted or deleted by the app; an UPDATE
+# made outside it is not picked up until the next rebuild (clear()). A
+# Postgres row whose id committed after a higher one (concurrent pg_sync
+# workers) shows up as a row-count mismatch and also triggers a rebuild.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# -----------------
+# SETTINGS
+# -----------------
+SNAPSHOT_ROOT = Path(os.getenv("SCRAPSENSE_SNAPSHOT_DIR") or Path(tempfile.gettempdir()) / "scrapsense_snapshot")
+FORMAT_VERSION = 3         # bump when the normalizer or the file layout changes
+LOCK_STALE = 300.0         # seconds after which another process's refresh lock is ignored
+META_NAME = "meta.json"
+ID_COLUMN = "id"
+
+
+class SnapshotUnavailable(Exception):
+    """The table cannot be snapshotted (no id column) or another process is refreshing it."""
+
+
+def source_key(repo) -> str:
+    """Identifies the database behind a repository (SQLite file or Postgres target)."""
+    if repo.backend == "sqlite":
+        ident = ["sqlite", os.path.abspath(repo.path)]
+    else:
+        ident = ["postgres", *map(str, repo.pool.key)]
+    return hashlib.sha1(json.dumps(ident).encode("utf-8")).hexdigest()[:16]
+
+
+def _is_plain(series: pd.Series) -> bool:
+    """Stored as a raw numpy column (numbers, bools, datetimes) rather than as codes."""
+    dtype = series.dtype
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufM"
+
+
+def _write_header(f, dtype: np.dtype, rows: int) -> int:
+    f.seek(0)
+    np.lib.format.write_array_header_1_0(f, {"descr": np.lib.format.dtype_to_descr(dtype),
+                                             "fortran_order": False, "shape": (rows,)})
+    return f.tell()
+
+
+def _append(path: Path, values: np.ndarray, rows: int) -> int:
+    """Append `values` after the first `rows` rows of a 1-D .npy file; returns the new length."""
+    with open(path, "r+b") as f:
+        np.lib.format.read_magic(f)
+        np.lib.format.read_array_header_1_0(f)
+        offset = f.tell()
+        f.seek(offset + rows * values.dtype.itemsize)    # drop bytes of an append that never committed
+        f.write(values.tobytes())
+        new_rows = rows + len(values)
+        if _write_header(f, values.dtype, new_rows) != offset:
+            raise ValueError(f"{path.name}: header no longer fits")
+    return new_rows
+
+
+class ColumnarSnapshot:
+    def __init__(self, repo, normalize, root=SNAPSHOT_ROOT):
+        """`normalize(raw_df) -> df` must be row-wise, so chunks can be normalized independently."""
+        self.repo = repo
+        self.normalize = normalize
+        self.dir = Path(root) / source_key(repo)
+        self._lock = threading.Lock()
+
+    # -----------------
+    # META
+    # -----------------
+    def _meta(self) -> dict | None:
+        try:
+            meta = json.loads((self.dir / META_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("format") == FORMAT_VERSION else None
+
+    def _commit(self, meta: dict):
+        tmp = self.dir / f"{META_NAME}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self.dir / META_NAME)
+
+    def _acquire(self) -> Path:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        lock = self.dir / "refresh.lock"
+        try:
+            if time.time() - lock.stat().st_mtime > LOCK_STALE:
+                lock.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            raise SnapshotUnavailable("snapshot is being refreshed by another process")
+        return lock
+
+    # -----------------
+    # REFRESH
+    # -----------------
+    def refresh(self) -> dict:
+        """Bring the snapshot up to date. Returns {"rows", "appended", "rebuilt", "seconds"}."""
+        t0 = time.perf_counter()
+        with self._lock:
+            lock = self._acquire()
+            try:
+                meta = self._meta()
+                stats = self.repo.table_stats()
+                result = None
+                if meta is not None:
+                    result = self._append_new(meta, stats)
+                if result is None:
+                    result = self._rebuild(meta, stats)
+            finally:
+                lock.unlink(missing_ok=True)
+        result["seconds"] = time.perf_counter() - t0
+        return result
+
+    def _append_new(self, meta: dict, stats: dict) -> dict | None:
+        """Incremental refresh, or None when a rebuild is needed."""
+        if stats["max_id"] < meta["last_id"]:
+            return None
+        if stats["max_id"] == meta["last_id"]:
+            if stats["rows"] != meta["source_rows"]:
+                return None                # rows were deleted
+            return {"rows": meta["rows"], "appended": 0, "rebuilt": False}
+        new = self.repo.fetch_since(meta["last_id"])
+        ids = pd.to_numeric(new[ID_COLUMN])
+        # rows inserted after table_stats() ran are appended too, but not counted against it;
+        # a mismatch means deletions, or (Postgres) a lower id that committed after a higher one
+        if meta["source_rows"] + int((ids <= stats["max_id"]).sum()) != stats["rows"]:
+            return None
+        fetched = len(new)
+        if not fetched:
+            return {"rows": meta["rows"], "appended": 0, "rebuilt": False}
+
+        last_id = int(ids.max())
+        df = self.normalize(new)
+        if list(df.columns) != [c["name"] for c in meta["columns"]]:
+            return None
+        gen = self.dir / meta["gen"]
+        encoded = {}
+        for col in meta["columns"]:
+            values = self._encode(df[col["name"]], col, gen)
+            if values is None:
+                return None
+            encoded[col["name"]] = values
+        # vocabularies first: they only grow, so a crash before the meta commit leaves them valid
+        for col in meta["columns"]:
+            vocab = col.pop("vocab", None)
+            if vocab is not None and len(vocab) != col["vocab_len"]:
+                (gen / f"{col['name']}.vocab.json").write_text(json.dumps(vocab), encoding="utf-8")
+                col["vocab_len"] = len(vocab)
+        for col in meta["columns"]:
+            _append(gen / f"{col['name']}.npy", encoded[col["name"]], meta["rows"])
+        meta.update(rows=meta["rows"] + len(df), last_id=last_id,
+                    source_rows=meta["source_rows"] + fetched, updated=time.strftime("%Y-%m-%dT%H:%M:%S"))
+        self._commit(meta)
+        return {"rows": meta["rows"], "appended": len(df), "rebuilt": False}
+
+    def _encode(self, series: pd.Series, col: dict, gen: Path) -> np.ndarray | None:
+        """Column values in the stored representation, or None if they no longer fit it."""
+        if col["kind"] == "plain":
+            dtype = np.dtype(col["dtype"])
+            if not _is_plain(series) or not np.can_cast(series.dtype, dtype, "safe"):
+                return None
+            return series.to_numpy().astype(dtype, copy=False)
+        if _is_plain(series):
+            return None
+        vocab = json.loads((gen / f"{col['name']}.vocab.json").read_text(encoding="utf-8"))
+        col["vocab"] = vocab[:col["vocab_len"]]
+        return _codes(series, col)
+
+    def _rebuild(self, old_meta: dict | None, stats: dict) -> dict:
+        raw = self.repo.fetch_since(0)
+        if ID_COLUMN not in raw.columns:
+            raise SnapshotUnavailable("scrap_logs has no id column")
+        last_id = int(pd.to_numeric(raw[ID_COLUMN]).max()) if len(raw) else 0
+        df = self.normalize(raw) if len(raw) else raw
+
+        gen_name = f"gen-{int(old_meta['gen'].split('-')[1]) + 1 if old_meta else 1}"
+        gen = self.dir / gen_name
+        shutil.rmtree(gen, ignore_errors=True)
+        gen.mkdir(parents=True)
+        columns = []
+        for name in df.columns:
+            s = df[name]
+            if _is_plain(s):
+                col = {"name": name, "kind": "plain", "dtype": s.dtype.str}
+                np.save(gen / f"{name}.npy", s.to_numpy())
+            else:
+                col = {"name": name, "kind": "codes", "vocab": [], "vocab_len": 0}
+                np.save(gen / f"{name}.npy", _codes(s, col))
+                (gen / f"{name}.vocab.json").write_text(json.dumps(col["vocab"]), encoding="utf-8")
+                col["vocab_len"] = len(col.pop("vocab"))
+            columns.append(col)
+        meta = {"format": FORMAT_VERSION, "gen": gen_name, "columns": columns, "rows": len(df),
+                "last_id": last_id, "source_rows": len(raw), "updated": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self._commit(meta)
+        self._drop_old_generations(gen_name)
+        return {"rows": len(df), "appended": len(df), "rebuilt": True}
+
+    def _drop_old_generations(self, keep: str):
+        for d in self.dir.glob("gen-*"):
+            if d.name != keep:
+                shutil.rmtree(d, ignore_errors=True)   # still mapped on Windows: removed next rebuild
+
+    # -----------------
+    # LOAD
+    # -----------------
+    def load(self) -> pd.DataFrame:
+        """The snapshot as a DataFrame whose plain columns are read-only memmaps."""
+        meta = self._meta()
+        if meta is None:
+            raise SnapshotUnavailable("no snapshot yet")
+        gen, rows = self.dir / meta["gen"], meta["rows"]
+        data = {}
+        for col in meta["columns"]:
+            arr = np.load(gen / f"{col['name']}.npy", mmap_mode="r")[:rows]
+            if col["kind"] == "plain":
+                data[col["name"]] = arr
+            else:
+                vocab = json.loads((gen / f"{col['name']}.vocab.json").read_text(encoding="utf-8"))
+                data[col["name"]] = pd.Categorical.from_codes(arr, categories=vocab[:col["vocab_len"]],
+                                                              validate=False)
+        return pd.DataFrame(data, copy=False)
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _codes(series: pd.Series, col: dict) -> np.ndarray:
+    """int32 codes into col["vocab"] (extended in place with new values); missing values are -1."""
+    vocab = col["vocab"]
+    index = {v: i for i, v in enumerate(vocab)}
+    local, uniques = pd.factorize(series)
+    # one extra slot so the -1 of missing values maps to -1
+    mapping = np.full(len(uniques) + 1, -1, dtype=np.int32)
+    for j, value in enumerate(uniques):
+        value = str(value)
+        if value not in index:
+            index[value] = len(vocab)
+            vocab.append(value)
+        mapping[j] = index[value]
+    return mapping[local]
+
+# -----------------
+# SHARED SNAPSHOTS
+# -----------------
+_open = {}
+_open_lock = threading.Lock()
+
+
+def open_snapshot(repo, normalize) -> ColumnarSnapshot:
+    """One ColumnarSnapshot per database and normalizer, reused across reloads."""
+    key = (source_key(repo), normalize)
+    with _open_lock:
+        snap = _open.get(key)
+        if snap is None:
+            snap = _open[key] = ColumnarSnapshot(repo, normalize)
+        return snap
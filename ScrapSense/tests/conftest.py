@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# ScrapSense modules are flat and imported by name, as in main.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,25 @@
+# test_cause_model.py — incremental sync must agree with a fresh fit
+
+import pandas as pd
+
+from cause_model import CauseModel
+
+
+def _logs(rows) -> pd.DataFrame:
+    return pd.DataFrame([{"id": i, "reason": reason, "quantity": qty, "date": pd.Timestamp("2025-01-01"),
+                          "machine_key": "M1", "shift": "A"} for i, reason, qty in rows])
+
+
+def test_sync_after_append_matches_fit():
+    old = _logs([(1, "Wear", 100), (2, "Wear", 100), (3, "Jam", 3)])
+    new = _logs([(1, "Wear", 100), (2, "Wear", 100), (3, "Jam", 3), (4, "Jam", 7)])
+    synced = CauseModel().fit(old).sync(new)
+    pd.testing.assert_frame_equal(synced.breakdown(), CauseModel().fit(new).breakdown())
+
+
+def test_sync_refits_when_rows_below_last_id_were_deleted():
+    # ids 1-2 deleted and as many rows inserted: same length, but Wear is gone
+    model = CauseModel().fit(_logs([(1, "Wear", 100), (2, "Wear", 100), (3, "Jam", 3)]))
+    now = _logs([(3, "Jam", 3), (4, "Jam", 0), (5, "Jam", 0)])
+    pd.testing.assert_frame_equal(model.sync(now).breakdown(), CauseModel().fit(now).breakdown())
+    assert list(model.breakdown()["reason"]) == ["Jam"]
@@ -0,0 +1,37 @@
+# test_chart_renderer.py — what ends up in the chart cache, and under which key
+
+import pytest
+
+import chart_renderer
+from chart_renderer import STORE, spec_key
+
+SPEC = {"name": "bar", "kind": "bar", "x": ["A", "B"], "y": [3, 5], "width": 200, "height": 120, "scale": 1}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(chart_renderer, "CACHE_DIR", tmp_path / "cache")
+    return tmp_path / "cache"
+
+
+def test_plotly_failure_is_cached_under_the_agg_key(cache, tmp_path, monkeypatch):
+    def broken(spec, path, fmt):
+        raise RuntimeError("kaleido unavailable")
+    monkeypatch.setattr(chart_renderer, "_render_plotly", broken)
+    out = chart_renderer.render_charts([SPEC], tmp_path / "out", backend="plotly", parallel=False)
+    assert out["bar"].exists()
+    assert (cache / f"{spec_key(SPEC, 'png', 'agg')}.png").exists()
+    assert not (cache / f"{spec_key(SPEC, 'png', 'plotly')}.png").exists()
+
+
+def test_blob_evicted_before_placing_is_rendered_again(cache, tmp_path, monkeypatch):
+    chart_renderer.render_charts([SPEC], tmp_path / "warm", backend="agg", parallel=False)
+    place = STORE.place
+
+    def evict_first(blob, dest):
+        monkeypatch.setattr(STORE, "place", place)
+        blob.unlink()          # a sweep removes the blob between exists() and place()
+        return place(blob, dest)
+    monkeypatch.setattr(STORE, "place", evict_first)
+    out = chart_renderer.render_charts([SPEC], tmp_path / "out", backend="agg", parallel=False)
+    assert out["bar"].stat().st_size > 0
@@ -0,0 +1,42 @@
+# test_repository.py — SQLite backend behaviour that the views rely on
+
+import sqlite3
+
+import pytest
+
+from repository import SqliteRepository, _SQLITE_DAY, _shape, _sqlite_where
+
+SCHEMA = """
+CREATE TABLE scrap_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    machine_operator TEXT, machine_name TEXT, date TEXT, quantity REAL, unit TEXT,
+    total_produced INTEGER, shift TEXT, reason TEXT, comments TEXT
+)
+"""
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "scrap.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(SCHEMA)
+    repo = SqliteRepository(str(path))
+    # ISO rows from datagen and MM/DD/YYYY rows from the entry form
+    repo.insert_batch([{"date": "2025-01-05", "shift": "A"}, {"date": "01/06/2025", "shift": "B"},
+                       {"date": "2025-01-07", "shift": "A"}, {"date": "01/08/2025", "shift": "A"}])
+    yield repo
+    repo.close()
+
+
+def test_date_filters_match_both_formats(repo):
+    df, total = repo.fetch_page({"start": "2025-01-06", "end": "01/07/2025"})
+    assert total == 2 and sorted(df["id"]) == [2, 3]
+
+
+def test_date_filters_search_the_day_index(repo):
+    filters = {"start": "2025-01-06", "end": "2025-01-07", "shift": "A"}
+    shape = _shape(filters)
+    sql = f"SELECT id FROM scrap_logs WHERE {_sqlite_where(shape)} ORDER BY {_SQLITE_DAY} DESC"
+    with repo._lock:
+        plan = repo._conn.execute("EXPLAIN QUERY PLAN " + sql, repo._values(filters, shape)).fetchall()
+    assert any("scrap_logs_day_idx" in row[-1] for row in plan)
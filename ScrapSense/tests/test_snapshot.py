@@ -0,0 +1,138 @@
+# test_snapshot.py — the columnar snapshot must always load what a full read returns
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from repository import SqliteRepository
+from snapshot import ColumnarSnapshot
+from view_predictions import normalize_logs
+
+# total_produced is INTEGER so whole numbers come back as int64 (for the dtype-change case)
+SCHEMA = """
+CREATE TABLE scrap_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    machine_operator TEXT, machine_name TEXT, date TEXT, quantity REAL, unit TEXT,
+    total_produced INTEGER, shift TEXT, reason TEXT, comments TEXT
+)
+"""
+
+
+def _row(i, **overrides):
+    row = {"machine_operator": f"Op {i % 4}", "machine_name": f"M{i % 3}",
+           "date": f"2025-01-{1 + i % 28:02d}", "quantity": 1.5 + i, "unit": "lbs",
+           "total_produced": 100 + i, "shift": "ABC"[i % 3], "reason": ("Jam", "Wear")[i % 2],
+           "comments": ""}
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "scrap.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(SCHEMA)
+    repo = SqliteRepository(str(path))
+    repo.insert_batch([_row(i) for i in range(30)])
+    yield repo
+    repo.close()
+
+
+@pytest.fixture
+def snap(repo, tmp_path):
+    snap = ColumnarSnapshot(repo, normalize_logs, root=tmp_path / "snapshots")
+    assert snap.refresh()["rebuilt"]
+    return snap
+
+
+def assert_matches_full_read(snap, repo):
+    loaded = snap.load()
+    full = normalize_logs(repo.fetch_all())
+    a = loaded.sort_values("id").reset_index(drop=True)
+    b = full.sort_values("id").reset_index(drop=True)[list(a.columns)]
+    for col in a.columns:
+        if isinstance(a[col].dtype, pd.CategoricalDtype):
+            assert set(a[col].cat.categories) == set(b[col].dropna())
+            a[col] = a[col].astype(object)
+            b[col] = b[col].astype(object)
+        else:
+            a[col] = np.asarray(a[col].to_numpy())      # plain ndarray rather than the memmap
+    pd.testing.assert_frame_equal(a, b)
+
+
+def test_initial_build_matches(snap, repo):
+    assert_matches_full_read(snap, repo)
+
+
+def test_insert_appends_and_grows_vocabulary(snap, repo):
+    repo.insert_batch([_row(100), _row(101, reason="Brand new cause", shift="D")])
+    result = snap.refresh()
+    assert result["appended"] == 2 and not result["rebuilt"]
+    assert "Brand new cause" in snap.load()["reason"].cat.categories
+    assert_matches_full_read(snap, repo)
+
+
+def test_no_change_refresh_appends_nothing(snap, repo):
+    result = snap.refresh()
+    assert result["appended"] == 0 and not result["rebuilt"]
+    assert_matches_full_read(snap, repo)
+
+
+def test_delete_rebuilds(snap, repo):
+    repo.delete_by_ids([3, 4, 30])
+    assert snap.refresh()["rebuilt"]
+    assert_matches_full_read(snap, repo)
+
+
+def test_delete_and_insert_rebuilds(snap, repo):
+    repo.delete_by_ids([5, 6])
+    repo.insert_batch([_row(200), _row(201)])
+    assert snap.refresh()["rebuilt"]
+    assert_matches_full_read(snap, repo)
+
+
+def test_dtype_change_rebuilds(snap, repo):
+    assert snap.load()["total_produced"].dtype == "int64"
+    repo.insert_batch([_row(300, total_produced=12.5)])
+    assert snap.refresh()["rebuilt"]
+    assert snap.load()["total_produced"].dtype == "float64"
+    assert_matches_full_read(snap, repo)
+
+
+def test_uncommitted_append_is_rolled_back(snap, repo, monkeypatch):
+    before = len(snap.load())
+    repo.insert_batch([_row(400, reason="Crash cause"), _row(401)])
+
+    def crash(meta):
+        raise OSError("disk full")
+    monkeypatch.setattr(snap, "_commit", crash)
+    with pytest.raises(OSError):
+        snap.refresh()
+    # column files already hold the new rows, but meta.json still names the old count
+    assert len(snap.load()) == before
+    monkeypatch.undo()
+
+    repo.insert_batch([_row(402)])
+    result = snap.refresh()
+    assert result["appended"] == 3 and not result["rebuilt"]
+    assert_matches_full_read(snap, repo)
+
+
+def test_categories_are_only_observed_values(snap, repo):
+    repo.delete_by_ids([i for i in range(1, 31) if i % 3 == 2])    # every shift B row
+    snap.refresh()
+    df = snap.load()
+    assert list(df["unit"].cat.categories) == ["lbs"]
+    assert sorted(df["shift"].cat.categories) == ["A", "C"]
+
+
+def test_mixed_date_formats_parse_the_same_appended_or_rebuilt(snap, repo):
+    # AddScrapFrame writes MM/DD/YYYY next to the ISO dates already in the table
+    repo.insert_batch([_row(500 + i, date=f"02/{10 + i:02d}/2025") for i in range(9)])
+    assert not snap.refresh()["rebuilt"]
+    df = snap.load()
+    assert df["date"].notna().all()
+    assert (df.loc[df["id"] > 30, "date"] == pd.date_range("2025-02-10", periods=9)).all()
+    assert_matches_full_read(snap, repo)
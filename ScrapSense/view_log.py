@@ -3,10 +3,12 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkcalendar import Calendar
 from PIL import Image, ImageTk
-import sqlite3
 import pandas as pd
 from datetime import datetime
 
+from repository import get_repository
+from perf import span
+
 PAGE_SIZE = 50
 
 
@@ -16,7 +18,7 @@ class ViewLogFrame(tk.Frame):
         self.controller = controller
         self.BASE_DIR = os.path.dirname(__file__)
         self.IMAGE_DIR = os.path.join(self.BASE_DIR, "images")
-        self.DB_PATH = os.path.join(self.BASE_DIR, "sample_data.db")
+        self.repo = get_repository()
 
         self.scale_x = max(self.winfo_screenwidth() / 1920, 0.8)
         self.scale_y = max(self.winfo_screenheight() / 1080, 0.8)
@@ -24,7 +26,8 @@ class ViewLogFrame(tk.Frame):
 
         self.current_page = 1
         self.total_pages = 1
-        self.df = pd.DataFrame()
+        self.total_rows = 0
+        self.df = pd.DataFrame()      # rows of the current page only
 
         self.build_ui()
         self.after(0, self.fetch_data)
@@ -154,40 +157,33 @@ class ViewLogFrame(tk.Frame):
             self.after_cancel(self._after_id)
         self._after_id = self.after(300, self.fetch_data)
 
-    # ---------- SQLite Query ----------
+    # ---------- Query (one page at a time) ----------
+    def _filters(self) -> dict:
+        flt = {"shift": self.shift_combo.get()}
+        op = self.op_entry.get().strip()
+        if op and op != "Search Operator":
+            flt["operator"] = op
+        for key, entry in (("start", self.from_date), ("end", self.to_date)):
+            text = entry.get().strip()
+            if text and text != "MM/DD/YYYY":
+                flt[key] = text
+        return flt
+
     def fetch_data(self):
+        self.current_page = 1
+        self.load_page()
+
+    def load_page(self):
         try:
-            conn = sqlite3.connect(self.DB_PATH)
-            query = "SELECT * FROM scrap_logs WHERE 1=1"
-            params = []
-
-            op = self.op_entry.get().strip()
-            if op and op != "Search Operator":
-                query += " AND machine_operator LIKE ?"
-                params.append(f"%{op}%")
-
-            shift = self.shift_combo.get()
-            if shift != "All":
-                query += " AND shift = ?"
-                params.append(shift)
-
-            fd = self.from_date.get().strip()
-            td = self.to_date.get().strip()
-            if fd and fd != "MM/DD/YYYY":
-                query += " AND date >= ?"
-                params.append(fd)
-            if td and td != "MM/DD/YYYY":
-                query += " AND date <= ?"
-                params.append(td)
-
-            query += " ORDER BY date DESC"
-            self.df = pd.read_sql_query(query, conn, params=params)
-            conn.close()
-
-            self.current_page = 1
-            self.total_pages = max(1, (len(self.df) + PAGE_SIZE - 1) // PAGE_SIZE)
-            self.refresh_pages()
-            self.show_page()
+            with span("view_log.db"):
+                self.df, self.total_rows = self.repo.fetch_page(self._filters(), self.current_page, PAGE_SIZE)
+            self.total_pages = max(1, (self.total_rows + PAGE_SIZE - 1) // PAGE_SIZE)
+            if self.current_page > self.total_pages:      # e.g. the last page was deleted
+                self.current_page = self.total_pages
+                return self.load_page()
+            with span("view_log.render"):
+                self.refresh_pages()
+                self.show_page()
 
         except Exception as e:
             messagebox.showerror("Database Error", str(e))
@@ -198,7 +194,7 @@ class ViewLogFrame(tk.Frame):
 
         def go(p):
             self.current_page = p
-            self.show_page()
+            self.load_page()
 
         tk.Button(self.pagebar, text="<<", command=lambda: go(max(1, self.current_page - 1)),
                   bg="#F8FAFC", relief="flat", font=("Segoe UI", 10)).pack(side="left", padx=3)
@@ -211,25 +207,28 @@ class ViewLogFrame(tk.Frame):
         self.tree.delete(*self.tree.get_children())
         if self.df.empty:
             return
-        start = (self.current_page - 1) * PAGE_SIZE
-        end = start + PAGE_SIZE
-        slice_df = self.df.iloc[start:end]
-        for i, row in slice_df.iterrows():
-            vals = [row.get(c, "") for c in self.visible_cols]
+        for i, row in enumerate(self.df.itertuples(index=False)):
+            rec = row._asdict()
+            vals = [rec.get(c, "") for c in self.visible_cols]
             tag = "even" if i % 2 == 0 else "odd"
-            self.tree.insert("", tk.END, values=vals, tags=(tag,))
+            self.tree.insert("", tk.END, iid=str(rec["id"]), values=vals, tags=(tag,))
         self.tree.tag_configure("even", background="#FFFFFF")
         self.tree.tag_configure("odd", background="#F7F9FB")
 
     # ---------- Actions ----------
     def export(self):
-        if self.df is None or self.df.empty:
+        if not self.total_rows:
             return messagebox.showinfo("Export", "No data to export.")
         fp = filedialog.asksaveasfilename(defaultextension=".csv",
                                           filetypes=[("CSV Files", "*.csv")])
         if not fp:
             return
-        self.df[self.visible_cols].to_csv(fp, index=False)
+        cols = [c for c in self.visible_cols if c in self.repo.columns()]
+        # chunk by chunk, so the export never holds the whole result in memory
+        with open(fp, "w", encoding="utf-8", newline="") as f:
+            pd.DataFrame(columns=cols).to_csv(f, index=False)
+            for chunk in self.repo.iter_all(self._filters(), columns=cols):
+                chunk.to_csv(f, index=False, header=False)
         messagebox.showinfo("Exported", f"Saved to:\n{fp}")
 
     def delete_selected(self):
@@ -238,15 +237,12 @@ class ViewLogFrame(tk.Frame):
             return messagebox.showinfo("Delete", "Select a row first.")
         item = self.tree.item(sel[0])["values"]
         date, operator = item[2], item[0]
-        confirm = messagebox.askyesno("Confirm", f"Delete entry for {operator} on {date}?")
+        what = f"entry for {operator} on {date}" if len(sel) == 1 else f"{len(sel)} entries"
+        confirm = messagebox.askyesno("Confirm", f"Delete {what}?")
         if not confirm:
             return
         try:
-            conn = sqlite3.connect(self.DB_PATH)
-            cur = conn.cursor()
-            cur.execute("DELETE FROM scrap_logs WHERE machine_operator=? AND date=?", (operator, date))
-            conn.commit()
-            conn.close()
-            self.fetch_data()
+            self.repo.delete_by_ids(sel)      # tree item ids are scrap_logs ids
+            self.load_page()
         except Exception as e:
             messagebox.showerror("Error", str(e))
@@ -1,12 +1,16 @@
-# view_predictions.py — SQLite Recruiter Edition (robust to missing columns)
+# view_predictions.py — Recruiter Edition (SQLite or Postgres, robust to missing columns)
 
 from dotenv import load_dotenv
 load_dotenv()
 
 import os
+import queue
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
 
@@ -16,7 +20,14 @@ matplotlib.use("TkAgg")
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-from db import get_db_connection  # must return an sqlite3 connection
+from repository import get_repository
+from snapshot import SnapshotUnavailable, open_snapshot
+from forecast import MODELS, MODEL_LABELS
+from cause_model import CauseModel
+from prediction_charts import LineChart, PieChart
+from risk_table import RiskTable
+from prediction_jobs import make_payload, run_forecast_job, risk_bucket  # noqa: F401 (risk_bucket re-exported)
+from perf import span, record
 
 # -----------------
 # SETTINGS / THEME
@@ -25,47 +36,67 @@ FILTER_BG = "#DCDAD5"
 RISK_COLORS = {"High": "#EF4444", "Medium": "#F59E0B", "Low": "#22C55E"}
 BG_SIDEBAR = "#DBE2E9"
 BG_APP = "white"
+POLL_MS = 50          # how often the Tk loop checks for finished forecast jobs
+# Serve fetch_logs from the on-disk columnar snapshot (snapshot.py)
+USE_SNAPSHOT = os.getenv("SCRAPSENSE_SNAPSHOT", "1") != "0"
 
 
 # -----------------
-# DB (SQLite version, tolerant of schema differences)
+# DB (through repository.py, tolerant of schema differences)
 # -----------------
-def _table_columns(conn, table: str) -> set:
-    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
-    # rows are sqlite3.Row if row_factory set; otherwise tuples: (cid, name, type, notnull, dflt_value, pk)
-    cols = set()
-    for r in rows:
-        try:
-            cols.add(r["name"])
-        except Exception:
-            cols.add(r[1])
-    return cols
+def fetch_logs(use_snapshot: bool = USE_SNAPSHOT) -> pd.DataFrame:
+    """
+    Fetch scrap logs from the configured backend and normalize.
+    With `use_snapshot`, only rows added since the last call are read and
+    normalized; the rest is memory-mapped from the columnar snapshot (text
+    columns come back as Categoricals).
+    """
+    # If table doesn't exist, return empty df gracefully
+    try:
+        repo = get_repository()
+        if use_snapshot:
+            try:
+                snap = open_snapshot(repo, normalize_logs)
+                snap.refresh()
+                return snap.load()
+            except (SnapshotUnavailable, OSError, ValueError):
+                pass           # fall back to a full read
+        df = repo.fetch_all()
+    except Exception:
+        return pd.DataFrame()
+    if df.empty:
+        return df
+    return normalize_logs(df)
 
 
-def fetch_logs() -> pd.DataFrame:
+def parse_log_dates(values: pd.Series) -> pd.Series:
     """
-    Fetch scrap logs from local SQLite and normalize.
-    Tolerates tables missing some columns (unit/shift/reason/machine_*).
+    Parse a date column that mixes ISO dates (datagen, Postgres) with the
+    MM/DD/YYYY strings AddScrapFrame writes. Plain to_datetime infers a single
+    format from the first value, so the result would depend on which rows
+    share the call. Anything else falls back to per-value parsing.
     """
-    with get_db_connection() as conn:
-        # If table doesn't exist, return empty df gracefully
-        try:
-            conn.execute("SELECT 1 FROM scrap_logs LIMIT 1")
-        except Exception:
-            return pd.DataFrame()
+    out = pd.to_datetime(values, format="ISO8601", errors="coerce")
+    rest = out.isna() & values.notna()
+    if rest.any():
+        out[rest] = pd.to_datetime(values[rest], format="%m/%d/%Y", errors="coerce")
+        rest &= out.isna()
+    if rest.any():
+        out[rest] = pd.to_datetime(values[rest], format="mixed", errors="coerce")
+    return out
 
-        cols = _table_columns(conn, "scrap_logs")
-
-        # Pull everything and adapt
-        rows = [dict(r) for r in conn.execute("SELECT * FROM scrap_logs").fetchall()]
-    df = pd.DataFrame(rows)
-    if df.empty:
-        return df
 
+def normalize_logs(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalize raw scrap_logs rows. Every value is converted on its own (dates
+    included, see parse_log_dates), so chunks can be normalized independently
+    and still match a whole-table pass.
+    Tolerates tables missing some columns (unit/shift/reason/machine_*).
+    """
     # ---- Normalize required columns with safe fallbacks ----
     # date
     if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce")
+        df["date"] = parse_log_dates(df["date"])
     else:
         # fabricate a date if completely missing (so UI doesn't crash)
         df["date"] = pd.to_datetime("today").normalize()
@@ -81,6 +112,10 @@ def fetch_logs() -> pd.DataFrame:
     else:
         df["quantity"] = pd.to_numeric(df["quantity"], errors="coerce")
 
+    # total_produced is NUMERIC on Postgres (Decimal objects)
+    if "total_produced" in df.columns:
+        df["total_produced"] = pd.to_numeric(df["total_produced"], errors="coerce")
+
     # unit (default lbs)
     if "unit" not in df.columns:
         df["unit"] = "lbs"
@@ -139,58 +174,14 @@ def apply_date_preset(df: pd.DataFrame, preset: str) -> pd.DataFrame:
     return df
 
 
-def fit_predict_with_ci(y: np.ndarray, periods_ahead: int = 7, ci=(10, 90)):
-    """
-    Simple baseline predictor (linear trend + bootstrap residuals).
-    Returns arrays with upper/lower confidence bounds.
-    """
-    y = np.asarray(y, dtype=float)
-    y = y[~np.isnan(y) & ~np.isinf(y)]
-
-    if len(y) == 0:
-        empty = np.array([])
-        fut = np.zeros(periods_ahead)
-        return dict(y_pred=empty, lower=empty, upper=empty,
-                    future_pred=fut, future_lower=fut, future_upper=fut,
-                    resid=np.array([0.0]))
-
-    if len(y) == 1 or np.allclose(y, y[0]):
-        const = np.full(len(y), y.mean())
-        fut_const = np.full(periods_ahead, float(y.mean()))
-        return dict(y_pred=const, lower=const, upper=const,
-                    future_pred=fut_const, future_lower=fut_const, future_upper=fut_const,
-                    resid=np.array([0.0]))
-
-    n = len(y)
-    x = np.arange(n)
-    coef = np.polyfit(x, y, 1)
-    trend = np.poly1d(coef)(x)
-    resid = y - trend
-    if len(resid) < 5:
-        resid = np.pad(resid, (0, 5 - len(resid)), constant_values=float(np.mean(resid)))
-
-    sims = 800
-    boot_in = np.random.choice(resid, size=(sims, n), replace=True)
-    sim_in = trend + boot_in
-    lower, upper = np.percentile(sim_in, ci[0], axis=0), np.percentile(sim_in, ci[1], axis=0)
-
-    xf = np.arange(n, n + periods_ahead)
-    future_trend = np.poly1d(coef)(xf)
-    boot_out = np.random.choice(resid, size=(sims, periods_ahead), replace=True)
-    sim_out = future_trend + boot_out
-    fl, fu = np.percentile(sim_out, ci[0], axis=0), np.percentile(sim_out, ci[1], axis=0)
-
-    return dict(y_pred=trend, lower=lower, upper=upper,
-                future_pred=future_trend, future_lower=fl, future_upper=fu,
-                resid=resid)
-
-
-def risk_bucket(value: float, threshold_low: float, threshold_high: float) -> str:
-    if value >= threshold_high:
-        return "High"
-    if value >= threshold_low:
-        return "Medium"
-    return "Low"
+def daily_series(df: pd.DataFrame) -> pd.DataFrame:
+    """Daily quantity totals on a continuous calendar (days without logs count as 0)."""
+    day = df.groupby("date")["quantity"].sum().sort_index()
+    if day.empty:
+        return day.reset_index()
+    day = day.asfreq("D", fill_value=0.0)
+    day.index.name = "date"
+    return day.reset_index()
 
 
 # -----------------
@@ -219,11 +210,21 @@ class PredictionsDashboardFrame(tk.Frame):
 
         # ----- Data & defaults -----
         self.df_raw = fetch_logs()
+        self.cause_model = CauseModel().fit(self.df_raw)
         self.horizon_days = 7
+        # Wall-clock budget for the "Auto" model search on each refresh (seconds)
+        self.model_time_budget = 0.25
         # You can tune these thresholds or make them configurable
         self.threshold_low = 2500
         self.threshold_high = 4000
 
+        # ----- Background forecast jobs -----
+        self._executor = None
+        self._results = queue.Queue()
+        self._job_id = 0
+        self._pending = None        # (job_id, future, context) of the latest job
+        self._polling = False
+
         # ----- Layout -----
         self.rowconfigure(1, weight=1)
         self.columnconfigure(1, weight=1)
@@ -269,6 +270,13 @@ class PredictionsDashboardFrame(tk.Frame):
         self.shift_cb.current(0)
         self.shift_cb.pack(fill="x", pady=5)
 
+        tk.Label(self.sidebar, text="Model:", bg=BG_SIDEBAR).pack(anchor="w", pady=(10, 0))
+        self.model_cb = ttk.Combobox(self.sidebar,
+                                     values=["Auto"] + [MODEL_LABELS.get(m, m) for m in MODELS],
+                                     state="readonly", style="Custom.TCombobox")
+        self.model_cb.current(0)
+        self.model_cb.pack(fill="x", pady=5)
+
         ttk.Button(self.sidebar, text="Apply Filters",
                    command=self.apply_filters).pack(fill="x", pady=(20, 0))
         ttk.Button(self.sidebar, text="Reload from DB",
@@ -293,8 +301,21 @@ class PredictionsDashboardFrame(tk.Frame):
         self.chart_split.rowconfigure(0, weight=1)
         self.chart_split.columnconfigure(0, weight=1)
         self.chart_split.columnconfigure(2, weight=1)
-        self.canvas_line = None
-        self.canvas_pie = None
+
+        # Figures and canvases are created once; refreshes update their artists in place
+        self.canvas_line = FigureCanvasTkAgg(Figure(figsize=(6, 3), dpi=100), master=self.chart_split)
+        self.line_chart = LineChart(self.canvas_line.figure)
+        self.canvas_pie = FigureCanvasTkAgg(Figure(figsize=(5, 3), dpi=100), master=self.chart_split)
+        self.pie_chart = PieChart(self.canvas_pie.figure)
+        self.chart_sep = tk.Frame(self.chart_split, bg="#B0B0B0", width=2)
+        self.empty_lbl = tk.Label(self.chart_split, text="No data for the selected filters.", bg=BG_APP,
+                                  font=("Segoe UI", 12))
+
+        self.spinner = tk.Frame(self.chart_split, bg=BG_APP)
+        tk.Label(self.spinner, text="Computing forecast…", bg=BG_APP,
+                 font=("Segoe UI", 10)).pack(pady=(0, 4))
+        self.spinner_bar = ttk.Progressbar(self.spinner, mode="indeterminate", length=160)
+        self.spinner_bar.pack()
 
     def _build_bottom_table(self):
         self.bottom_frame = tk.Frame(self, bg=BG_APP, padx=10, pady=10)
@@ -309,7 +330,6 @@ class PredictionsDashboardFrame(tk.Frame):
 
         self.table_canvas = tk.Canvas(self.bottom_frame, bg=BG_APP, highlightthickness=0)
         self.table_canvas.grid(row=1, column=0, sticky="nsew")
-        self.table_canvas.bind("<Configure>", self._draw_bottom_table)
 
         self.columns = [
             ("Rank", 0.03),
@@ -320,11 +340,15 @@ class PredictionsDashboardFrame(tk.Frame):
             ("Predicted Top Cause", 0.80),
         ]
         self.rows_data = []
+        self.risk_table = RiskTable(self.table_canvas, self.columns, RISK_COLORS)
 
     # ----- Actions -----
     def _reload_from_db(self):
         try:
-            self.df_raw = fetch_logs()
+            with span("predictions.db"):
+                self.df_raw = fetch_logs()
+            with span("predictions.cause_model"):
+                self.cause_model.sync(self.df_raw)
             machines = ["All"] + (sorted(self.df_raw["machine_key"].unique().tolist())
                                   if not self.df_raw.empty else [])
             self.machine_cb["values"] = machines
@@ -343,10 +367,12 @@ class PredictionsDashboardFrame(tk.Frame):
         messagebox.showinfo("Export", "Hook your export logic here (CSV/XLSX).")
 
     def apply_filters(self):
+        self._cancel_pending()
         if self.df_raw.empty:
             self._render_empty(); return
 
-        df = self.df_raw.copy()
+        t0 = time.perf_counter()
+        df = self.df_raw
 
         m_sel = self.machine_cb.get()
         if m_sel and m_sel != "All":
@@ -361,191 +387,149 @@ class PredictionsDashboardFrame(tk.Frame):
         if df.empty:
             self._render_empty(); return
 
-        day = df.groupby("date", as_index=False)["quantity"].sum().sort_values("date")
-        y = day["quantity"].to_numpy(dtype=float)
-        model = fit_predict_with_ci(y, periods_ahead=self.horizon_days)
-
-        dates = day["date"].to_numpy()
-        fut_dates = pd.date_range(
-            start=(pd.to_datetime(dates[-1]) if len(dates) else pd.Timestamp.today()) + timedelta(days=1),
-            periods=self.horizon_days, freq="D"
+        self._job_id += 1
+        payload = make_payload(
+            df, job_id=self._job_id, model=self._selected_model(),
+            horizon=self.horizon_days, time_budget=self.model_time_budget,
+            threshold_low=self.threshold_low, threshold_high=self.threshold_high,
         )
-
-        # Cause breakdown (tolerant if reason missing/blank)
-        cause_df = df.assign(reason=df.get("reason", pd.Series(index=df.index)).replace({"": np.nan}))
-        cause_df = cause_df.dropna(subset=["reason"])
-        cause_agg = (cause_df.groupby("reason", as_index=False)["quantity"].sum()
-                     .sort_values("quantity", ascending=False)) if not cause_df.empty else pd.DataFrame()
-
-        # Risk rows
-        self.rows_data = self._build_risk_rows(df)
-
-        unit = (df["unit"].mode().iat[0] if "unit" in df.columns and not df["unit"].empty else "units")
-        self._render_line_chart(dates, y, model, fut_dates, unit=unit)
-        self._render_pie_chart(cause_agg)
+        payload["top_causes"] = self.cause_model.top_causes(payload["key_machines"], payload["key_shifts"])
+        context = {
+            "unit": (df["unit"].mode().iat[0] if "unit" in df.columns and not df["unit"].empty else "units"),
+            "cause_agg": self.cause_model.breakdown(m_sel, s_sel),
+        }
+        record("predictions.filter", time.perf_counter() - t0)
+        context["submitted"] = time.perf_counter()
+        self._submit(payload, context)
+
+    # ----- Background jobs -----
+    def _submit(self, payload: dict, context: dict):
+        job_id = payload["job_id"]
+        try:
+            if self._executor is None:
+                # spawn, not fork: this process holds Tk, a connection pool and background threads
+                self._executor = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+            future = self._executor.submit(run_forecast_job, payload)
+        except Exception:
+            # No worker processes available (e.g. restricted environment): run inline
+            self._executor = None
+            self._on_job_done(run_forecast_job(payload), context)
+            return
+        self._pending = (job_id, future, context)
+        future.add_done_callback(lambda f, j=job_id: self._results.put((j, f)))
+        self._show_spinner()
+        if not self._polling:
+            self._polling = True
+            self.after(POLL_MS, self._poll_results)
+
+    def _cancel_pending(self):
+        if self._pending is not None:
+            self._pending[1].cancel()  # only stops jobs still queued; running ones are ignored on arrival
+            self._pending = None
+        self._hide_spinner()
+
+    def _poll_results(self):
+        while True:
+            try:
+                job_id, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if self._pending is None or job_id != self._pending[0] or future.cancelled():
+                continue  # stale job from an earlier filter selection
+            context = self._pending[2]
+            self._pending = None
+            self._hide_spinner()
+            try:
+                self._on_job_done(future.result(), context)
+            except Exception as e:
+                messagebox.showerror("Forecast Error", str(e))
+
+        if self._pending is not None:
+            self.after(POLL_MS, self._poll_results)
+        else:
+            self._polling = False
+
+    def _on_job_done(self, result: dict, context: dict):
+        # queue + worker time as the user saw it, and the worker's own stages
+        record("predictions.forecast_job", time.perf_counter() - context["submitted"])
+        for stage, seconds in result.get("timings", {}).items():
+            record(f"predictions.{stage}", seconds)
+        with span("predictions.render"):
+            self._show_result(result, context)
+
+    def _show_result(self, result: dict, context: dict):
+        y = result["y"]
+        model = result["model"]
+        start = pd.Timestamp(np.datetime64(int(result["first_day"]), "D"))
+        dates = pd.date_range(start=start, periods=len(y), freq="D").to_numpy()
+        fut_dates = pd.date_range(start=start + timedelta(days=len(y)), periods=self.horizon_days, freq="D")
+
+        # Cause breakdown: predicted next-period mix, falling back to the observed mix
+        cause_agg = context["cause_agg"]
+        cause_title = "Predicted Scrap Source Breakdown"
+        if cause_agg.empty and len(result["cause_reasons"]):
+            cause_agg = pd.DataFrame({"reason": result["cause_reasons"],
+                                      "quantity": result["cause_quantities"]})
+            cause_title = "Scrap Source Breakdown"
+
+        self.rows_data = result["rows"]
+        self._render_line_chart(dates, y, model, fut_dates, unit=context["unit"])
+        self._render_pie_chart(cause_agg, title=cause_title)
         self._draw_bottom_table()
 
+    def _show_spinner(self):
+        self.spinner.place(relx=0.5, rely=0.5, anchor="center")
+        self.spinner.lift()
+        self.spinner_bar.start(12)
+
+    def _hide_spinner(self):
+        self.spinner_bar.stop()
+        self.spinner.place_forget()
+
+    def destroy(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        super().destroy()
+
+    def _selected_model(self):
+        """Registry name of the chosen model, or None for Auto (selected per series in the worker)."""
+        label = self.model_cb.get()
+        for name in MODELS:
+            if label == MODEL_LABELS.get(name, name):
+                return name
+        return None
+
     # ----- Renderers -----
     def _render_empty(self):
-        for child in self.chart_split.winfo_children():
-            child.destroy()
-        tk.Label(self.chart_split, text="No data for the selected filters.", bg=BG_APP,
-                 font=("Segoe UI", 12)).grid(row=0, column=0, sticky="nsew")
+        for w in (self.canvas_line.get_tk_widget(), self.chart_sep, self.canvas_pie.get_tk_widget()):
+            w.grid_remove()
+        self.empty_lbl.grid(row=0, column=0, columnspan=3, sticky="nsew")
         self.rows_data = []
         self._draw_bottom_table()
 
-    def _render_line_chart(self, dates, y, model, fut_dates, unit=""):
-        for child in self.chart_split.grid_slaves(row=0, column=0):
-            child.destroy()
-
-        fig_line = Figure(figsize=(6, 3), dpi=100)
-        ax1 = fig_line.add_subplot(111)
-
-        if len(y) <= 1:
-            ax1.scatter(dates, y, label="Actual", color="#0078D7")
-        else:
-            ax1.plot(dates, y, "o--", label="Actual", color="#0078D7", linewidth=1.2)
-
-        if len(model["y_pred"]) == len(dates) and len(model["y_pred"]):
-            ax1.plot(dates, model["y_pred"], "-", label="Predicted", color="#1F8EFA", linewidth=2)
-            if len(model["lower"]) == len(dates):
-                ax1.fill_between(dates, model["lower"], model["upper"], alpha=0.2, color="#1F8EFA", label="Confidence")
-
-        if len(fut_dates) and len(model["future_pred"]):
-            ax1.plot(fut_dates, model["future_pred"], ":", color="#1F8EFA", linewidth=2, label="Forecast")
-            if len(model["future_lower"]):
-                ax1.fill_between(fut_dates, model["future_lower"], model["future_upper"], alpha=0.15, color="#1F8EFA")
-
-        ax1.set_title(f"Predicted Scrap Volume ({unit})", fontsize=11)
-        ax1.set_xlabel("Date")
-        ax1.set_ylabel(f"Scrap ({unit})")
-        ax1.grid(True, linestyle="--", alpha=0.35)
-        ax1.legend()
-
-        self.canvas_line = FigureCanvasTkAgg(fig_line, master=self.chart_split)
-        self.canvas_line.draw()
+    def _show_charts(self):
+        if self.empty_lbl.winfo_manager():
+            self.empty_lbl.grid_remove()
         self.canvas_line.get_tk_widget().grid(row=0, column=0, sticky="nsew", padx=(0, 5))
+        self.chart_sep.grid(row=0, column=1, sticky="ns", padx=2)
+        self.canvas_pie.get_tk_widget().grid(row=0, column=2, sticky="nsew", padx=(5, 0))
 
-        sep = tk.Frame(self.chart_split, bg="#B0B0B0", width=2)
-        sep.grid(row=0, column=1, sticky="ns", padx=2)
-
-    def _render_pie_chart(self, cause_agg: pd.DataFrame):
-        for child in self.chart_split.grid_slaves(row=0, column=2):
-            child.destroy()
-
-        fig_pie = Figure(figsize=(5, 3), dpi=100)
-        ax2 = fig_pie.add_subplot(111)
+    def _render_line_chart(self, dates, y, model, fut_dates, unit=""):
+        self._show_charts()
+        self.line_chart.update(dates, y, model, fut_dates, unit=unit,
+                               model_label=MODEL_LABELS.get(model.get("model"), ""))
 
+    def _render_pie_chart(self, cause_agg: pd.DataFrame, title: str = "Scrap Source Breakdown"):
+        self._show_charts()
         if cause_agg is None or cause_agg.empty:
-            ax2.axis("off")
-            ax2.text(0.5, 0.5, "No scrap causes available\nin the selected window.",
-                     ha="center", va="center", fontsize=11)
+            self.pie_chart.update([], [], title=title)
         else:
-            total = float(cause_agg["quantity"].sum())
-            if total <= 0:
-                ax2.axis("off")
-                ax2.text(0.5, 0.5, "No scrap causes available\nin the selected window.",
-                         ha="center", va="center", fontsize=11)
-            else:
-                tmp = cause_agg.copy()
-                tmp["share"] = tmp["quantity"] / total
-                main = tmp[tmp["share"] >= 0.05].copy()
-                other_sum = tmp[tmp["share"] < 0.05]["quantity"].sum()
-                if other_sum > 0:
-                    main = pd.concat([main,
-                                      pd.DataFrame([{"reason": "Other",
-                                                     "quantity": other_sum,
-                                                     "share": other_sum/total}])],
-                                     ignore_index=True)
-                ax2.pie(main["quantity"], labels=main["reason"],
-                        autopct="%1.0f%%", startangle=140, textprops={'fontsize': 9})
-                ax2.set_title("Scrap Source Breakdown", fontsize=11)
-
-        self.canvas_pie = FigureCanvasTkAgg(fig_pie, master=self.chart_split)
-        self.canvas_pie.draw()
-        self.canvas_pie.get_tk_widget().grid(row=0, column=2, sticky="nsew", padx=(5, 0))
+            self.pie_chart.update(cause_agg["reason"].tolist(), cause_agg["quantity"].to_numpy(), title=title)
 
     # ----- Risk table -----
-    def _build_risk_rows(self, df: pd.DataFrame):
-        if df.empty:
-            return []
-
-        last_date = df["date"].max()
-        per_ms = (df[df["date"] == last_date]
-                  .groupby(["machine_key", "shift"], as_index=False)["quantity"].sum())
-
-        # Risk bucket + simple placeholder cause
-        per_ms["Risk Level"] = per_ms["quantity"].apply(
-            lambda x: risk_bucket(float(x or 0), self.threshold_low, self.threshold_high)
-        )
-        per_ms["Predicted Top Cause"] = "Material Defect"
-
-        per_ms = per_ms.sort_values("quantity", ascending=False).reset_index(drop=True)
-        # Adapt to drawing code: turn into list of dicts
-        rows = []
-        for i, r in per_ms.iterrows():
-            rows.append({
-                "rank": i + 1,
-                "machine_key": str(r.get("machine_key", "")),
-                "shift": str(r.get("shift", "")),
-                "quantity": float(r.get("quantity", 0)),
-                "Risk Level": r.get("Risk Level", "Low"),
-                "Predicted Top Cause": r.get("Predicted Top Cause", "—"),
-            })
-        return rows[:10]
-
-    def _draw_bottom_table(self, event=None):
-        c = self.table_canvas
-        c.delete("all")
-        w = c.winfo_width() or 900
-
-        if not self.rows_data:
-            c.create_text(w/2, 24, text="No data available.", font=("Segoe UI", 11))
-            return
-
-        header_y = 12
-        for text, relx in self.columns:
-            x = int(w * relx)
-            c.create_text(x, header_y, text=text, anchor="w",
-                          font=("Segoe UI", 10, "bold"), fill="#475569")
-
-        row_height = 28
-        y = header_y + 24
-        for i, row in enumerate(self.rows_data):
-            # Rank
-            c.create_text(int(w * self.columns[0][1]), y, anchor="w",
-                          text=str(row.get("rank", i+1)), font=("Segoe UI", 10), fill="#0F172A")
-            # Machine
-            c.create_text(int(w * self.columns[1][1]), y, anchor="w",
-                          text=row.get("machine_key", "—"), font=("Segoe UI", 10), fill="#0F172A")
-            # Shift
-            c.create_text(int(w * self.columns[2][1]), y, anchor="w",
-                          text=row.get("shift", "—"), font=("Segoe UI", 10), fill="#0F172A")
-            # Predicted Scrap (use quantity as proxy)
-            pred_str = f"{int(float(row.get('quantity', 0))):,}"
-            c.create_text(int(w * self.columns[3][1]), y, anchor="w",
-                          text=pred_str, font=("Segoe UI", 10), fill="#0F172A")
-            # Risk pill
-            pill_w, pill_h = 70, 20
-            rx = int(w * self.columns[4][1]); ry = y - pill_h // 2
-            risk = row.get("Risk Level", "Low")
-            color = RISK_COLORS.get(risk, "#6B7280")
-            # rounded rect
-            r = 8
-            c.create_arc(rx, ry, rx + 2*r, ry + 2*r, start=90, extent=90, fill=color, outline="")
-            c.create_arc(rx + pill_w - 2*r, ry, rx + pill_w, ry + 2*r, start=0, extent=90, fill=color, outline="")
-            c.create_arc(rx, ry + pill_h - 2*r, rx + 2*r, ry + pill_h, start=180, extent=90, fill=color, outline="")
-            c.create_arc(rx + pill_w - 2*r, ry + pill_h - 2*r, rx + pill_w, ry + pill_h, start=270, extent=90, fill=color, outline="")
-            c.create_rectangle(rx + r, ry, rx + pill_w - r, ry + pill_h, fill=color, outline="")
-            c.create_rectangle(rx, ry + r, rx + pill_w, ry + pill_h - r, fill=color, outline="")
-            c.create_text(rx + pill_w/2, ry + pill_h/2, text=risk,
-                          fill="white", font=("Segoe UI", 9, "bold"))
-            # Cause
-            c.create_text(int(w * self.columns[5][1]), y, anchor="w",
-                          text=row.get("Predicted Top Cause", "—"),
-                          font=("Segoe UI", 10), fill="#0F172A")
-
-            y += row_height
+    def _draw_bottom_table(self):
+        self.risk_table.set_rows(self.rows_data)
 
 
 # Back-compat alias used by main.py:
@@ -0,0 +1,176 @@
+# watchdog.py — detects when the Tk event loop stops responding
+#
+# Every frame runs its handlers on the one Tk thread, so a slow fetch or
+# filter freezes the whole window. The watchdog schedules a heartbeat with
+# root.after() every HEARTBEAT_MS; a background thread checks how long ago
+# the last heartbeat ran. Once that passes STALL_MS, it samples the main
+# thread's stack (sys._current_frames) every SAMPLE_MS until the loop comes
+# back, then writes one report to a rotating log:
+#
+#   STALL 1840 ms in ViewLogFrame.load_page (view_log.py:212), 88 samples
+#       hot: repository.py:179 SqliteRepository.fetch_page (61%)
+#       ...most frequent stack...
+#
+# The "handler" is the first function Tk called (the frame below tkinter's
+# CallWrapper); "hot" lines are the app functions seen most often in the
+# samples. Time spent in modal dialogs (messagebox, filedialog) is not a
+# stall and is not reported. Stall durations also go to perf as "ui.stall".
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from perf import record
+
+# -----------------
+# SETTINGS
+# -----------------
+ENABLED = os.getenv("SCRAPSENSE_WATCHDOG", "1") != "0"
+STALL_MS = float(os.getenv("SCRAPSENSE_STALL_MS") or 250)
+HEARTBEAT_MS = 50
+SAMPLE_MS = 10             # stack sampling period while stalled
+LOG_PATH = Path(os.getenv("SCRAPSENSE_STALL_LOG") or Path(tempfile.gettempdir()) / "scrapsense_stalls.log")
+LOG_MAX_BYTES = 1_000_000
+LOG_BACKUPS = 5
+HOT_LINES = 5              # app functions listed per report
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+# Nested event loops waiting on the user rather than blocked
+_MODAL_FILES = ("commondialog.py", "simpledialog.py", "dialog.py", "messagebox.py", "filedialog.py")
+_MODAL_FUNCS = {"wait_window", "wait_variable", "wait_visibility"}
+
+
+def _stall_logger(path: Path = LOG_PATH) -> logging.Logger:
+    logger = logging.getLogger("scrapsense.stalls")
+    if not logger.handlers:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def _stack(frame) -> list:
+    """[(file, line, qualified name), ...] from outermost to innermost."""
+    out = []
+    while frame is not None:
+        code = frame.f_code
+        out.append((code.co_filename, frame.f_lineno, getattr(code, "co_qualname", code.co_name)))
+        frame = frame.f_back
+    out.reverse()
+    return out
+
+
+def _is_app(entry) -> bool:
+    return os.path.dirname(os.path.abspath(entry[0])) == APP_DIR
+
+
+def _is_modal(stack) -> bool:
+    return any(os.path.basename(f) in _MODAL_FILES or name.rsplit(".", 1)[-1] in _MODAL_FUNCS
+               for f, _, name in stack)
+
+
+def _handler(stack):
+    """The function Tk dispatched to: first non-lambda frame below the last CallWrapper.__call__."""
+    start = 0
+    for i, (f, _, name) in enumerate(stack):
+        if os.path.basename(f) == "__init__.py" and name.endswith("CallWrapper.__call__"):
+            start = i + 1
+    for entry in stack[start:]:
+        if _is_app(entry) and not entry[2].endswith("<lambda>") and entry[2] != "<module>":
+            return entry
+    return stack[start] if start < len(stack) else (stack[-1] if stack else None)
+
+
+def _where(entry) -> str:
+    return f"{entry[2]} ({os.path.basename(entry[0])}:{entry[1]})" if entry else "?"
+
+
+class StallWatchdog:
+    def __init__(self, stall_ms: float = STALL_MS, heartbeat_ms: int = HEARTBEAT_MS,
+                 sample_ms: float = SAMPLE_MS, logger: logging.Logger | None = None):
+        self.stall = stall_ms / 1000.0
+        self.heartbeat_ms = heartbeat_ms
+        self.sample = sample_ms / 1000.0
+        self.logger = logger
+        self.root = None
+        self._after = None
+        self._last_beat = time.monotonic()
+        self._main_id = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = None
+        self.stalls = 0
+
+    # main thread
+    def attach(self, root):
+        """Start heartbeats on `root`. Until then, the time since start() counts as start-up work."""
+        self.root = root
+        self._beat()
+        return self
+
+    def _beat(self):
+        self._last_beat = time.monotonic()
+        self._after = self.root.after(self.heartbeat_ms, self._beat)
+
+    # watchdog thread
+    def start(self):
+        if ENABLED and self._thread is None:
+            self.logger = self.logger or _stall_logger()
+            self._last_beat = time.monotonic()
+            self._thread = threading.Thread(target=self._run, name="tk-watchdog", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        late = self.stall + self.heartbeat_ms / 1000.0
+        while not self._stop.wait(self.sample):
+            beat = self._last_beat
+            if time.monotonic() - beat < late:
+                continue
+            samples = []
+            while self._last_beat == beat and not self._stop.is_set():
+                frame = sys._current_frames().get(self._main_id)
+                if frame is not None:
+                    samples.append(_stack(frame))
+                del frame
+                time.sleep(self.sample)
+            end = self._last_beat if self._last_beat != beat else time.monotonic()
+            self._report(end - beat - self.heartbeat_ms / 1000.0, samples)
+
+    def _report(self, seconds: float, samples: list):
+        samples = [s for s in samples if not _is_modal(s)]
+        if not samples:
+            return
+        self.stalls += 1
+        record("ui.stall", seconds)
+        handlers = Counter(_handler(s) for s in samples)
+        handler = handlers.most_common(1)[0][0]
+        # app functions by share of samples they appear in (innermost app frame per sample)
+        hot = Counter(next((e for e in reversed(s) if _is_app(e)), s[-1]) for s in samples)
+        stacks = Counter(tuple(s) for s in samples)
+        lines = [f"STALL {seconds * 1000:.0f} ms in {_where(handler)}, {len(samples)} samples"]
+        for entry, n in hot.most_common(HOT_LINES):
+            lines.append(f"    hot: {_where(entry)} ({100 * n / len(samples):.0f}%)")
+        lines.append("    stack:")
+        lines += [f"      {f}:{ln} {name}" for f, ln, name in stacks.most_common(1)[0][0]]
+        self.logger.warning("\n".join(lines))
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        if self.root is not None and self._after is not None:
+            try:
+                self.root.after_cancel(self._after)
+            except Exception:
+                pass           # the window is already gone
+            self._after = None